@@ -84,6 +84,22 @@ class EnvSettings(BaseSettings):
     DEBUG: bool = False
     LOGLEVEL: str = "INFO"  # Options: DEBUG, INFO, WARNING, ERROR, CRITICAL
 
+    # Log processing
+    EI_PARSER_MAX_WORKERS: int | None = Field(
+        None, description="Number of Elite Insights processes that may run at once. Defaults to cpu count - 1."
+    )
+    EI_PARSE_PROFILE: Literal["lean", "full"] = Field(
+        "lean",
+        description="Elite Insights settings. lean only computes what the bot uses, full adds replay and modifiers.",
+    )
+    EI_PARSED_CACHE_MAX_SIZE_MB: int = Field(
+        10_000, description="Maximum size of the parsed log cache. Least recently used logs are removed first."
+    )
+    DPS_REPORT_CACHE_MAX_SIZE_MB: int = Field(
+        2_000,
+        description="Maximum size of the dps.report response cache. Least recently used responses are removed first.",
+    )
+
     # Database
     DJANGO_DATABASE_ENGINE: str
     DJANGO_DATABASE_NAME: str
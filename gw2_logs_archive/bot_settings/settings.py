@@ -72,6 +72,16 @@ RANK_BINS_PERCENTILE = base_settings.RANK_BINS_PERCENTILE  # Distribution of per
 
 
 EI_PARSED_LOGS_DIR = PROJECT_DIR.joinpath("Data", "parsed_logs")
+# Number of Elite Insights CLI processes that are allowed to run at the same time.
+EI_PARSER_MAX_WORKERS = ENV_SETTINGS.EI_PARSER_MAX_WORKERS or max(1, (os.cpu_count() or 2) - 1)
+# Elite Insights settings profile, see EI_SETTINGS_PROFILES in ei_parser.
+EI_PARSE_PROFILE = ENV_SETTINGS.EI_PARSE_PROFILE
+# Parsed logs by evtc content hash and EI version, shared between dates and runs.
+EI_PARSED_CACHE_DIR = PROJECT_DIR.joinpath("Data", "parsed_cache")
+EI_PARSED_CACHE_MAX_SIZE_MB = ENV_SETTINGS.EI_PARSED_CACHE_MAX_SIZE_MB
+# Gzipped getUploadMetadata/getJson responses from dps.report.
+DPS_REPORT_CACHE_DIR = PROJECT_DIR.joinpath("Data", "dps_report_cache")
+DPS_REPORT_CACHE_MAX_SIZE_MB = ENV_SETTINGS.DPS_REPORT_CACHE_MAX_SIZE_MB
 
 
 DPS_LOGS_DIR = base_settings.DPS_LOGS_DIR
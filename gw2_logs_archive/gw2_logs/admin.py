@@ -268,3 +268,21 @@ class DiscordMessageAdmin(admin.ModelAdmin):
 
     def view_instance_clear_groups(self, obj):
         return ", ".join([icg.name for icg in obj.instance_clear_groups.all()])
+
+
+@admin.register(models.ProcessedLogFile)
+class ProcessedLogFileAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "size", "local_processed", "upload_processed", "alias_of", "updated_at")
+    readonly_fields = ("updated_at",)
+    ordering = ("-name",)
+
+    search_fields = ["name", "path"]
+
+
+@admin.register(models.IndexedDirectory)
+class IndexedDirectoryAdmin(admin.ModelAdmin):
+    list_display = ("id", "path", "mtime_ns", "updated_at")
+    readonly_fields = ("updated_at",)
+    ordering = ("path",)
+
+    search_fields = ["path"]
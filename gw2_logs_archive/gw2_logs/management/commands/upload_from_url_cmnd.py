@@ -9,7 +9,7 @@ from itertools import chain
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
-from scripts.log_processing.log_uploader import LogUploader
+from scripts.log_processing.url_importer import BulkUrlImporter
 
 logger = logging.getLogger(__name__)
 
@@ -25,8 +25,8 @@ class Command(BaseCommand):
         logger.info("Processing urls from urls.txt")
         logger.info(log_urls)
 
-        # Parse the urls
-        for log_url in log_urls:
-            if log_url != "":
-                log_upload = LogUploader(log_url=log_url, only_url=False)
-                log_upload.run()
+        log_urls = [log_url for log_url in log_urls if log_url != ""]
+
+        # Fetch concurrently and write to the database in batches
+        stats = BulkUrlImporter().run(urls=log_urls)
+        logger.info(f"Finished: {stats}")
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.6 on 2026-10-17 19:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gw2_logs', '0103_manual_fill_discord_messages'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessedLogFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=300, unique=True)),
+                ('name', models.CharField(db_index=True, max_length=100)),
+                ('size', models.BigIntegerField()),
+                ('mtime', models.FloatField()),
+                ('local_processed', models.BooleanField(default=False)),
+                ('upload_processed', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-17 19:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gw2_logs', '0104_processedlogfile'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dpslog',
+            index=models.Index(condition=models.Q(('success', True)), fields=['encounter', 'duration'], name='dpslog_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dpslog',
+            index=models.Index(fields=['url'], name='dpslog_url_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='instanceclear',
+            index=models.Index(condition=models.Q(('success', True)), fields=['instance', 'duration'], name='iclear_rank_idx'),
+        ),
+    ]
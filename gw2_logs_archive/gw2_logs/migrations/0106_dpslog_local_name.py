@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-17 19:44
+
+from pathlib import PureWindowsPath
+
+from django.db import migrations, models
+
+
+def fill_local_name(apps, schema_editor):
+    DpsLog = apps.get_model("gw2_logs", "DpsLog")
+    dpslogs = list(DpsLog.objects.exclude(local_path=None).exclude(local_path="").only("id", "local_path"))
+    for dpslog in dpslogs:
+        dpslog.local_name = PureWindowsPath(dpslog.local_path).name
+    DpsLog.objects.bulk_update(dpslogs, ["local_name"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gw2_logs', '0105_dpslog_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dpslog',
+            name='local_name',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=100, null=True),
+        ),
+        migrations.RunPython(fill_local_name, migrations.RunPython.noop),
+    ]
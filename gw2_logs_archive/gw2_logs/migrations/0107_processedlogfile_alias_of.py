@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 20:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gw2_logs', '0106_dpslog_local_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processedlogfile',
+            name='alias_of',
+            field=models.CharField(blank=True, max_length=300, null=True),
+        ),
+    ]
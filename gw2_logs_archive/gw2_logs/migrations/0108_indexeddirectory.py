@@ -0,0 +1,24 @@
+# Generated by Django 5.1.6 on 2026-10-17 20:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gw2_logs', '0107_processedlogfile_alias_of'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexedDirectory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=300, unique=True)),
+                ('mtime_ns', models.BigIntegerField()),
+                ('subdirs', models.JSONField(default=list)),
+                ('log_names', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
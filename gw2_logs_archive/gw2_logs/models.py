@@ -1,6 +1,7 @@
 # %%
 from itertools import chain
-from typing import Literal
+from pathlib import PureWindowsPath
+from typing import Literal, Optional
 
 from django.conf import settings
 from django.db import models
@@ -283,6 +284,10 @@ class InstanceClear(models.Model):
 
     class Meta:
         ordering = ["-start_time"]
+        indexes = [
+            # Rank emotes, successful clears of an instance ordered by duration
+            models.Index(fields=["instance", "duration"], condition=models.Q(success=True), name="iclear_rank_idx"),
+        ]
 
 
 class DpsLog(models.Model):
@@ -320,13 +325,30 @@ class DpsLog(models.Model):
     )
     report_id = models.CharField(max_length=100, null=True, blank=True)
     local_path = models.CharField(max_length=200, null=True, blank=True)
+    local_name = models.CharField(
+        max_length=100, null=True, blank=True, db_index=True, editable=False
+    )  # From local_path
     json_dump = models.JSONField(null=True, blank=True)
     health_timers = models.JSONField(null=True, blank=True)  # for progression
     use_in_leaderboard = models.BooleanField(default=True)
 
+    def save(self, *args, **kwargs):
+        self.local_name = self.get_local_name(self.local_path)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "local_path" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "local_name"}
+        super(DpsLog, self).save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.boss_name} {self.start_time}"
 
+    @staticmethod
+    def get_local_name(local_path) -> Optional[str]:
+        """Filename of the local log. Paths may be stored from windows or linux."""
+        if not local_path:
+            return None
+        return PureWindowsPath(str(local_path)).name
+
     @property
     def difficulty(self):
         """Difficulty used in get the correct emote"""
@@ -366,6 +388,49 @@ class DpsLog(models.Model):
         else:
             return "No start time yet"
 
+    class Meta:
+        indexes = [
+            # Leaderboards and rank emotes, successful clears of an encounter ordered by duration.
+            # Partial on success; the boolean filters (cm, lcm, emboldened) are compiled to
+            # `NOT "cm"` which can't seek into an index, so they are checked on the few rows left.
+            models.Index(fields=["encounter", "duration"], condition=models.Q(success=True), name="dpslog_rank_idx"),
+            models.Index(fields=["url"], name="dpslog_url_idx"),
+        ]
+
+
+class ProcessedLogFile(models.Model):
+    """Processing state of a local log file. Lets a restarted run skip logs that were already finished.
+    The state is only valid while size and mtime of the file match.
+    Another recording of a fight that was already processed stores the path of that log in alias_of.
+    """
+
+    path = models.CharField(max_length=300, unique=True)
+    name = models.CharField(max_length=100, db_index=True)  # Filename, starts with the date
+    size = models.BigIntegerField()
+    mtime = models.FloatField()
+    local_processed = models.BooleanField(default=False)
+    upload_processed = models.BooleanField(default=False)
+    alias_of = models.CharField(max_length=300, null=True, blank=True)  # Path of the processed copy
+    updated_at = models.DateTimeField(auto_now=True, editable=False)
+
+    def __str__(self):
+        return self.name
+
+
+class IndexedDirectory(models.Model):
+    """Cached listing of a log folder, see DirectoryIndex. Lets a restarted run skip listing the folders
+    whose mtime did not change.
+    """
+
+    path = models.CharField(max_length=300, unique=True)
+    mtime_ns = models.BigIntegerField()
+    subdirs = models.JSONField(default=list)  # Names of the subdirectories
+    log_names = models.JSONField(default=list)  # Names of the logs of every date
+    updated_at = models.DateTimeField(auto_now=True, editable=False)
+
+    def __str__(self):
+        return self.path
+
 
 class Player(models.Model):
     name = models.CharField(max_length=100, null=True, blank=True)
@@ -9,6 +9,10 @@ def main():
     """Run administrative tasks."""
 
     os.environ.setdefault("DJANGO_SETTINGS_MODULE", "bot_settings.settings")
+    if os.environ.get("GW2_PROFILE_STARTUP"):
+        from scripts.utilities import startup_profiler
+
+        startup_profiler.install()
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
@@ -5,17 +5,20 @@ if __name__ == "__main__":
     django_setup.run()
 
 import logging
+from typing import TYPE_CHECKING
 
-import discord
 import numpy as np
 from scripts.log_helpers import (
     EMBED_COLOUR,
 )
 
+if TYPE_CHECKING:
+    import discord
+
 logger = logging.getLogger(__name__)
 
 
-def validate_embed_size(embed: discord.Embed) -> bool:
+def validate_embed_size(embed: "discord.Embed") -> bool:
     """Validate that the embed size is within Discord limits.
 
     Parameters
@@ -48,8 +51,10 @@ def create_discord_embeds(
     titles: dict[dict, str],
     descriptions: dict[dict, str],
     embed_colour_dict: dict[str, int] = EMBED_COLOUR,
-) -> dict[str, discord.Embed]:
+) -> "dict[str, discord.Embed]":
     """Create discord embed from titles and descriptions."""
+    import discord
+
     embeds: dict[str, discord.Embed] = {}
     has_title = False
     for instance_type in titles:
@@ -126,10 +131,12 @@ def create_discord_embeds_new(
     author: str,
     footer: str,
     embed_colour_dict: dict,
-) -> dict[str, discord.Embed]:
+) -> "dict[str, discord.Embed]":
     """Create discord embed from titles and descriptions, ensuring that the embed size does not
     exceed 4096 characters by splitting into multiple embeds if necessary.
     """
+    import discord
+
     embeds: dict[str, discord.Embed] = {}
 
     for instance_type in titles:
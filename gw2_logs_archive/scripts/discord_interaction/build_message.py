@@ -14,7 +14,7 @@ from itertools import chain
 from typing import TYPE_CHECKING, Tuple
 
 import numpy as np
-from django.db.models import QuerySet
+from django.db.models import Prefetch
 from gw2_logs.models import (
     DpsLog,
     InstanceClear,
@@ -47,6 +47,49 @@ class FirstBossTracker:
             self.is_first = False
 
 
+class ClearGroupLogs:
+    """All logs of a clear group, loaded once, with lookups used while building the lines.
+
+    Parameters
+    ----------
+    iclears : list[InstanceClear]
+        Instance clears with their dps_logs prefetched, see load_instance_clears.
+    """
+
+    def __init__(self, iclears: list[InstanceClear]):
+        self.iclears = iclears
+        self.all_logs = list(chain(*[i.dps_logs.all() for i in iclears]))
+        self.all_success_logs = [log for log in self.all_logs if log.success]
+        # Position in all_logs and all_success_logs by log id, instead of list.index
+        self.all_logs_idx = {log.id: idx for idx, log in enumerate(self.all_logs)}
+        self.all_success_logs_idx = {log.id: idx for idx, log in enumerate(self.all_success_logs)}
+
+    @staticmethod
+    def encounter_buckets(instance_logs: list[DpsLog]) -> dict[int, tuple[list[DpsLog], list[DpsLog]]]:
+        """(wipes, successes) per encounter nr, in start_time order."""
+        buckets = {}
+        for log in instance_logs:
+            wipes, successes = buckets.setdefault(log.encounter.nr, ([], []))
+            (successes if log.success else wipes).append(log)
+        return buckets
+
+
+def load_instance_clears(icgi: "InstanceClearGroupInteraction") -> list[InstanceClear]:
+    """Instance clears of the group with their logs, encounters, instances and emojis.
+    The number of queries doesn't depend on the number of logs.
+    """
+    return list(
+        icgi.icg_iclears_all.select_related("instance__emoji", "instance__instance_group").prefetch_related(
+            Prefetch(
+                "dps_logs",
+                queryset=DpsLog.objects.select_related(
+                    "encounter__emoji", "encounter__instance__instance_group"
+                ).order_by("start_time"),
+            )
+        )
+    )
+
+
 def _create_message_title(icgi: "InstanceClearGroupInteraction") -> str:
     """Header is the date and the total cleartime if all bosses are success"""
     icg = icgi.iclear_group
@@ -62,11 +105,10 @@ def _create_message_title(icgi: "InstanceClearGroupInteraction") -> str:
 
 def _create_log_delay_str(
     dpslog: DpsLog,
-    all_logs: list[DpsLog],
-    all_success_logs: list[DpsLog],
+    clear_group_logs: ClearGroupLogs,
     first_boss_tracker: FirstBossTracker,
-    encounter_wipes: QuerySet[DpsLog],
-    encounter_success: QuerySet[DpsLog],
+    encounter_wipes: list[DpsLog],
+    encounter_success: list[DpsLog],
 ) -> str:
     """Calculate the delay of the log with the previous logs in the cleargroup.
 
@@ -74,6 +116,8 @@ def _create_log_delay_str(
     "1:48" -> fight started 1min48 after other
     """
     delay_str = get_duration_str(0)  # Default no duration between previous and start log.
+    all_logs = clear_group_logs.all_logs
+    all_success_logs = clear_group_logs.all_success_logs
 
     if first_boss_tracker.is_first:
         # If there was a wipe on the first boss we calculate diff between start of
@@ -88,7 +132,7 @@ def _create_log_delay_str(
     else:
         # Calculate duration between start of kill run with previous kill run
         if dpslog.success:
-            all_success_logs_idx = all_success_logs.index(dpslog)
+            all_success_logs_idx = clear_group_logs.all_success_logs_idx[dpslog.id]
             diff_time = dpslog.start_time - (
                 all_success_logs[all_success_logs_idx - 1].start_time
                 + all_success_logs[all_success_logs_idx - 1].duration
@@ -97,21 +141,15 @@ def _create_log_delay_str(
 
         # If we dont have a success, we still need to calculate difference with previous log.
         elif len(encounter_wipes) > 0:
-            diff_time = (
-                dpslog.start_time
-                + dpslog.duration
-                - (
-                    all_logs[all_logs.index(dpslog) - len(encounter_wipes)].start_time
-                    + all_logs[all_logs.index(dpslog) - len(encounter_wipes)].duration
-                )
-            )
+            previous_log = all_logs[clear_group_logs.all_logs_idx[dpslog.id] - len(encounter_wipes)]
+            diff_time = dpslog.start_time + dpslog.duration - (previous_log.start_time + previous_log.duration)
 
             delay_str = get_duration_str(diff_time.seconds)
 
     return delay_str
 
 
-def _create_log_wipe_str(encounter_wipes: QuerySet[DpsLog]) -> str:
+def _create_log_wipe_str(encounter_wipes: list[DpsLog]) -> str:
     """Create the wipe str. This will add one wipe skull per wipe on an encounter.
     Clicking the skull will open a browser at the dps.report log.
 
@@ -134,9 +172,8 @@ def _create_log_wipe_str(encounter_wipes: QuerySet[DpsLog]) -> str:
 
 def _create_log_message_line(
     dpslog: DpsLog,
-    instance_logs: list[DpsLog],
-    all_success_logs: list[DpsLog],
-    all_logs: list[DpsLog],
+    encounter_buckets: dict[int, tuple[list[DpsLog], list[DpsLog]]],
+    clear_group_logs: ClearGroupLogs,
     first_boss_tracker: FirstBossTracker,
 ) -> str:
     r"""Full text line as shown on discord.
@@ -148,9 +185,8 @@ def _create_log_message_line(
     '<:ura:1310742374665683056><:r21_of40_slower42_1s:1240799615763222579>[Ura](https://dps.report/dummy_ura) (**4:50**)_+1:48_\n'
     """
 
-    # Filter wipes and success
-    encounter_wipes = [l for l in instance_logs if not l.success and l.encounter.nr == dpslog.encounter.nr]
-    encounter_success = [l for l in instance_logs if l.success and l.encounter.nr == dpslog.encounter.nr]
+    # Wipes and success of this encounter
+    encounter_wipes, encounter_success = encounter_buckets[dpslog.encounter.nr]
 
     if not dpslog.success:
         if encounter_success:
@@ -159,7 +195,7 @@ def _create_log_message_line(
             log_message_line = ""
             return log_message_line
 
-        if not (list(encounter_wipes).index(dpslog) + 1 == len(encounter_wipes)):
+        if encounter_wipes[-1] != dpslog:
             # There are only wipes. But we only create a message_line when the last
             # failed log is passed to this function
             log_message_line = ""
@@ -169,8 +205,7 @@ def _create_log_message_line(
 
     delay_str = _create_log_delay_str(
         dpslog=dpslog,
-        all_logs=all_logs,
-        all_success_logs=all_success_logs,
+        clear_group_logs=clear_group_logs,
         first_boss_tracker=first_boss_tracker,
         encounter_wipes=encounter_wipes,
         encounter_success=encounter_success,
@@ -193,7 +228,7 @@ def _create_log_message_line(
             #   - Cannot add text when there is a success as it will print multiple lines for
             #     the same encounter.
             #   - Also should only add multiple wipes on same boss once.
-            if list(encounter_wipes).index(dpslog) + 1 == len(encounter_wipes):
+            if encounter_wipes[-1] == dpslog:
                 # Build line without URL to dps.report.
                 log_message_line = f"{dpslog.encounter.emoji.discord_tag(dpslog.difficulty)}{rank_str}{dpslog.encounter.name}{dpslog.cm_str} (wipe)_+{delay_str}_{wipe_str}\n"
     return log_message_line
@@ -201,8 +236,7 @@ def _create_log_message_line(
 
 def _create_instance_header(
     iclear: InstanceClear,
-    all_success_logs: list[DpsLog],
-    all_logs: list[DpsLog],
+    clear_group_logs: ClearGroupLogs,
     first_boss_tracker: FirstBossTracker,
 ) -> Tuple[str, str]:
     r"""Create the header of an instance. For raid wings this would result in something like this;
@@ -233,13 +267,13 @@ def _create_instance_header(
     # If there are wipes these are added to the line as separete emoji's
     # Also calculate diff between logs (downtime)
     description_instance = ""
-    instance_logs = list(iclear.dps_logs.order_by("start_time"))
+    instance_logs = list(iclear.dps_logs.all())  # Prefetched, ordered on start_time
+    encounter_buckets = ClearGroupLogs.encounter_buckets(instance_logs)
     for log in instance_logs:
         log_message_line = _create_log_message_line(
             dpslog=log,
-            instance_logs=instance_logs,
-            all_success_logs=all_success_logs,
-            all_logs=all_logs,
+            encounter_buckets=encounter_buckets,
+            clear_group_logs=clear_group_logs,
             first_boss_tracker=first_boss_tracker,
         )
         if log_message_line != "":
@@ -256,15 +290,13 @@ def create_discord_message(icgi: "InstanceClearGroupInteraction") -> Tuple[str,
     """
     icg = icgi.iclear_group
 
-    # Find all logs
-    all_logs = list(chain(*[i.dps_logs.order_by("start_time") for i in icgi.icg_iclears_all]))
-    all_success_logs = list(
-        chain(*[i.dps_logs.filter(success=True).order_by("start_time") for i in icgi.icg_iclears_all])
-    )
+    # Load all logs of the group at once
+    clear_group_logs = ClearGroupLogs(load_instance_clears(icgi))
+    all_logs = clear_group_logs.all_logs
 
     logger.debug("")  # empty line for readability
     logger.debug(
-        f"Creating discord message for {icg.name} - {len(all_logs)} logs, {len(all_success_logs)} success logs, {len(icgi.icg_iclears_all)} wings"
+        f"Creating discord message for {icg.name} - {len(all_logs)} logs, {len(clear_group_logs.all_success_logs)} success logs, {len(clear_group_logs.iclears)} wings"
     )
 
     titles = {}
@@ -278,12 +310,11 @@ def create_discord_message(icgi: "InstanceClearGroupInteraction") -> Tuple[str,
 
     # Loop over the instance clears (Spirit Vale, Salvation Pass, Soto Strikes, etc)
     first_boss_tracker = FirstBossTracker()  # Tracks if a log is the first boss of all logs.
-    for iclear in icgi.icg_iclears_all:
+    for iclear in clear_group_logs.iclears:
         logger.debug(f"Creating header: {iclear}")
         title_instance, description_instance = _create_instance_header(
             iclear=iclear,
-            all_success_logs=all_success_logs,
-            all_logs=all_logs,
+            clear_group_logs=clear_group_logs,
             first_boss_tracker=first_boss_tracker,
         )
         # Add the field text to the embed. Raids and strikes have a
@@ -18,7 +18,6 @@ import logging
 import pandas as pd
 from gw2_logs.models import (
     DpsLog,
-    Emoji,
 )
 from scripts.discord_interaction.build_embeds import create_discord_embeds, create_discord_embeds_new
 from scripts.discord_interaction.message_helpers import (
@@ -27,6 +26,7 @@ from scripts.discord_interaction.message_helpers import (
 )
 from scripts.discord_interaction.send_message import Thread, create_or_update_discord_message
 from scripts.model_interactions.dpslog import DpsLogMessageBuilder
+from scripts.model_interactions.emoji_registry import EMOJIS
 from scripts.progression.base_progression_service import ProgressionService
 
 logger = logging.getLogger(__name__)
@@ -48,7 +48,7 @@ def _build_log_message_line_progression(progression_service: ProgressionService,
     elif dpslog.cm:
         url_emote = "☆"
     else:
-        url_emote = Emoji.objects.get(name="PepoHands").discord_tag_custom_name().format("normal_mode")
+        url_emote = EMOJIS.get(name="PepoHands").discord_tag_custom_name().format("normal_mode")
 
     if dpslog.url != "":
         url_emote_str = f"[{url_emote}]({dpslog.url})"
@@ -5,9 +5,8 @@ if __name__ == "__main__":
     django_setup.run()
 
 import logging
-from typing import Tuple
+from typing import TYPE_CHECKING, Tuple
 
-import discord
 import numpy as np
 from gw2_logs.models import (
     DpsLog,
@@ -17,6 +16,9 @@ from scripts.log_helpers import (
     create_discord_time,
 )
 
+if TYPE_CHECKING:
+    import discord
+
 logger = logging.getLogger(__name__)
 
 
@@ -81,7 +83,7 @@ def add_line_to_descriptions(
     return titles, descriptions, current_field
 
 
-def calculate_embed_size(embed: discord.Embed) -> int:
+def calculate_embed_size(embed: "discord.Embed") -> int:
     """Calculate the size of the embed in characters."""
     total_length = len(embed.author) + len(embed.title) + len(embed.description) + len(embed.footer)
     for field in embed.fields:
@@ -8,12 +8,9 @@ import datetime
 import logging
 from dataclasses import dataclass
 from functools import cached_property
-from typing import Optional, Tuple, Union
+from typing import TYPE_CHECKING, Optional, Tuple, Union
 
-import discord
 import numpy as np
-from discord import SyncWebhook
-from discord.utils import MISSING
 from gw2_logs.models import (
     DiscordMessage,
     Instance,
@@ -22,6 +19,11 @@ from gw2_logs.models import (
 )
 from scripts.discord_interaction.message_helpers import calculate_embed_size
 
+if TYPE_CHECKING:
+    # discord.py is imported when a message is sent, it takes long to import.
+    import discord
+    from discord import SyncWebhook
+
 logger = logging.getLogger(__name__)
 
 
@@ -41,14 +43,18 @@ class Webhook:
         self.url = webhook_url
 
     @cached_property
-    def webhook(self) -> SyncWebhook:
+    def webhook(self) -> "SyncWebhook":
+        from discord import SyncWebhook
+
         return SyncWebhook.from_url(self.url)
 
     def _validate_thread(
         self,
-        thread: Optional[discord.Thread] = None,
-    ) -> Union[Thread, discord.utils._MissingSentinel]:
+        thread: Optional["discord.Thread"] = None,
+    ) -> Union[Thread, "discord.utils._MissingSentinel"]:
         """Replace missing thread with the correct MISSING value."""
+        from discord.utils import MISSING
+
         if thread is None:
             thread = MISSING
         return thread
@@ -56,7 +62,7 @@ class Webhook:
     def edit_message(
         self,
         discord_message: DiscordMessage,
-        embeds_messages_list: list[discord.Embed],
+        embeds_messages_list: "list[discord.Embed]",
         thread: Optional[Thread] = None,
     ) -> None:
         """Edit message. If this fails, a new message must be created."""
@@ -80,7 +86,7 @@ class Webhook:
 
     def send_message(
         self,
-        embeds_messages_list: list[discord.Embed],
+        embeds_messages_list: "list[discord.Embed]",
         discord_message_name: str,
         thread: Optional[Thread] = None,
     ) -> DiscordMessage:
@@ -118,6 +124,8 @@ class Webhook:
             message += f" from date {discord_message.weekdate}"
         logger.info(message)
 
+        import discord
+
         # Delete message
         try:
             self.webhook.delete_message(discord_message.message_id)
@@ -135,7 +143,7 @@ class Webhook:
 def create_or_update_discord_message(
     group: Union[Instance, InstanceGroup, InstanceClearGroup],
     webhook_url: str,
-    embeds_messages_list: list[discord.Embed],
+    embeds_messages_list: "list[discord.Embed]",
     thread: Optional[Thread] = None,
 ) -> None:
     """
@@ -160,7 +168,7 @@ def create_or_update_discord_message(
     elif isinstance(group, InstanceClearGroup):
         discord_message_name = group.name
 
-    # Spread the embeds over multiple messages if required. 
+    # Spread the embeds over multiple messages if required.
     # message_ids may become e.g. [0, 0, 1], meaning the first two embeds go to the first
     # discord message and the 3rd goes to the second discord message.
     message_size = [calculate_embed_size(embed) for embed in embeds_messages_list]
@@ -197,7 +205,7 @@ def send_discord_message(
     discord_message: DiscordMessage,
     discord_message_name: str,  # discord_message.name
     webhook_url: str,
-    embeds_messages_list: list[discord.Embed],
+    embeds_messages_list: "list[discord.Embed]",
     thread: Optional[Thread] = None,
 ) -> Tuple[DiscordMessage, bool]:
     """
@@ -214,6 +222,8 @@ def send_discord_message(
     thread : Optional[Thread]
         Thread to send message in (from settings.LEADERBOARD_THREADS[itype])
     """
+    import discord
+
     webhook = Webhook(webhook_url)
 
     try:
@@ -238,7 +248,7 @@ def send_discord_message(
 def create_or_update_discord_message_current_week(
     iclear_group: InstanceClearGroup,
     webhook_url: str,  # html url to api webhook
-    embeds_messages_list: list[discord.Embed],
+    embeds_messages_list: "list[discord.Embed]",
     thread: Optional[Thread] = None,
 ):
     """Send message to discord. This will update or create the message in the current
@@ -257,6 +267,8 @@ def create_or_update_discord_message_current_week(
 
     # Only update current week.
     if weekdate == weekdate_current:
+        import discord
+
         webhook = Webhook(webhook_url)
 
         # Remove old messages from previous weeks from the channel
@@ -15,10 +15,10 @@ from gw2_logs.models import (
     Instance,
 )
 from scripts.log_helpers import (
-    BLANK_EMOTE,
     get_avg_duration_str,
     get_rank_duration_str,
 )
+from scripts.model_interactions.emoji_registry import EMOJIS
 from scripts.model_interactions.encounter import EncounterInteraction
 from scripts.model_interactions.instance import InstanceInteraction
 from scripts.model_interactions.instance_group import InstanceGroupInteraction
@@ -129,7 +129,7 @@ def _build_encounter_emojis(encounters: QuerySet[Encounter]) -> str:
         description += encounter.emoji.discord_tag()
 
     # Add empty spaces to align all rows
-    description += BLANK_EMOTE * max(0, 6 - len(encounters))
+    description += EMOJIS.discord_tag("blank") * max(0, 6 - len(encounters))
     return description
 
 
@@ -8,8 +8,8 @@ if __name__ == "__main__":
     django_setup.run()
 
 import logging
+from typing import TYPE_CHECKING
 
-import discord
 from django.utils import timezone
 from gw2_logs.models import (
     Instance,
@@ -29,12 +29,15 @@ from scripts.model_interactions.encounter import EncounterInteraction
 from scripts.model_interactions.instance import InstanceInteraction
 from scripts.model_interactions.instance_group import InstanceGroupInteraction
 
+if TYPE_CHECKING:
+    import discord
+
 logger = logging.getLogger(__name__)
 
 
 def create_instance_leaderboard_embed(
     instance_interaction: InstanceInteraction,
-) -> discord.Embed:
+) -> "discord.Embed":
     """
     Create Discord embed for single instance (e.g. Spirit Vale) leaderboard.
 
@@ -52,6 +55,8 @@ def create_instance_leaderboard_embed(
     discord.Embed
         Discord embed ready to send
     """
+    import discord
+
     title = build_instance_title(instance=instance_interaction.instance)
 
     description = build_instance_cleartime_row(instance_interaction=instance_interaction)
@@ -71,7 +76,7 @@ def create_instance_leaderboard_embed(
     )
 
 
-def create_fullclear_leaderboard_embed(instance_group_interaction: InstanceGroupInteraction) -> discord.Embed:
+def create_fullclear_leaderboard_embed(instance_group_interaction: InstanceGroupInteraction) -> "discord.Embed":
     """
     Create Discord embed for full clear leaderboard.
 
@@ -87,6 +92,8 @@ def create_fullclear_leaderboard_embed(instance_group_interaction: InstanceGroup
     discord.Embed
         Full clear leaderboard embed with footer and timestamp
     """
+    import discord
+
     # Initialize objects
     instances = Instance.objects.filter(instance_group=instance_group_interaction.instance_group).order_by("nr")
 
@@ -115,7 +122,7 @@ def create_fullclear_leaderboard_embed(instance_group_interaction: InstanceGroup
     return embed
 
 
-def create_navigation_embed(instance_type: str, leaderboard_thread_url: str) -> discord.Embed:
+def create_navigation_embed(instance_type: str, leaderboard_thread_url: str) -> "discord.Embed":
     """
     Create navigation embed for instance type leaderboards.
 
@@ -132,6 +139,8 @@ def create_navigation_embed(instance_type: str, leaderboard_thread_url: str) ->
         Navigation embed with links to all leaderboards
     """
 
+    import discord
+
     # Title mapping
     titles = {
         "raid": "📊 Raid Leaderboards",
@@ -6,52 +6,58 @@ if __name__ == "__main__":
 
     django_setup.run()
 
+import bisect
 import datetime
 import logging
 import re
+import statistics
 import time
 from itertools import chain
 from pathlib import Path
-from typing import Tuple, Union
+from typing import Optional, Tuple, Union
 
-import numpy as np
-import pandas as pd
 import pytz
 from django.conf import settings
 from gw2_logs.models import (
     DpsLog,
-    Emoji,
     Encounter,
     InstanceClear,
     InstanceClearGroup,
     InstanceGroup,
 )
+from scripts.model_interactions.emoji_registry import EMOJIS, LazyEmotes
+from scripts.model_interactions.rank_index import RankInfo
 from tzlocal import get_localzone
 
 logger = logging.getLogger(__name__)
 
-WIPE_EMOTES = {
-    0: Emoji.objects.get(name="wipe 13").discord_tag_custom_name(),  # OLC can still be bugged and give 0 health.
-    1: Emoji.objects.get(name="wipe 13").discord_tag_custom_name(),  # Between 0 and 12.5%
-    2: Emoji.objects.get(name="wipe 25").discord_tag_custom_name(),
-    3: Emoji.objects.get(name="wipe 38").discord_tag_custom_name(),
-    4: Emoji.objects.get(name="wipe 50").discord_tag_custom_name(),
-    5: Emoji.objects.get(name="wipe 63").discord_tag_custom_name(),
-    6: Emoji.objects.get(name="wipe 75").discord_tag_custom_name(),
-    7: Emoji.objects.get(name="wipe 88").discord_tag_custom_name(),
-    8: Emoji.objects.get(name="wipe 100").discord_tag_custom_name(),  # Full health
-}
+# Emote dicts are built on first use with a single emoji query, see emoji_registry.
+WIPE_EMOTES = LazyEmotes(
+    lambda: {
+        0: EMOJIS.get(name="wipe 13").discord_tag_custom_name(),  # OLC can still be bugged and give 0 health.
+        1: EMOJIS.get(name="wipe 13").discord_tag_custom_name(),  # Between 0 and 12.5%
+        2: EMOJIS.get(name="wipe 25").discord_tag_custom_name(),
+        3: EMOJIS.get(name="wipe 38").discord_tag_custom_name(),
+        4: EMOJIS.get(name="wipe 50").discord_tag_custom_name(),
+        5: EMOJIS.get(name="wipe 63").discord_tag_custom_name(),
+        6: EMOJIS.get(name="wipe 75").discord_tag_custom_name(),
+        7: EMOJIS.get(name="wipe 88").discord_tag_custom_name(),
+        8: EMOJIS.get(name="wipe 100").discord_tag_custom_name(),  # Full health
+    }
+)
 
 EMBED_COLOUR = {
     "raid": 7930903,
     "strike": 6603422,
     "fractal": 5512822,
 }
-PLAYER_EMOTES = {
-    "core": Emoji.objects.get(name="core").discord_tag(),
-    "friend": Emoji.objects.get(name="friend").discord_tag(),
-    "pug": Emoji.objects.get(name="pug").discord_tag(),
-}
+PLAYER_EMOTES = LazyEmotes(
+    lambda: {
+        "core": EMOJIS.get(name="core").discord_tag(),
+        "friend": EMOJIS.get(name="friend").discord_tag(),
+        "pug": EMOJIS.get(name="pug").discord_tag(),
+    }
+)
 
 
 def create_rank_emote_dict(custom_emoji_name: bool, invalid: bool):
@@ -64,23 +70,26 @@ def create_rank_emote_dict(custom_emoji_name: bool, invalid: bool):
         invalid_str = " invalid"
 
     d = {
-        0: f"{getattr(Emoji.objects.get(name=f'first{invalid_str}'), tag)()}",
-        1: f"{getattr(Emoji.objects.get(name=f'second{invalid_str}'), tag)()}",
-        2: f"{getattr(Emoji.objects.get(name=f'third{invalid_str}'), tag)()}",
-        "above_average": f"{Emoji.objects.get(name=f'above average{invalid_str}').discord_tag_custom_name()}".format(
+        0: f"{getattr(EMOJIS.get(name=f'first{invalid_str}'), tag)()}",
+        1: f"{getattr(EMOJIS.get(name=f'second{invalid_str}'), tag)()}",
+        2: f"{getattr(EMOJIS.get(name=f'third{invalid_str}'), tag)()}",
+        "above_average": f"{EMOJIS.get(name=f'above average{invalid_str}').discord_tag_custom_name()}".format(
             settings.MEAN_OR_MEDIAN
         ),
-        "below_average": f"{Emoji.objects.get(name=f'below average{invalid_str}').discord_tag_custom_name()}".format(
+        "below_average": f"{EMOJIS.get(name=f'below average{invalid_str}').discord_tag_custom_name()}".format(
             settings.MEAN_OR_MEDIAN
         ),
-        "average": f"{Emoji.objects.get(name=f'average{invalid_str}').discord_tag_custom_name()}".format(
+        "average": f"{EMOJIS.get(name=f'average{invalid_str}').discord_tag_custom_name()}".format(
             settings.MEAN_OR_MEDIAN
         ),
-        "emboldened": f"{Emoji.objects.get(name='emboldened').discord_tag()}",
+        "emboldened": f"{EMOJIS.get(name='emboldened').discord_tag()}",
     }
     return d
 
 
+RANK_BINS_PERCENTILE_ITEMS = [20, 40, 50, 60, 70, 80, 90, 100]
+
+
 def create_rank_emote_dict_percentiles(custom_emoji_name: bool, invalid: bool) -> Tuple[dict, list]:
     tag = "discord_tag"
     if custom_emoji_name:
@@ -90,27 +99,27 @@ def create_rank_emote_dict_percentiles(custom_emoji_name: bool, invalid: bool) -
     if invalid:
         invalid_str = " invalid"
 
-    rank_bins_percentile = [20, 40, 50, 60, 70, 80, 90, 100]
+    rank_bins_percentile = RANK_BINS_PERCENTILE_ITEMS
 
     rank_emotes = {
-        0: f"{getattr(Emoji.objects.get(name='1_junk'), tag)()}".format("bin20_r{}_of{}"),
-        1: f"{getattr(Emoji.objects.get(name='2_basic'), tag)()}".format("bin40_r{}_of{}"),
-        2: f"{getattr(Emoji.objects.get(name='3_fine'), tag)()}".format("bin50_r{}_of{}"),
-        3: f"{getattr(Emoji.objects.get(name='4_masterwork'), tag)()}".format("bin60_r{}_of{}"),
-        4: f"{getattr(Emoji.objects.get(name='5_rare'), tag)()}".format("bin70_r{}_of{}"),
-        5: f"{getattr(Emoji.objects.get(name='6_exotic'), tag)()}".format("bin80_r{}_of{}"),
-        6: f"{getattr(Emoji.objects.get(name='7_ascended'), tag)()}".format("bin90_r{}_of{}"),
-        7: f"{getattr(Emoji.objects.get(name='8_legendary'), tag)()}".format("bin100_r{}_of{}"),
-        "above_average": f"{Emoji.objects.get(name=f'above average{invalid_str}').discord_tag_custom_name()}".format(
+        0: f"{getattr(EMOJIS.get(name='1_junk'), tag)()}".format("bin20_r{}_of{}"),
+        1: f"{getattr(EMOJIS.get(name='2_basic'), tag)()}".format("bin40_r{}_of{}"),
+        2: f"{getattr(EMOJIS.get(name='3_fine'), tag)()}".format("bin50_r{}_of{}"),
+        3: f"{getattr(EMOJIS.get(name='4_masterwork'), tag)()}".format("bin60_r{}_of{}"),
+        4: f"{getattr(EMOJIS.get(name='5_rare'), tag)()}".format("bin70_r{}_of{}"),
+        5: f"{getattr(EMOJIS.get(name='6_exotic'), tag)()}".format("bin80_r{}_of{}"),
+        6: f"{getattr(EMOJIS.get(name='7_ascended'), tag)()}".format("bin90_r{}_of{}"),
+        7: f"{getattr(EMOJIS.get(name='8_legendary'), tag)()}".format("bin100_r{}_of{}"),
+        "above_average": f"{EMOJIS.get(name=f'above average{invalid_str}').discord_tag_custom_name()}".format(
             settings.MEAN_OR_MEDIAN
         ),
-        "below_average": f"{Emoji.objects.get(name=f'below average{invalid_str}').discord_tag_custom_name()}".format(
+        "below_average": f"{EMOJIS.get(name=f'below average{invalid_str}').discord_tag_custom_name()}".format(
             settings.MEAN_OR_MEDIAN
         ),
-        "average": f"{Emoji.objects.get(name=f'average{invalid_str}').discord_tag_custom_name()}".format(
+        "average": f"{EMOJIS.get(name=f'average{invalid_str}').discord_tag_custom_name()}".format(
             settings.MEAN_OR_MEDIAN
         ),
-        "emboldened": f"{Emoji.objects.get(name='emboldened').discord_tag()}",
+        "emboldened": f"{EMOJIS.get(name='emboldened').discord_tag()}",
     }
     return rank_emotes, rank_bins_percentile
 
@@ -126,18 +135,18 @@ def create_rank_emote_dict_newgame(custom_emoji_name: bool, invalid: bool):
         invalid_str = " invalid"
 
     d = {
-        0: f"{getattr(Emoji.objects.get(name='red_full_medal'), tag)()}".format("r{}_of{}_slower{}s"),
-        1: f"{getattr(Emoji.objects.get(name='red_line_medal'), tag)()}".format("r{}_of{}_slower{}s"),
-        2: f"{getattr(Emoji.objects.get(name='green_line_medal'), tag)()}".format("r{}_of{}_slower{}s"),
-        3: f"{getattr(Emoji.objects.get(name='green_full_medal'), tag)()}".format("r{}_of{}_slower{}s"),
-        "above_average": f"{Emoji.objects.get(name=f'above average{invalid_str}').discord_tag_custom_name()}".format(
+        0: f"{getattr(EMOJIS.get(name='red_full_medal'), tag)()}".format("r{}_of{}_slower{}s"),
+        1: f"{getattr(EMOJIS.get(name='red_line_medal'), tag)()}".format("r{}_of{}_slower{}s"),
+        2: f"{getattr(EMOJIS.get(name='green_line_medal'), tag)()}".format("r{}_of{}_slower{}s"),
+        3: f"{getattr(EMOJIS.get(name='green_full_medal'), tag)()}".format("r{}_of{}_slower{}s"),
+        "above_average": f"{EMOJIS.get(name=f'above average{invalid_str}').discord_tag_custom_name()}".format(
             settings.MEAN_OR_MEDIAN
         ),
-        "below_average": f"{Emoji.objects.get(name=f'below average{invalid_str}').discord_tag_custom_name()}".format(
+        "below_average": f"{EMOJIS.get(name=f'below average{invalid_str}').discord_tag_custom_name()}".format(
             settings.MEAN_OR_MEDIAN
         ),
-        "average": f"{Emoji.objects.get(name='blank').discord_tag_custom_name()}".format(settings.MEAN_OR_MEDIAN),
-        "emboldened": f"{Emoji.objects.get(name='emboldened').discord_tag()}",
+        "average": f"{EMOJIS.get(name='blank').discord_tag_custom_name()}".format(settings.MEAN_OR_MEDIAN),
+        "emboldened": f"{EMOJIS.get(name='emboldened').discord_tag()}",
     }
     return d
 
@@ -153,25 +162,27 @@ else:
         f"MEDALS_TYPE = {settings.MEDALS_TYPE} in .env is unknown. Choose from ['original', 'percentile', 'newgame']"
     )
 
-RANK_EMOTES = rank_func(custom_emoji_name=False, invalid=False)
-RANK_EMOTES_INVALID = rank_func(custom_emoji_name=False, invalid=True)
-RANK_EMOTES_CUSTOM = rank_func(custom_emoji_name=True, invalid=False)
-RANK_EMOTES_CUSTOM_INVALID = rank_func(custom_emoji_name=True, invalid=True)
+RANK_EMOTES = LazyEmotes(lambda: rank_func(custom_emoji_name=False, invalid=False))
+RANK_EMOTES_INVALID = LazyEmotes(lambda: rank_func(custom_emoji_name=False, invalid=True))
+RANK_EMOTES_CUSTOM = LazyEmotes(lambda: rank_func(custom_emoji_name=True, invalid=False))
+RANK_EMOTES_CUSTOM_INVALID = LazyEmotes(lambda: rank_func(custom_emoji_name=True, invalid=True))
 
-RANK_EMOTES_CUPS = {
-    1: Emoji.objects.get(name="trophy_gold").discord_tag_custom_name().format("r{}_of{}_faster{}s"),
-    2: Emoji.objects.get(name="trophy_silver").discord_tag_custom_name().format("r{}_of{}_slower{}s"),
-    3: Emoji.objects.get(name="trophy_bronze").discord_tag_custom_name().format("r{}_of{}_slower{}s"),
-}
-
-RANK_EMOTES_CUPS_PROGRESSION = {
-    1: Emoji.objects.get(name="trophy_gold").discord_tag_custom_name().format("r1_of{}"),
-    2: Emoji.objects.get(name="trophy_silver").discord_tag_custom_name().format("r2_of{}"),
-    3: Emoji.objects.get(name="trophy_bronze").discord_tag_custom_name().format("r3_of{}"),
-}
+RANK_EMOTES_CUPS = LazyEmotes(
+    lambda: {
+        1: EMOJIS.get(name="trophy_gold").discord_tag_custom_name().format("r{}_of{}_faster{}s"),
+        2: EMOJIS.get(name="trophy_silver").discord_tag_custom_name().format("r{}_of{}_slower{}s"),
+        3: EMOJIS.get(name="trophy_bronze").discord_tag_custom_name().format("r{}_of{}_slower{}s"),
+    }
+)
 
+RANK_EMOTES_CUPS_PROGRESSION = LazyEmotes(
+    lambda: {
+        1: EMOJIS.get(name="trophy_gold").discord_tag_custom_name().format("r1_of{}"),
+        2: EMOJIS.get(name="trophy_silver").discord_tag_custom_name().format("r2_of{}"),
+        3: EMOJIS.get(name="trophy_bronze").discord_tag_custom_name().format("r3_of{}"),
+    }
+)
 
-BLANK_EMOTE = Emoji.objects.get(name="blank").discord_tag()
 # Combine raids and strikes into the same group.
 
 WEBHOOKS = settings.WEBHOOKS
@@ -206,7 +217,7 @@ def create_discord_time(dt: datetime.datetime):
 
 def get_duration_str(seconds: int, add_space: bool = False):
     """Get seconds with datetime.timedelta.seconds"""
-    if pd.isna(seconds):
+    if seconds is None or seconds != seconds:  # None or NaN
         mins, secs = 0, 0
     else:
         mins, secs = divmod(seconds, 60)
@@ -255,29 +266,13 @@ def get_emboldened_wing(log_date: datetime.datetime):
     return current_wing
 
 
-def make_duration_str(group, rank: int, indiv):
-    try:
-        if rank != 1:
-            rank = 0
-
-        if rank == 1:
-            dur_sec = (group[rank].duration - indiv.duration).seconds
-            dur_micro = (group[rank].duration - indiv.duration).microseconds / 1e6
-        else:
-            dur_sec = (indiv.duration - group[rank].duration).seconds
-            dur_micro = (indiv.duration - group[rank].duration).microseconds / 1e6
-
-        dur = str(round(dur_sec + dur_micro, 1)).replace(".", "_")
-    except IndexError:
-        dur = "_inf_"
-    return dur
-
-
 def get_rank_emote(
     indiv: DpsLog | InstanceClear | InstanceClearGroup,
-    group_list: list[DpsLog] | list[InstanceClear] | list[InstanceClearGroup],
+    group_list: Optional[list[DpsLog] | list[InstanceClear] | list[InstanceClearGroup]] = None,
+    *,
     core_minimum: int,
     custom_emoji_name: bool = False,
+    rank_info: Optional[RankInfo] = None,
 ):
     """Find the rank of the indiv in the group.
 
@@ -289,11 +284,15 @@ def get_rank_emote(
         Sorted list on duration of dpslog, instanceclear or instancleargroup.
         Used to find the index of the provided idividual log to see how it compared.
         Fastest log is first in the list, so filter with .order_by("duration")
+        Not needed when rank_info is given.
     core_minimum : int
         If the player count is below the core_minimum, a different emoji is shown.
     custom_emoji_name: bool
         Return emoji with a format option for the emoji. The returned rank_str
         should be formatted e.g.; rank_str.format("custom_name").
+    rank_info: RankInfo, default None
+        Rank of indiv from the RANK_INDEX, instead of looking it up in group_list.
+        When neither is given, the average emote is returned.
     """
 
     emboldened = False
@@ -315,39 +314,37 @@ def get_rank_emote(
     # Other ranks
     if emboldened:
         rank_str = emote_dict["emboldened"]
-    elif not indiv.success:
-        rank_str = emote_dict["average"]  # dault rank string
+    elif not indiv.success or (rank_info is None and group_list is None):
+        rank_str = emote_dict["average"]  # dault rank string, also when there is nothing to rank against
     elif indiv.success:
-        rank = group_list.index(indiv) + 1
+        if rank_info is None:
+            rank_info = RankInfo.from_sorted_group(indiv, group_list)
+        rank = rank_info.rank
 
         # Calculate seconds slower or for fastest run speed improvement over previous ranked log;
-        dur = make_duration_str(group_list, rank, indiv)
+        dur = rank_info.duration_str(indiv.duration)
 
         # Top 3
         if rank in [1, 2, 3]:
             # e.g. r1_of10_faster12_1s -> 1.2 seconds faster than rank 2, rank 1 of 10 logs
-            rank_str = RANK_EMOTES_CUPS[rank].format(rank, len(group_list), dur)
+            rank_str = RANK_EMOTES_CUPS[rank].format(rank, rank_info.count, dur)
 
         else:
             if indiv.success:
                 if settings.MEDALS_TYPE == "original":
-                    if indiv.duration.seconds < (
-                        getattr(np, settings.MEAN_OR_MEDIAN)([i.duration.seconds for i in group_list]) - 5
-                    ):
+                    if indiv.duration.seconds < rank_info.center_seconds - 5:
                         rank_str = emote_dict["above_average"]
-                    elif indiv.duration.seconds > (
-                        getattr(np, settings.MEAN_OR_MEDIAN)([i.duration.seconds for i in group_list]) + 5
-                    ):
+                    elif indiv.duration.seconds > rank_info.center_seconds + 5:
                         rank_str = emote_dict["below_average"]
 
                 else:
-                    inverse_rank = group_list[::-1].index(indiv)
-                    percentile_rank = (inverse_rank) / len(group_list) * 100
-                    rank_binned = np.searchsorted(settings.RANK_BINS_PERCENTILE, percentile_rank, side="left")
+                    inverse_rank = rank_info.count - rank
+                    percentile_rank = (inverse_rank) / rank_info.count * 100
+                    rank_binned = bisect.bisect_left(settings.RANK_BINS_PERCENTILE, percentile_rank)
                     # Fill percrank and samples
                     rank_str = RANK_EMOTES_CUSTOM[rank_binned].format(
                         rank,
-                        len(group_list),
+                        rank_info.count,
                         # int(percentile_rank),
                         dur,
                     )
@@ -359,6 +356,8 @@ def create_folder_names(itype_groups: list = None) -> list:
     """Create list of possible folder names for the selected itype_group.
     This makes it possible to filter logs before uploading them.
     """
+    import pandas as pd  # Only needed here, keeps the import of log_helpers light
+
     if itype_groups in [None, []]:
         itype_groups = [i[0] for i in InstanceGroup.objects.all().values_list("name")]
 
@@ -407,7 +406,7 @@ def get_rank_duration_str(indiv, group: list, itype, pretty_time: bool = False,
 
 def get_avg_duration_str(group) -> str:
     """Create string with rank emote and average duration"""
-    avg_time = int(getattr(np, settings.MEAN_OR_MEDIAN)([e[0].seconds for e in group.values_list("duration")]))
+    avg_time = int(getattr(statistics, settings.MEAN_OR_MEDIAN)([e[0].seconds for e in group.values_list("duration")]))
     avg_duration_str = get_duration_str(avg_time, add_space=True)
     return f"{RANK_EMOTES['average']}`{avg_duration_str}`"
 
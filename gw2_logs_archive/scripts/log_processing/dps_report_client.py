@@ -4,6 +4,13 @@
 This module contains helpers to upload local Elite Insights logfiles to
 dps.report and to fetch metadata/detailed info.
 
+`DpsReportClient` uses one pooled keep-alive session for all requests of the
+process. `AsyncDpsReportClient` is the asyncio variant for fetching many
+metadata/json requests at once.
+
+Responses of getUploadMetadata and getJson are stored gzipped in a response cache
+on disk. A report never changes once it is generated, so requesting the same
+report again is served locally.
 """
 
 if __name__ == "__main__":
@@ -12,22 +19,161 @@ if __name__ == "__main__":
     django_setup.run()
 
 
+import asyncio
+import datetime
+import gzip
 import json
 import logging
-import time
+import random
+import re
+import threading
+from email.utils import parsedate_to_datetime
 from pathlib import Path
-from typing import Literal, Optional, Tuple
+from typing import Any, Literal, Optional, Tuple
 
+import aiohttp
 import requests
 from django.conf import settings
+from requests.adapters import HTTPAdapter
 from scripts.log_helpers import (
     get_log_path_view,
 )
+from scripts.utilities.disk_cache import DiskCache
+from scripts.utilities.evtc_header import read_evtc_header
 from scripts.utilities.metadata_parsed import MetadataParsed
 from scripts.utilities.parsed_log import DetailedParsedLog
+from scripts.utilities.rate_limiter import TokenBucket
+from urllib3.exceptions import NewConnectionError
 
 logger = logging.getLogger(__name__)
 
+# Connections kept open to dps.report, also the number of parallel async requests.
+POOL_SIZE = 8
+
+# Pacing of the requests to dps.report, shared by all clients and threads in the process.
+# Uploads make dps.report parse the log and are paced strictly. Metadata and json requests
+# are cheap, they only get a high limit and slow down on 429.
+DPS_REPORT_UPLOAD_RATE_PER_SECOND = 0.5
+DPS_REPORT_UPLOAD_BURST = 3
+DPS_REPORT_GET_RATE_PER_SECOND = 10
+DPS_REPORT_GET_BURST = POOL_SIZE
+UPLOAD_RATE_LIMITER = TokenBucket(rate=DPS_REPORT_UPLOAD_RATE_PER_SECOND, capacity=DPS_REPORT_UPLOAD_BURST)
+GET_RATE_LIMITER = TokenBucket(rate=DPS_REPORT_GET_RATE_PER_SECOND, capacity=DPS_REPORT_GET_BURST)
+
+# Retries when dps.report is busy (429 Too Many Requests, 503 Service Unavailable)
+RETRY_STATUS_CODES = (429, 503)
+MAX_RETRIES = 4
+BACKOFF_BASE_SECONDS = 2
+BACKOFF_MAX_SECONDS = 60
+# An upload that timed out is looked up in the uploads of the user token when its encounter
+# time is within this many seconds of the log start.
+UPLOAD_MATCH_SECONDS = 5
+# (connect, read) timeouts in seconds. An upload waits until dps.report has parsed the log.
+REQUEST_TIMEOUT = (10, 60)
+UPLOAD_TIMEOUT = (10, 300)
+
+# Reports are immutable, the ttl only cleans up reports that are not requested anymore.
+RESPONSE_CACHE_TTL_SECONDS = 90 * 24 * 60 * 60
+
+# (metadata, move_reason) returned by DpsReportClient.upload_log
+UploadResult = Tuple[Optional[MetadataParsed], Literal["failed", "forbidden", None]]
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_response_cache: Optional[DiskCache] = None
+
+
+def get_session() -> requests.Session:
+    """Keep-alive session shared by all DpsReportClients, so connections to dps.report are reused."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+    return _session
+
+
+def get_response_cache() -> DiskCache:
+    """Response cache shared by all clients of the process."""
+    global _response_cache
+    with _session_lock:
+        if _response_cache is None:
+            _response_cache = DiskCache(
+                cache_dir=settings.DPS_REPORT_CACHE_DIR,
+                max_size_mb=settings.DPS_REPORT_CACHE_MAX_SIZE_MB,
+                ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+            )
+    return _response_cache
+
+
+def _response_cache_key(endpoint: str, report_id: Optional[str] = None, url: Optional[str] = None) -> Optional[str]:
+    """Key of a response, e.g. 'getJson_abcd-20260122-200000_vg'. The report id is
+    the last part of the permalink, so both ways of requesting share the key.
+    """
+    if report_id is None and url is not None:
+        report_id = url.rstrip("/").rsplit("/", 1)[-1]
+    if not report_id:
+        return None
+    endpoint_name = endpoint.rstrip("/").rsplit("/", 1)[-1]
+    report_id = re.sub(r"[^\w-]", "_", report_id)
+    return f"{endpoint_name}_{report_id}"
+
+
+def _read_cached_json(cache: Optional[DiskCache], key: Optional[str]) -> Optional[Any]:
+    if cache is None or key is None:
+        return None
+    path = cache.get(key)
+    if path is None:
+        return None
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Cached response {path.name} unreadable: {e}")
+        return None
+
+
+def _write_cached_json(cache: Optional[DiskCache], key: Optional[str], data: Any) -> None:
+    if cache is None or key is None:
+        return
+    cache.put_bytes(key, gzip.compress(json.dumps(data).encode("utf-8")), suffix=".json.gz")
+
+
+def _failed_to_connect(error: requests.RequestException) -> bool:
+    """Check if the request never reached dps.report, then sending it again cant create a second report."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if isinstance(error, requests.ConnectionError) and error.args:
+        return isinstance(getattr(error.args[0], "reason", None), NewConnectionError)
+    return False
+
+
+def _backoff_seconds(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Wait from the Retry-After header, otherwise exponential backoff with jitter."""
+    delay = _retry_after_seconds(retry_after)
+    if delay is None:
+        delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2**attempt) + random.uniform(0, 1)
+    return delay
+
+
+def _retry_after_seconds(retry_after: Optional[str]) -> Optional[float]:
+    """Read the Retry-After header, either in seconds or as http date."""
+    if retry_after is None:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
 
 class DpsReportEndpoints:
     """Endpoints for dps.report uploads and metadata requests."""
@@ -37,6 +183,7 @@ class DpsReportEndpoints:
             base_url += "/"
         self.base = base_url
         self.upload = self.base + "uploadContent"
+        self.uploads = self.base + "getUploads"
         self.metadata = self.base + "getUploadMetadata"
         self.detailed_metadata = self.base + "getJson"
 
@@ -45,12 +192,106 @@ class DpsReportClient:
     """Upload logs to dps.report and request metadata.
     Uploads can be done with a path to a local log file.
     Metadata can be requested with either a report_id or the dps.report url.
+
+    Parameters
+    ----------
+    upload_rate_limiter : TokenBucket, default UPLOAD_RATE_LIMITER
+        Pacing of the uploads, shared with the other clients.
+    get_rate_limiter : TokenBucket, default GET_RATE_LIMITER
+        Pacing of the metadata and json requests, shared with the other clients.
+    session : requests.Session, default None
+        Defaults to the session shared by all clients.
+    response_cache : DiskCache, default None
+        Cache of metadata/json responses. Defaults to the cache shared by all clients.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        upload_rate_limiter: TokenBucket = UPLOAD_RATE_LIMITER,
+        get_rate_limiter: TokenBucket = GET_RATE_LIMITER,
+        session: Optional[requests.Session] = None,
+        response_cache: Optional[DiskCache] = None,
+    ):
         self.endpoints = DpsReportEndpoints()
+        self.upload_rate_limiter = upload_rate_limiter
+        self.get_rate_limiter = get_rate_limiter
+        self.session = session or get_session()
+        self.response_cache = response_cache or get_response_cache()
+        self._timed_out_uploads: set[Path] = set()  # dps.report might have made a report of these
+
+    def _request(self, method: Literal["get", "post"], url: str, **kwargs) -> requests.Response:
+        """Send a request paced by the rate limiter of its method.
+        On 429, 503 and connection errors the request is retried, waiting for the Retry-After
+        header when dps.report sends it, otherwise with exponential backoff. The wait also
+        pauses the other threads that share the rate limiter.
+        A POST is only sent again when it never reached dps.report, otherwise a second
+        report could be made.
+        """
+        rate_limiter = self.upload_rate_limiter if method == "post" else self.get_rate_limiter
+        kwargs.setdefault("timeout", REQUEST_TIMEOUT)
+        for attempt in range(MAX_RETRIES + 1):
+            rate_limiter.acquire()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == MAX_RETRIES or (method == "post" and not _failed_to_connect(e)):
+                    raise
+                delay = _backoff_seconds(attempt)
+                logger.warning(f"{type(e).__name__} for dps.report, retrying in {delay:.1f}s")
+                rate_limiter.pause(delay)
+                continue
+
+            if response.status_code not in RETRY_STATUS_CODES or attempt == MAX_RETRIES:
+                return response
+
+            delay = _backoff_seconds(attempt, retry_after=response.headers.get("Retry-After"))
+            logger.warning(f"Code {response.status_code} from dps.report, retrying in {delay:.1f}s")
+            rate_limiter.pause(delay)
+        return response
+
+    def find_uploaded_report(self, log_path: Path) -> Optional[MetadataParsed]:
+        """Find the report of a log in the recent uploads of the user token.
+        Matched on boss id and start time from the evtc header.
+        """
+        try:
+            header = read_evtc_header(log_path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"{get_log_path_view(log_path)}: Can't look up the upload, header not readable: {e}")
+            return None
+        if header.start_time is None:
+            return None
 
-    def upload_log(self, log_path: Path) -> Tuple[Optional[MetadataParsed], Literal["failed", "forbidden", None]]:
+        response = self._request("get", self.endpoints.uploads, params={"userToken": settings.DPS_REPORT_USERTOKEN})
+        if response.status_code != 200:
+            logger.error(f"Code {response.status_code}: Failed retrieving the recent uploads")
+            return None
+        for upload in response.json().get("uploads", []):
+            encounter_time = upload.get("encounterTime")
+            if (
+                upload.get("encounter", {}).get("bossId") == header.boss_id
+                and encounter_time is not None
+                and abs(encounter_time - header.start_time.timestamp()) <= UPLOAD_MATCH_SECONDS
+            ):
+                return MetadataParsed(data=upload)
+        return None
+
+    def _get_json(self, endpoint: str, report_id: Optional[str], url: Optional[str]) -> tuple[int, Optional[Any]]:
+        """GET a json from dps.report, from the response cache when it was requested before.
+        Returns the status code and the json body (None when the status is not 200).
+        """
+        key = _response_cache_key(endpoint, report_id=report_id, url=url)
+        data = _read_cached_json(self.response_cache, key)
+        if data is not None:
+            return 200, data
+
+        response = self._request("get", endpoint, params={"id": report_id, "permalink": url})
+        if response.status_code != 200:
+            return response.status_code, None
+        data = response.json()
+        _write_cached_json(self.response_cache, key, data)
+        return response.status_code, data
+
+    def upload_log(self, log_path: Path) -> UploadResult:
         """Upload log to dps.report, a.dps.report or b.dps.report"""
 
         data = {
@@ -60,11 +301,22 @@ class DpsReportClient:
             "anonymous": False,
             "detailedwvw": False,
         }
-        with open(log_path, "rb") as f:
-            files = {"file": f}
+        # An earlier upload timed out after dps.report got the log, dont make a second report.
+        if log_path in self._timed_out_uploads:
+            metadata = self.find_uploaded_report(log_path)
+            if metadata is not None:
+                logger.info(f"{get_log_path_view(log_path)}: Found the report of the upload that timed out")
+                self._timed_out_uploads.discard(log_path)
+                return metadata, None
 
-            time.sleep(1)  # To avoid hitting rate limits
-            response = requests.post(self.endpoints.upload, files=files, data=data)
+        # Read once, a retry needs to send the file again.
+        files = {"file": (Path(log_path).name, Path(log_path).read_bytes())}
+        try:
+            response = self._request("post", self.endpoints.upload, files=files, data=data, timeout=UPLOAD_TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout):
+            self._timed_out_uploads.add(log_path)
+            raise
+        self._timed_out_uploads.discard(log_path)
 
         if response.status_code == 200:  # All good
             metadata = response.json()
@@ -98,13 +350,10 @@ class DpsReportClient:
 
     def request_metadata(self, report_id: Optional[str] = None, url: Optional[str] = None) -> Optional[MetadataParsed]:
         """Get metadata from dps.report if an url is available. Either provide report_id or url."""
-        data = {"id": report_id, "permalink": url}
-        response = requests.get(self.endpoints.metadata, params=data)
-
-        if response.status_code != 200:
-            logger.error(f"Code {response.status_code}: Failed retrieving log {url}")
+        status, metadata = self._get_json(self.endpoints.metadata, report_id=report_id, url=url)
+        if status != 200:
+            logger.error(f"Code {status}: Failed retrieving log {url}")
             return None
-        metadata = response.json()
         return MetadataParsed(data=metadata)
 
     def request_detailed_info(
@@ -113,9 +362,111 @@ class DpsReportClient:
         """Upload can have corrupt metadata. We then have to request the detailed log info.
         More info of the output can be found here: https://baaron4.github.io/GW2-Elite-Insights-Parser/Json/index.html
         """
-        data = {"id": report_id, "permalink": url}
-        detailed_response = requests.get(self.endpoints.detailed_metadata, params=data)
-        if detailed_response.status_code != 200:
-            logger.error(f"Code {detailed_response.status_code}: Failed retrieving log {url}")
+        status, detailed = self._get_json(self.endpoints.detailed_metadata, report_id=report_id, url=url)
+        if status != 200:
+            logger.error(f"Code {status}: Failed retrieving log {url}")
+            return None
+        return DetailedParsedLog(detailed)
+
+
+class AsyncDpsReportClient:
+    """Asyncio variant of DpsReportClient for fetching many logs at once.
+    All requests share one aiohttp connection pool of POOL_SIZE connections and the
+    same GET rate limiter and retries as the DpsReportClient. At most pool_size requests
+    wait for the rate limiter at the same time.
+
+    Use as async context manager:
+
+        async with AsyncDpsReportClient() as client:
+            metadatas = await asyncio.gather(*[client.request_metadata(url=url) for url in urls])
+    """
+
+    def __init__(
+        self,
+        rate_limiter: TokenBucket = GET_RATE_LIMITER,
+        pool_size: int = POOL_SIZE,
+        response_cache: Optional[DiskCache] = None,
+    ):
+        self.endpoints = DpsReportEndpoints()
+        self.rate_limiter = rate_limiter
+        self.pool_size = pool_size
+        self.response_cache = response_cache or get_response_cache()
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> "AsyncDpsReportClient":
+        self._semaphore = asyncio.Semaphore(self.pool_size)
+        connect_timeout, read_timeout = REQUEST_TIMEOUT
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.pool_size),
+            timeout=aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.session.close()
+        self.session = None
+
+    async def _get_json(self, url: str, params: dict) -> tuple[int, Optional[Any]]:
+        """GET with the same pacing, retries and response cache as DpsReportClient.
+        Returns the status code and the json body (None when the status is not 200).
+        """
+        params = {key: value for key, value in params.items() if value is not None}
+        cache_key = _response_cache_key(url, report_id=params.get("id"), url=params.get("permalink"))
+        # getJson responses can be MBs, (de)compress them outside of the event loop.
+        data = await asyncio.to_thread(_read_cached_json, self.response_cache, cache_key)
+        if data is not None:
+            return 200, data
+
+        async with self._semaphore:
+            return await self._request_json(url=url, params=params, cache_key=cache_key)
+
+    async def _request_json(self, url: str, params: dict, cache_key: Optional[str]) -> tuple[int, Optional[Any]]:
+        for attempt in range(MAX_RETRIES + 1):
+            # The rate limiter blocks, wait for it outside of the event loop.
+            await asyncio.to_thread(self.rate_limiter.acquire)
+            try:
+                async with self.session.get(url, params=params) as response:
+                    if response.status == 200:
+                        data = await response.json(content_type=None)
+                        await asyncio.to_thread(_write_cached_json, self.response_cache, cache_key, data)
+                        return response.status, data
+                    status = response.status
+                    retry_after = response.headers.get("Retry-After")
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                delay = _backoff_seconds(attempt)
+                logger.warning(f"{type(e).__name__} for dps.report, retrying in {delay:.1f}s")
+                self.rate_limiter.pause(delay)
+                continue
+
+            if status not in RETRY_STATUS_CODES or attempt == MAX_RETRIES:
+                return status, None
+
+            delay = _backoff_seconds(attempt, retry_after=retry_after)
+            logger.warning(f"Code {status} from dps.report, retrying in {delay:.1f}s")
+            self.rate_limiter.pause(delay)
+        return status, None
+
+    async def request_metadata(
+        self, report_id: Optional[str] = None, url: Optional[str] = None
+    ) -> Optional[MetadataParsed]:
+        """Get metadata from dps.report. Either provide report_id or url."""
+        status, metadata = await self._get_json(self.endpoints.metadata, params={"id": report_id, "permalink": url})
+        if status != 200:
+            logger.error(f"Code {status}: Failed retrieving log {url}")
+            return None
+        return MetadataParsed(data=metadata)
+
+    async def request_detailed_info(
+        self, report_id: Optional[str] = None, url: Optional[str] = None
+    ) -> Optional[DetailedParsedLog]:
+        """Get the detailed EI json from dps.report. Either provide report_id or url."""
+        status, detailed = await self._get_json(
+            self.endpoints.detailed_metadata, params={"id": report_id, "permalink": url}
+        )
+        if status != 200:
+            logger.error(f"Code {status}: Failed retrieving log {url}")
             return None
-        return DetailedParsedLog(detailed_response.json())
+        return DetailedParsedLog(detailed)
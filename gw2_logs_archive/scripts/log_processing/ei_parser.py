@@ -7,18 +7,102 @@ if __name__ == "__main__":
 import gzip
 import json
 import logging
+import re
 import subprocess
+from collections import defaultdict
 from pathlib import Path
-from typing import Optional
+from typing import Literal, Optional
 
 from django.conf import settings
 from scripts.log_helpers import get_log_path_view
 from scripts.log_processing.ei_updater import EliteInsightsUpdater
-from scripts.utilities.parsed_log import DetailedParsedLog
+from scripts.utilities.disk_cache import DiskCache, hash_file
+from scripts.utilities.parsed_log import SUMMARY_KEYS, SUMMARY_VERSION, DetailedParsedLog
 
 logger = logging.getLogger(__name__)
 
-EI_SETTINGS_DEFAULT = settings.BASE_DIR.joinpath("bot_settings", "gw2ei_settings_default.conf")
+try:
+    import ijson  # Streams the json instead of loading the full tree
+except ImportError:
+    ijson = None
+
+# Elite Insights settings per parse profile, selected with settings.EI_PARSE_PROFILE.
+EI_SETTINGS_PROFILES = {
+    # Only what DetailedParsedLog reads. No combat replay, damage modifiers, raw timeline arrays,
+    # traces or indented json.
+    "lean": settings.BASE_DIR.joinpath("bot_settings", "gw2ei_settings_lean.conf"),
+    # Everything, for when the html with combat replay is wanted.
+    "full": settings.BASE_DIR.joinpath("bot_settings", "gw2ei_settings_full.conf"),
+}
+# Maximum number of logs passed to a single EI CLI call. Each call pays the .NET startup once.
+EI_MAX_LOGS_PER_PROCESS = 8
+
+# EI default of CustomTooShort, fights shorter than this many ms are not parsed.
+EI_TOO_SHORT_MS_DEFAULT = 2200
+
+# Compact summary written next to each parsed json, see DetailedParsedLog.to_summary
+SUMMARY_SUFFIX = ".summary.json"
+
+# Top level keys of the EI json that are used by DetailedParsedLog and the DpsLog creation.
+# buffMap, players and targets are handled separately, only a small part of them is kept.
+EI_JSON_KEYS = {*SUMMARY_KEYS, "presentInstanceBuffs"}
+EI_JSON_TARGET_KEYS = {"healthPercents", "healthPercentBurned"}
+
+
+def _load_json_projected(fin) -> dict:
+    """Stream the EI json and only keep the keys that are used.
+    Players only keep their account, only the first target is kept and the buffMap
+    only keeps its keys. Everything else (phases, mechanics, rotations) is skipped
+    without building python objects for it.
+    """
+    data = {"buffMap": {}, "players": [], "targets": []}
+    target_count = 0
+
+    builder = None  # Builds a nested value, e.g. a list, from the events
+    builder_prefix = None
+    builder_setter = None
+
+    for prefix, event, value in ijson.parse(fin, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == builder_prefix and event in ("end_map", "end_array"):
+                builder_setter(builder.value)
+                builder = None
+            continue
+
+        # Find where the value should go
+        setter = None
+        if prefix in EI_JSON_KEYS:
+
+            def setter(v, key=prefix):
+                data[key] = v
+
+        elif prefix == "buffMap" and event == "map_key":
+            data["buffMap"][value] = {}
+        elif prefix == "players.item.account":
+            data["players"].append({"account": value})
+        elif prefix == "targets.item" and event == "start_map":
+            target_count += 1
+            if target_count == 1:
+                data["targets"].append({})
+        elif target_count == 1 and prefix.startswith("targets.item."):
+            key = prefix.removeprefix("targets.item.")
+            if key in EI_JSON_TARGET_KEYS:
+
+                def setter(v, key=key):
+                    data["targets"][0][key] = v
+
+        if setter is None:
+            continue
+        if event in ("start_map", "start_array"):
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            builder_prefix = prefix
+            builder_setter = setter
+        else:
+            setter(value)
+
+    return data
 
 
 class EliteInsightsParser:
@@ -36,6 +120,9 @@ class EliteInsightsParser:
         """
         self.out_dir = None  # Set in .create_settings
         self.settings = None  # Set in .create_settings
+        self.profile = None  # Set in .create_settings
+        self.cache = None  # Set in .create_settings
+        self._out_dir_outputs: dict[str, list[Path]] = {}  # Set in .create_settings
 
         # Paths
         self.ei_parser_folder = settings.PROJECT_DIR.joinpath("GW2EI_parser")
@@ -53,22 +140,43 @@ class EliteInsightsParser:
     def create_settings(
         self,
         out_dir: Path,
-        setting_in_path: Path = EI_SETTINGS_DEFAULT,
+        profile: Optional[Literal["lean", "full"]] = None,
+        setting_in_path: Optional[Path] = None,
         create_html: bool = False,
+        cache_dir: Optional[Path] = None,
     ) -> None:
         """
         Write conf file to settings_out_path.
 
-        setting_in_path : str
-            Path to ei settings to use. Will be edited based on inputs
         out_dir : str
-            Directory where output jsons are placed.
+            Directory where EI writes its output. Parsed jsons are moved to the cache afterwards.
+        profile : {"lean", "full"}, default None
+            EI settings profile, see EI_SETTINGS_PROFILES. Defaults to "full" when creating the html,
+            otherwise to settings.EI_PARSE_PROFILE.
+        setting_in_path : Path, default None
+            Path to ei settings to use instead of the profile. Will be edited based on inputs
         create_html : bool, default False
             Also create html of the fight
+        cache_dir : Path, default None
+            Directory of the parsed log cache. Defaults to settings.EI_PARSED_CACHE_DIR
         """
+        if profile is None:
+            profile = "full" if create_html else settings.EI_PARSE_PROFILE
+        if setting_in_path is None:
+            setting_in_path = EI_SETTINGS_PROFILES[profile]
+        self.profile = profile
+
+        if cache_dir is None:
+            cache_dir = settings.EI_PARSED_CACHE_DIR
+        self.cache = DiskCache(
+            cache_dir=cache_dir,
+            max_size_mb=settings.EI_PARSED_CACHE_MAX_SIZE_MB,
+            companion_suffixes=(SUMMARY_SUFFIX,),
+        )
 
         self.out_dir = out_dir
         out_dir.mkdir(exist_ok=True)
+        self._out_dir_outputs = self._index_out_dir()
 
         setting_output_path = out_dir.joinpath("gw2ei_settings.conf")
 
@@ -82,6 +190,14 @@ class EliteInsightsParser:
         setting_output_path.write_text(settings_output)
         self.settings = setting_output_path
 
+    @property
+    def too_short_ms(self) -> int:
+        """CustomTooShort of the EI settings, EI doesn't parse fights shorter than this."""
+        if self.settings is None:
+            raise ValueError("Run self.create_settings first.")
+        match = re.search(r"^CustomTooShort=(\d+)", self.settings.read_text(), flags=re.MULTILINE)
+        return int(match.group(1)) if match else EI_TOO_SHORT_MS_DEFAULT
+
     def parse_log(self, log_path: Path) -> Optional[Path]:
         """Parse to json locally. Uploading to dps.report is not implemented.
         returns evtc_path=None when process doesnt parse the log. For instance due to
@@ -94,46 +210,169 @@ class EliteInsightsParser:
         -------
         Parsed log path
         """
-        short_path = get_log_path_view(log_path)
+        return self.parse_logs(log_paths=[log_path], chunk_size=1)[log_path]
 
-        if self.settings is None:
-            raise ValueError("Run self.create_settings first.")
+    def parse_logs(
+        self, log_paths: list[Path], chunk_size: int = EI_MAX_LOGS_PER_PROCESS
+    ) -> dict[Path, Optional[Path]]:
+        """Parse multiple logs to json locally. Logs that are not parsed yet are grouped
+        in chunks, each chunk is passed to a single EI CLI process.
 
-        js_path = self.find_parsed_json(log_path=log_path)
-
-        if js_path:
-            logger.info(f"{short_path}: Log already parsed")
-        else:
-            # Call the parser
-            res = subprocess.run(
-                [str(self.EI_exe), "-c", f"{self.settings}", log_path], capture_output=True, text=True
-            )
+        Parameters
+        ----------
+        log_paths : list[Path]
+            Paths to the original logs
+        chunk_size : int, default EI_MAX_LOGS_PER_PROCESS
+            Maximum number of logs passed to one EI process.
 
-            if res.returncode != 0:
-                logger.warning(f"{short_path}: EI parsing failed: {res.stderr}")
-                return None
+        Returns
+        -------
+        Dict with the parsed log path for each of the log_paths. The value is None
+        when EI did not parse the log.
+        """
+        if self.settings is None:
+            raise ValueError("Run self.create_settings first.")
 
+        parsed_paths: dict[Path, Optional[Path]] = {}
+        unparsed_paths: list[Path] = []
+        for log_path in log_paths:
             js_path = self.find_parsed_json(log_path=log_path)
-
-        return js_path
+            if js_path:
+                logger.info(f"{get_log_path_view(log_path)}: Log already parsed")
+                parsed_paths[log_path] = js_path
+            else:
+                unparsed_paths.append(log_path)
+
+        chunk_size = max(1, chunk_size)
+        for idx in range(0, len(unparsed_paths), chunk_size):
+            parsed_paths.update(self._run_cli(log_paths=unparsed_paths[idx : idx + chunk_size]))
+
+        self.cache.flush()
+        return {log_path: parsed_paths[log_path] for log_path in log_paths}
+
+    def _run_cli(self, log_paths: list[Path]) -> dict[Path, Optional[Path]]:
+        """Call the EI CLI once for all log_paths and find the output of each log.
+        A failing log does not fail the other logs in the same call.
+        """
+        res = subprocess.run(
+            [str(self.EI_exe), "-c", f"{self.settings}", *[str(log_path) for log_path in log_paths]],
+            capture_output=True,
+            text=True,
+        )
+
+        parsed_paths = {}
+        for log_path in log_paths:
+            js_path = self._collect_output(log_path=log_path)
+            if js_path is None:
+                logger.warning(f"{get_log_path_view(log_path)}: EI parsing failed: {res.stderr}")
+            parsed_paths[log_path] = js_path
+        return parsed_paths
+
+    def _cache_keys(self, log_path: Path) -> list[str]:
+        """Keys of the log in the cache; hash of the evtc content, the EI version and the profile.
+        Identical logs in different folders share the key, a changed log gets a new one.
+        The first key is where a new parse is stored. A lean parse can also use a full parse,
+        which holds everything the lean one has.
+        """
+        try:
+            digest = hash_file(log_path)
+        except OSError:
+            return []
+        ei_version = re.sub(r"[^\w.]", "_", self.updater.installed_version)
+        full_key = f"{digest}_{ei_version}"  # Full parses keep the key from before the profiles
+        if self.profile == "lean":
+            return [f"{full_key}_lean", full_key]
+        return [full_key]
+
+    def _index_out_dir(self) -> dict[str, list[Path]]:
+        """List the parsed jsons in the out_dir by log name, e.g. from before the cache existed.
+        Listed once, they are moved to the cache when their log is looked up.
+        """
+        outputs = defaultdict(list)
+        for file in self.out_dir.glob("*.json.gz"):
+            outputs[file.name.split("_", 1)[0]].append(file)
+        return dict(outputs)
+
+    def _collect_output(self, log_path: Path, files: Optional[list[Path]] = None) -> Optional[Path]:
+        """Output gets a bit of a different name, find it in the out_dir and move it to the cache.
+        Output that is older than the log is ignored, the log was changed after parsing.
+        The out_dir is only searched when files is None, right after EI wrote the output.
+        """
+        if files is None:
+            files = list(self.out_dir.glob(f"{log_path.stem}*.json.gz"))
+        files = sorted((file for file in files if file.exists()), key=lambda file: file.stat().st_mtime)
+        if len(files) == 0:
+            return None
+
+        file = files[-1]
+        if log_path.exists() and file.stat().st_mtime < log_path.stat().st_mtime:
+            logger.info(f"{get_log_path_view(log_path)}: Parsed json is older than the log, parsing again")
+            return None
+
+        cache_keys = self._cache_keys(log_path=log_path)
+        if cache_keys:
+            file = self.cache.put(key=cache_keys[0], src_path=file, suffix=".json.gz")
+
+        # Later runs only need the summary, create it while the parse is running in parallel.
+        try:
+            EliteInsightsParser.load_parsed_json(parsed_path=file)
+        except Exception as e:
+            logger.warning(f"{get_log_path_view(log_path)}: Failed to read parsed json: {e}")
+        return file
 
     def find_parsed_json(self, log_path: Path) -> Optional[Path]:
-        """Output gets a bit of a different name, find it."""
-        files = list(self.out_dir.glob(f"{log_path.stem}*.gz"))
-        if len(files) > 0:
-            file = files[0]
-            return file
+        """Find the parsed json of a log in the cache. Returns None when it is not parsed yet."""
+        for cache_key in self._cache_keys(log_path=log_path):
+            js_path = self.cache.get(key=cache_key)
+            if js_path is not None:
+                return js_path
+
+        # Parsed before the cache existed, still in the out_dir.
+        files = self._out_dir_outputs.pop(log_path.stem, None)
+        if files:
+            return self._collect_output(log_path=log_path, files=files)
+        return None
 
     @staticmethod
-    def load_parsed_json(parsed_path: Path) -> DetailedParsedLog:
-        """Load zipped json as detailed json"""
+    def summary_path(parsed_path: Path) -> Path:
+        """Path of the summary next to the parsed json."""
+        return parsed_path.with_name(parsed_path.name.removesuffix(".json.gz") + SUMMARY_SUFFIX)
 
-        with gzip.open(parsed_path, "r") as fin:
-            json_bytes = fin.read()
+    @staticmethod
+    def load_parsed_json(parsed_path: Path, full: bool = False) -> DetailedParsedLog:
+        """Load zipped json as detailed json
 
-        json_str = json_bytes.decode("utf-8")
-        data = json.loads(json_str)
-        return DetailedParsedLog(data=data)
+        Parameters
+        ----------
+        parsed_path : Path
+            Path to the .json.gz created by EI
+        full : bool, default False
+            Load the complete json. By default the summary next to the json is used,
+            which holds only the data needed for the DpsLog. When there is no summary yet,
+            only the used keys are streamed from the file (see EI_JSON_KEYS) and the
+            summary is written. Only when ijson is not installed the complete json is loaded.
+        """
+        summary_path = EliteInsightsParser.summary_path(parsed_path=parsed_path)
+        if not full and summary_path.exists():
+            try:
+                summary = json.loads(summary_path.read_text())
+                if summary.get("version") == SUMMARY_VERSION:
+                    return DetailedParsedLog.from_summary(summary=summary)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"{summary_path.name}: Summary unreadable, loading full json: {e}")
+
+        with gzip.open(parsed_path, "rb") as fin:
+            if full or ijson is None:
+                data = json.load(fin)
+            else:
+                data = _load_json_projected(fin)
+        detailed_parsed_log = DetailedParsedLog(data=data)
+
+        try:
+            summary_path.write_text(json.dumps(detailed_parsed_log.to_summary()))
+        except (OSError, KeyError, IndexError) as e:
+            logger.warning(f"{parsed_path.name}: Failed to write summary: {e}")
+        return detailed_parsed_log
 
 
 # %%
@@ -141,9 +380,8 @@ class EliteInsightsParser:
 if __name__ == "__main__":
     self = ei_parser = EliteInsightsParser()
     out_dir = settings.EI_PARSED_LOGS_DIR.joinpath("202512081")
-    setting_in_path = EI_SETTINGS_DEFAULT
     create_html = True
-    ei_parser.create_settings(out_dir=out_dir, setting_in_path=setting_in_path, create_html=create_html)
+    ei_parser.create_settings(out_dir=out_dir, create_html=create_html)
 
     d = ei_parser.parse_log(log_path=r"")
     r2 = EliteInsightsParser.load_parsed_json(parsed_path=d)
@@ -21,6 +21,13 @@ class EliteInsightsUpdater:
         self.version_file = ei_parser_folder / "version.txt"
         self.last_checked_file = ei_parser_folder / "last_checked.txt"
 
+    @property
+    def installed_version(self) -> str:
+        """Version of the local EI installation, 'unknown' when it is not installed."""
+        if self.version_file.exists():
+            return self.version_file.read_text().split("\n")[0]
+        return "unknown"
+
     def get_latest_version_from_github(self) -> Tuple[dict, str]:
         logger.info("Retrieving latest Elite Insights version from github")
         url = "https://api.github.com/repos/baaron4/GW2-Elite-Insights-Parser/releases/latest"
@@ -4,17 +4,24 @@ if __name__ == "__main__":
 
     django_setup.run()
 
+import fnmatch
 import logging
 import os
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
 from functools import cached_property
 from itertools import chain
 from pathlib import Path
-from typing import Literal
+from typing import TYPE_CHECKING, Literal, Optional
 
-import pandas as pd
 from django.conf import settings
+from gw2_logs.models import IndexedDirectory, ProcessedLogFile
 from scripts.log_helpers import get_log_path_view, zfill_y_m_d
+from scripts.log_processing.log_fingerprint import FightIndex
+from scripts.log_processing.log_watcher import LogWatcher
+
+if TYPE_CHECKING:
+    import pandas as pd  # Imported when the dataframe is created, it takes long to import.
 
 logger = logging.getLogger(__name__)
 
@@ -25,14 +32,25 @@ class LogFile:
     During processing the local_processed and upload_processed bools
     can be updated to reflect if the file has been processed locally or uploaded.
     The mtime is used for sorting files by modification time.
+    The size and mtime are also used to detect if arcdps is still writing the log.
+    With persist_state the processed bools are stored in the ProcessedLogFile table.
+    A log of a fight that was already recorded by another log is an alias of that log and never processed.
     """
 
     path: Path
     local_processed: bool = False
     upload_processed: bool = False
+    persist_state: bool = False
 
     def __post_init__(self):
-        self.mtime = self.path.stat().st_mtime
+        stat = self.path.stat()
+        self.mtime = stat.st_mtime
+        self.size = stat.st_size
+        self._unchanged_since = time.monotonic()  # Last time size or mtime changed
+
+        self.released = False  # Returned by LogFilesDate.get_unprocessed_logs
+        self.excluded = False  # Not in the allowed_folder_names, never processed
+        self.alias_of: Optional[Path] = None  # Other recording of the same fight that is processed instead
 
         # Id cant be just the name because it can be found in multiple places.
         if self.path.parent == settings.EXTRA_LOGS_DIR:
@@ -62,15 +80,212 @@ class LogFile:
         """Short name of the log file. Short name is the name without the extension."""
         return get_log_path_view(self.path)
 
+    def refresh_stat(self) -> bool:
+        """Read size and mtime from disk again. Returns True when the file changed."""
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return False
+
+        if (stat.st_size, stat.st_mtime) == (self.size, self.mtime):
+            return False
+
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime
+        self._unchanged_since = time.monotonic()
+        return True
+
+    def seconds_until_stable(self, quiet_period: float) -> float:
+        """Seconds until the log has been unchanged for the quiet_period. 0 when it is stable.
+        Logs that were last written before we first saw them count from their mtime.
+        """
+        unchanged_for = max(time.monotonic() - self._unchanged_since, time.time() - self.mtime)
+        return max(0.0, quiet_period - unchanged_for)
+
+    def requeue(self):
+        """Log changed after it was released, process it again."""
+        logger.info(f"{self.path_short}: Log changed after processing, queued again.")
+        self.local_processed = False
+        self.upload_processed = False
+        self.released = False
+        self.save_state()
+
+    def load_state(self, state: ProcessedLogFile) -> None:
+        """Restore the processed bools from a previous run. Ignored when the file changed since."""
+        if (state.size, state.mtime) != (self.size, self.mtime):
+            return
+        self.local_processed = state.local_processed
+        self.upload_processed = state.upload_processed
+        self.alias_of = Path(state.alias_of) if state.alias_of else None
+        self.released = True
+
+    def save_state(self) -> None:
+        """Store the processed bools in the ProcessedLogFile table."""
+        if not self.persist_state:
+            return
+        ProcessedLogFile.objects.update_or_create(
+            path=str(self.path),
+            defaults={
+                "name": self.path.name,
+                "size": self.size,
+                "mtime": self.mtime,
+                "local_processed": self.local_processed,
+                "upload_processed": self.upload_processed,
+                "alias_of": str(self.alias_of) if self.alias_of is not None else None,
+            },
+        )
+
     def mark_local_processed(self):
         """Mark the log as processed locally."""
         logger.debug(f"{self.path_short}: Marking as processed locally.")
         self.local_processed = True
+        self.save_state()
 
     def mark_upload_processed(self):
         """Mark the log as processed externally on dps.report."""
         logger.debug(f"{self.path_short}: Marking as processed externally on dps.report.")
         self.upload_processed = True
+        self.save_state()
+
+    def mark_alias(self, original: "LogFile"):
+        """Mark the log as another recording of the fight in original, it is not processed."""
+        logger.info(f"{self.path_short}: Same fight as {original.path_short}, skipped as duplicate.")
+        self.alias_of = original.path
+        self.local_processed = True
+        self.upload_processed = True
+        self.save_state()
+
+
+@dataclass
+class _DirEntry:
+    """Cached listing of one directory."""
+
+    mtime_ns: int
+    subdirs: list[Path] = field(default_factory=list)
+    log_paths: list[Path] = field(default_factory=list)
+    trusted: bool = True  # False when the mtime was too recent to rely on
+    log_names: list[str] = field(default_factory=list)  # Logs of every date, stored with persist
+
+
+class DirectoryIndex:
+    """Index of the logs below a root folder, cached per directory.
+
+    A directory's mtime only changes when an entry is added, removed or renamed
+    directly inside it. On a rescan every directory is stat'ed, but only the ones
+    whose mtime changed are listed again. The cost of a rescan therefore scales with
+    the number of folders and new files, not with the number of logs in the archive.
+
+    Parameters
+    ----------
+    root : Path
+        Folder to index, subdirectories are included.
+    pattern : str
+        Filename pattern of the logs, e.g. '20260122*.zevtc'
+    mtime_resolution : float, default 2
+        Directories modified less than this many seconds before the scan are listed
+        again on the next scan. Filesystems like FAT only store mtimes in 2s steps,
+        so a file added within the same step would otherwise be missed.
+    persist : bool, default False
+        Store the listings in the IndexedDirectory table. A restarted run then only
+        lists the directories that changed while it was not running.
+    """
+
+    def __init__(self, root: Path, pattern: str, mtime_resolution: float = 2, persist: bool = False):
+        self.root = root
+        self.pattern = pattern
+        self.mtime_resolution_ns = int(mtime_resolution * 1e9)
+        self.persist = persist
+        # The stored listings hold the logs of every date, the pattern is applied when loading.
+        self._log_suffix = Path(pattern).suffix
+
+        self._entries: dict[Path, _DirEntry] = {}
+        if self.persist:
+            self._entries = self._load_entries()
+        self.listed_dirs = 0  # Directories listed during the last scan, for inspection.
+
+    def _load_entries(self) -> dict[Path, _DirEntry]:
+        entries = {}
+        for indexed_dir in IndexedDirectory.objects.filter(path__startswith=str(self.root)):
+            folder = Path(indexed_dir.path)
+            if folder != self.root and self.root not in folder.parents:
+                continue  # Sibling folder with the same prefix
+            entries[folder] = _DirEntry(
+                mtime_ns=indexed_dir.mtime_ns,
+                subdirs=[folder.joinpath(name) for name in indexed_dir.subdirs],
+                log_paths=[
+                    folder.joinpath(name) for name in indexed_dir.log_names if fnmatch.fnmatch(name, self.pattern)
+                ],
+                log_names=indexed_dir.log_names,
+            )
+        logger.debug(f"Loaded the listing of {len(entries)} directories below {self.root}")
+        return entries
+
+    def _save_entry(self, folder: Path, entry: _DirEntry) -> None:
+        IndexedDirectory.objects.update_or_create(
+            path=str(folder),
+            defaults={
+                "mtime_ns": entry.mtime_ns,
+                "subdirs": [subdir.name for subdir in entry.subdirs],
+                "log_names": entry.log_names,
+            },
+        )
+
+    def scan(self) -> list[Path]:
+        """Return all log paths below root, only listing directories that changed."""
+        self.listed_dirs = 0
+        log_paths = []
+        seen = set()
+        stack = [self.root]
+        while stack:
+            folder = stack.pop()
+            seen.add(folder)
+
+            entry = self._get_entry(folder)
+            if entry is None:
+                continue
+            stack.extend(entry.subdirs)
+            log_paths.extend(entry.log_paths)
+
+        # Forget directories that were removed
+        removed = self._entries.keys() - seen
+        for folder in removed:
+            del self._entries[folder]
+        if self.persist and removed:
+            IndexedDirectory.objects.filter(path__in=[str(folder) for folder in removed]).delete()
+        return log_paths
+
+    def _get_entry(self, folder: Path) -> _DirEntry | None:
+        try:
+            mtime_ns = folder.stat().st_mtime_ns
+        except OSError:
+            self._entries.pop(folder, None)
+            return None
+
+        entry = self._entries.get(folder)
+        if entry is not None and entry.trusted and entry.mtime_ns == mtime_ns:
+            return entry
+
+        entry = _DirEntry(mtime_ns=mtime_ns, trusted=(time.time_ns() - mtime_ns) > self.mtime_resolution_ns)
+        try:
+            with os.scandir(folder) as it:
+                for dir_entry in it:
+                    # rglob does not follow symlinked directories either
+                    if dir_entry.is_dir(follow_symlinks=False):
+                        entry.subdirs.append(Path(dir_entry.path))
+                    elif dir_entry.name.endswith(self._log_suffix):
+                        entry.log_names.append(dir_entry.name)
+                        if fnmatch.fnmatch(dir_entry.name, self.pattern):
+                            entry.log_paths.append(Path(dir_entry.path))
+        except OSError as e:
+            logger.warning(f"Failed to list {folder}: {e}")
+            self._entries.pop(folder, None)
+            return None
+
+        self.listed_dirs += 1
+        self._entries[folder] = entry
+        if self.persist and entry.trusted:
+            self._save_entry(folder, entry)
+        return entry
 
 
 @dataclass
@@ -80,6 +295,11 @@ class LogFilesDate:
     d: int
     log_search_dirs: list[Path] | None = None
     allowed_folder_names: list[str] | None = None
+    watch: bool = False
+    full_rescan_interval: float = 300
+    stable_seconds: float = 5
+    persist_state: bool = False
+    deduplicate: bool = True
     """This class finds logs by date and tracks them in the internal state self.logs 
     It returns the paths to the logs as a dataframe.
 
@@ -95,11 +315,30 @@ class LogFilesDate:
         A list of allowed folder names, can be retrieved with create_folder_names
         to filter the logs. For instance, the processing of golem logs might not be
         required.
+    watch : bool, default False
+        Watch the log_search_dirs for new logs instead of walking all folders on every
+        refresh. Falls back to polling when the watchdog package is not installed.
+    full_rescan_interval : float, default 300
+        When watching, still walk all folders every this many seconds in case an event was missed.
+    stable_seconds : float, default 5
+        Quiet period; a log is only returned for processing once its size and mtime
+        have not changed for this many seconds. Prevents parsing logs that arcdps
+        is still writing.
+    persist_state : bool, default False
+        Store which logs are processed in the ProcessedLogFile table. A restarted run
+        then skips the logs that were already finished, as long as they did not change.
+        The folder listings are stored as well, see DirectoryIndex.
+    deduplicate : bool, default True
+        Only return one log per fight when several members recorded it, see FightIndex.
+        Logs found in the first log_search_dirs (the local POV) are preferred. The other
+        copies are marked as alias and never looked at again.
 
     Methods
     -------
     refresh_and_get_logs()
         Finds the currently available logs by date and returns a dataframe.
+    wait_for_new_logs(timeout)
+        Sleep until a new log is written or the timeout passed.
     """
 
     def __post_init__(self):
@@ -109,14 +348,35 @@ class LogFilesDate:
 
             self.log_search_dirs = [dir for dir in [log_search_dir1, log_search_dir2] if dir is not None]
 
-            self._df: pd.DataFrame = pd.DataFrame()  # Viewer on the class and its attributes.
-
         self._verify_log_dirs()
 
         self.logs = {}
+        self._known_paths: set[Path] = set()  # Paths that already have a LogFile in self.logs
+        self._saved_states: dict[str, ProcessedLogFile] = {}
+        if self.persist_state:
+            self._saved_states = {
+                state.path: state
+                for state in ProcessedLogFile.objects.filter(name__startswith=zfill_y_m_d(self.y, self.m, self.d))
+            }
+            logger.info(f"Loaded processing state of {len(self._saved_states)} logs")
+        self._dir_indexes = [
+            DirectoryIndex(root=folder, pattern=self._log_pattern, persist=self.persist_state)
+            for folder in self.log_search_dirs
+        ]
+
+        self._watcher = None
+        self._last_full_scan = None
+        if self.watch:
+            self._watcher = LogWatcher.create(log_search_dirs=self.log_search_dirs, pattern=self._log_pattern)
+
+        self._fight_index = FightIndex() if self.deduplicate else None
+
+    @property
+    def _log_pattern(self) -> str:
+        return f"{zfill_y_m_d(self.y, self.m, self.d)}*.zevtc"
 
     @property
-    def df(self) -> pd.DataFrame:
+    def df(self) -> "pd.DataFrame":
         """Viewer on the class and its attributes. Returns a dataframe of the logs.
         .refresh_logs should have been called once to populate the dataframe.
         """
@@ -129,10 +389,12 @@ class LogFilesDate:
             if not folder.exists():
                 raise ValueError(f"Log directory {folder} does not exist. Check your .env")
 
-    def _to_dataframe(self) -> pd.DataFrame:
+    def _to_dataframe(self) -> "pd.DataFrame":
         """Convert the logs in self.logs to a pandas DataFrame.
         used by self.refresh_and_get_logs to return a df
         """
+        import pandas as pd
+
         data = [
             {
                 "id": log.id,
@@ -154,40 +416,135 @@ class LogFilesDate:
         df.reset_index(inplace=True, drop=True)
         return df
 
+    def _find_log_paths(self) -> list[Path]:
+        """Find all logs on the date in the log_search_dirs.
+        Only directories that changed since the previous call are listed again.
+        """
+        return list(chain(*(dir_index.scan() for dir_index in self._dir_indexes)))
+
+    def _should_full_scan(self) -> bool:
+        """Without a running watcher every refresh walks the folders."""
+        if self._watcher is None or not self._watcher.is_alive:
+            return True
+        if self._last_full_scan is None:
+            return True
+        return (time.monotonic() - self._last_full_scan) > self.full_rescan_interval
+
     def refresh_logs(self) -> None:
         """Find all log files on a specific date.
         Mutates internal state: adds newly discovered logs to self.logs.
         """
-
-        log_paths = list(
-            chain(*(folder.rglob(f"{zfill_y_m_d(self.y, self.m, self.d)}*.zevtc") for folder in self.log_search_dirs))
-        )
+        if self._should_full_scan():
+            if self._watcher is not None:
+                self._watcher.pop_new_paths()  # Covered by the full scan
+            log_paths = self._find_log_paths()
+            self._last_full_scan = time.monotonic()
+        else:
+            log_paths = [log_path for log_path in self._watcher.pop_new_paths() if log_path.exists()]
 
         for log in log_paths:
-            logfile = LogFile(log)
+            # Reuse the LogFile of logs we have seen before instead of stat'ing them again.
+            if log in self._known_paths:
+                continue
+            self._known_paths.add(log)
+
+            logfile = LogFile(log, persist_state=self.persist_state)
             if logfile.id in self.logs:
                 continue
 
+            state = self._saved_states.get(str(log))
+            if state is not None:
+                logfile.load_state(state)
+
             # Check if the log file is allowed to be processed
             if self.allowed_folder_names is not None:
                 if logfile.boss_name is not None:
                     if logfile.boss_name not in self.allowed_folder_names:
                         logger.info(f"{logfile.path_short}: Skipped because it is not in the allowed_folder_names")
+                        logfile.excluded = True
+                        logfile.persist_state = False  # Other runs might allow this folder
                         logfile.mark_local_processed()
                         logfile.mark_upload_processed()
 
             self.logs[logfile.id] = logfile
 
+    def wait_for_new_logs(self, timeout: float) -> None:
+        """Sleep for timeout seconds. When watching, return as soon as a new log is written.
+        Also returns when a log that is waiting for its quiet period becomes stable.
+        """
+        pending = [
+            logf.seconds_until_stable(self.stable_seconds)
+            for logf in self.logs.values()
+            if not logf.released and not logf.excluded and logf.alias_of is None
+        ]
+        if pending:
+            timeout = min(timeout, min(pending))
+
+        if self._watcher is not None and self._watcher.is_alive:
+            self._watcher.wait(timeout=timeout)
+        else:
+            time.sleep(timeout)
+
+    def close(self) -> None:
+        """Stop watching the log directories."""
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+
     def get_unprocessed_logs(self, processing_type: Literal["local", "upload"]) -> list[LogFile]:
         """Get the unprocessed logs sorted by start time (path name) for a given processing type.
         Calls refresh_logs to get the latest logs before filtering.
-
+        Only logs that have been unchanged for self.stable_seconds are returned. Logs
+        that changed after they were returned are queued again.
         """
         self.refresh_logs()
 
-        unprocessed = [logf for logf in self.logs.values() if not getattr(logf, f"{processing_type}_processed")]
+        stable_logs = []
+        for logf in self.logs.values():
+            if logf.excluded or logf.alias_of is not None:
+                continue
+
+            if logf.refresh_stat() and logf.released:
+                logf.requeue()
+
+            if getattr(logf, f"{processing_type}_processed") and logf.released:
+                stable_logs.append(logf)  # Still needed to recognize other recordings of its fight
+                continue
+
+            if logf.seconds_until_stable(self.stable_seconds) > 0:
+                logger.debug(f"{logf.path_short}: Still being written, waiting.")
+                continue
+            stable_logs.append(logf)
+
+        if self._fight_index is not None:
+            self._mark_duplicates(stable_logs)
+
+        unprocessed = []
+        for logf in stable_logs:
+            if logf.alias_of is not None or getattr(logf, f"{processing_type}_processed"):
+                continue
+            logf.released = True
+            unprocessed.append(logf)
         return sorted(unprocessed, key=lambda logf: logf.path.name)
 
+    def _search_dir_rank(self, log_path: Path) -> int:
+        """Index of the log_search_dirs the log was found in."""
+        for rank, folder in enumerate(self.log_search_dirs):
+            if log_path.is_relative_to(folder):
+                return rank
+        return len(self.log_search_dirs)
+
+    def _mark_duplicates(self, logs: list[LogFile]) -> None:
+        """Mark logs of a fight that is already in the fight index as alias.
+        Logs that were released before are kept, then the logs of the first log_search_dirs.
+        """
+        for logf in sorted(
+            logs, key=lambda logf: (not logf.released, self._search_dir_rank(logf.path), logf.path.name)
+        ):
+            original = self._fight_index.add(logf)
+            if original is not None:
+                logf.mark_alias(original)
+
 
 # %%
 if __name__ == "__main__":
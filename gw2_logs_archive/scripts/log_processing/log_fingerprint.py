@@ -0,0 +1,123 @@
+# %%
+"""Find other recordings of the same fight
+
+Every member of the static records the fights, the shared EXTRA_LOGS_DIR collects
+those copies next to the local DPS_LOGS_DIR. Each copy would be parsed, uploaded and
+then resolved to the same DpsLog. `FightIndex` fingerprints each log with the boss id
+and start time from its evtc header. Only when another log of the same boss started
+within START_TOLERANCE_SECONDS, the exact fight lengths are read and compared.
+"""
+
+if __name__ == "__main__":
+    from scripts.utilities import django_setup
+
+    django_setup.run()
+
+import datetime
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from scripts.utilities.evtc_header import read_evtc_header
+
+if TYPE_CHECKING:
+    from scripts.log_processing.log_files import LogFile
+
+logger = logging.getLogger(__name__)
+
+START_TOLERANCE_SECONDS = 5  # Same window as DpsLogRepository.find_by_start_time
+DURATION_TOLERANCE_MS = 5000  # Recorders see the log end at slightly different times
+
+
+@dataclass
+class LogFingerprint:
+    """Identifies the fight of a log, see FightIndex.
+
+    Attributes
+    ----------
+    boss_id : int
+        Species id of the boss.
+    start_time : datetime.datetime
+        Server time of the log start.
+    duration_ms : int | None
+        Exact fight length, only read when a possible duplicate is found.
+    """
+
+    boss_id: int
+    start_time: datetime.datetime
+    duration_ms: Optional[int] = None
+
+    @classmethod
+    def from_log(cls, log_path: Path) -> Optional["LogFingerprint"]:
+        """Fingerprint from the evtc header. None when the header can't be read."""
+        try:
+            header = read_evtc_header(log_path)
+        except (OSError, ValueError) as e:
+            logger.debug(f"{log_path.name}: No fingerprint, header not readable: {e}")
+            return None
+        if header.start_time is None:
+            return None
+        return cls(boss_id=header.boss_id, start_time=header.start_time)
+
+    def read_duration_ms(self, log_path: Path) -> Optional[int]:
+        """Scan all events of the log for the exact fight length, only done once."""
+        if self.duration_ms is None:
+            try:
+                _, self.duration_ms = read_evtc_header(log_path, read_all_events=True).duration_bounds_ms
+            except (OSError, ValueError) as e:
+                logger.debug(f"{log_path.name}: Fight length not readable: {e}")
+        return self.duration_ms
+
+
+class FightIndex:
+    """Fingerprints of the logs that are kept, by boss id.
+
+    Methods
+    -------
+    add(logfile)
+        Fingerprint the log, returns the log of the same fight when it was added before.
+    """
+
+    def __init__(self):
+        self._logs: dict[int, list["LogFile"]] = defaultdict(list)
+        self._fingerprints: dict[Path, Optional[LogFingerprint]] = {}
+
+    def add(self, logfile: "LogFile") -> Optional["LogFile"]:
+        """Add the log to the index. When another log of the same fight was added before,
+        that log is returned and this one is not added.
+        Logs without a readable header are never duplicates.
+        """
+        if logfile.path in self._fingerprints:
+            return None
+        fingerprint = self._fingerprints[logfile.path] = LogFingerprint.from_log(logfile.path)
+        if fingerprint is None:
+            return None
+
+        for other in self._logs[fingerprint.boss_id]:
+            if self._same_fight(logfile, other):
+                return other
+        self._logs[fingerprint.boss_id].append(logfile)
+        return None
+
+    def _same_fight(self, logfile: "LogFile", other: "LogFile") -> bool:
+        fingerprint = self._fingerprints[logfile.path]
+        other_fingerprint = self._fingerprints[other.path]
+        if abs((fingerprint.start_time - other_fingerprint.start_time).total_seconds()) > START_TOLERANCE_SECONDS:
+            return False
+
+        duration_ms = fingerprint.read_duration_ms(logfile.path)
+        other_duration_ms = other_fingerprint.read_duration_ms(other.path)
+        if duration_ms is None or other_duration_ms is None:
+            return False
+        return abs(duration_ms - other_duration_ms) <= DURATION_TOLERANCE_MS
+
+
+# %%
+if __name__ == "__main__":
+    from django.conf import settings
+
+    for log_path in sorted(settings.DPS_LOGS_DIR.rglob("*.zevtc"))[-5:]:
+        print(log_path.name, LogFingerprint.from_log(log_path))
+# %%
@@ -0,0 +1,344 @@
+# %%
+"""Staged log processing pipeline
+
+Replaces the fixed sequence of local and upload passes. Every log moves through
+the stages on its own, connected by bounded queues:
+
+    discover -> parse -> ingest -> publish
+                                -> upload -> publish
+
+- discover: `LogFilesDate` finds the new logs and holds them back until they are
+  stable. Wakes up as soon as the watcher sees a new log.
+- parse: the logs that are waiting are parsed together on the bounded pool of Elite
+  Insights processes (see _parse_logs_local). The results are passed on in start-time
+  order, so the DpsLogs are created in the same order as before.
+- ingest: creates or updates the DpsLog.
+- upload: uploads to dps.report on a few threads, then stores the permalink.
+- publish: updates the Discord message. Logs that arrive while a message is being
+  sent are combined into the next update. The link of an upload reaches Discord
+  through the same stage, so two edits of a message never race.
+
+A full queue pauses the stage before it. Django is not async, all database work
+(ingest, storing the upload, publish, the processing state of the logs) runs on one
+thread. The parse and upload stages run their blocking work in threads as well.
+"""
+
+if __name__ == "__main__":
+    from scripts.utilities import django_setup
+
+    django_setup.run()
+
+import asyncio
+import functools
+import logging
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from django.conf import settings
+from django.db import connections
+from gw2_logs.models import DpsLog
+from scripts.log_helpers import today_y_m_d
+from scripts.log_processing.dps_report_client import DpsReportClient, UploadResult
+from scripts.log_processing.ei_parser import EI_MAX_LOGS_PER_PROCESS, EliteInsightsParser
+from scripts.log_processing.log_files import LogFile, LogFilesDate
+from scripts.log_processing.log_prefilter import LogPrefilter
+from scripts.log_processing.logfile_processing import _parse_logs_local, _process_log_local, _process_log_upload
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 32  # Logs waiting between two stages
+DPS_REPORT_MAX_UPLOADS = 2  # Uploads to dps.report running at the same time
+POLL_SECONDS = 3  # Discover checks the folders at least this often
+UPLOAD_RETRY_SECONDS = 60  # Logs that are parsed but not uploaded are queued again after this long
+MAX_ATTEMPTS = 3  # A log that failed to parse or ingest this often is marked processed and skipped
+
+
+@dataclass
+class _ParsedLog:
+    logfile: LogFile
+    parsed_path: Optional[Path]  # None when EI did not parse the log
+
+
+@dataclass
+class _PublishItem:
+    logfile: LogFile
+    dpslog: DpsLog
+
+
+class LogPipeline:
+    """Process the logs of a date as soon as they are written, see the module docstring.
+
+    Parameters
+    ----------
+    log_files_date_cls : LogFilesDate
+        Finds the logs and keeps their processing state.
+    ei_parser : EliteInsightsParser
+        Parser with its settings created.
+    publish : Callable[[list[DpsLog]], None]
+        Sends the processed logs to Discord. Runs on the database thread.
+    prefilter : Optional[LogPrefilter], default None
+        Logs it rejects are marked processed without parsing them.
+    must_be_cm : bool, default False
+        Only publish Challenge Mode logs, used for progression.
+    force_update : bool, default False
+        Update existing DpsLogs.
+    parse_workers : Optional[int], default None
+        Number of Elite Insights processes at the same time, defaults to settings.EI_PARSER_MAX_WORKERS.
+    upload_workers : int, default DPS_REPORT_MAX_UPLOADS
+        Number of uploads to dps.report at the same time.
+    dps_report_client : Optional[DpsReportClient], default None
+        Client used for the uploads.
+    queue_size : int, default QUEUE_SIZE
+        Maximum number of logs waiting in front of a stage.
+    poll_seconds : float, default POLL_SECONDS
+        Discover checks the folders at least this often.
+
+    Methods
+    -------
+    run(max_idle_seconds)
+        Process logs until no log came in for max_idle_seconds or the day changed.
+    """
+
+    def __init__(
+        self,
+        log_files_date_cls: LogFilesDate,
+        ei_parser: EliteInsightsParser,
+        publish: Callable[[list[DpsLog]], None],
+        *,
+        prefilter: Optional[LogPrefilter] = None,
+        must_be_cm: bool = False,
+        force_update: bool = False,
+        parse_workers: Optional[int] = None,
+        upload_workers: int = DPS_REPORT_MAX_UPLOADS,
+        dps_report_client: Optional[DpsReportClient] = None,
+        queue_size: int = QUEUE_SIZE,
+        poll_seconds: float = POLL_SECONDS,
+    ):
+        self.log_files_date_cls = log_files_date_cls
+        self.ei_parser = ei_parser
+        self.publish = publish
+        self.prefilter = prefilter
+        self.must_be_cm = must_be_cm
+        self.force_update = force_update
+        self.parse_workers = parse_workers or settings.EI_PARSER_MAX_WORKERS
+        self.upload_workers = upload_workers
+        self.dps_report_client = dps_report_client or DpsReportClient()
+        self.queue_size = queue_size
+        self.poll_seconds = poll_seconds
+
+        self.counts = Counter()  # stage -> number of logs handled
+        self._in_flight: set[Path] = set()  # Queued for parsing, until the DpsLog is stored
+        self._uploading: set[Path] = set()  # Queued for upload, until the permalink is stored
+        self._failures: Counter[Path] = Counter()  # Failed parse or ingest attempts per log
+        self._last_log_time = time.monotonic()
+        self._db_executor: Optional[ThreadPoolExecutor] = None
+
+    def run(self, max_idle_seconds: float) -> None:
+        """Process logs until no log came in for max_idle_seconds or the day changed.
+        The logs that were found by then are finished before returning.
+        """
+        asyncio.run(self._run(max_idle_seconds=max_idle_seconds))
+        logger.info(f"Pipeline finished: {dict(self.counts)}")
+
+    async def _run(self, max_idle_seconds: float) -> None:
+        self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log_pipeline_db")
+        self._parse_queue: asyncio.Queue[LogFile] = asyncio.Queue(maxsize=self.queue_size)
+        self._ingest_queue: asyncio.Queue[_ParsedLog] = asyncio.Queue(maxsize=self.queue_size)
+        self._upload_queue: asyncio.Queue[LogFile] = asyncio.Queue(maxsize=self.queue_size)
+        self._publish_queue: asyncio.Queue[_PublishItem] = asyncio.Queue(maxsize=self.queue_size)
+
+        workers = [
+            # One worker, the batch is spread over parse_workers EI processes and stays in order.
+            self._stage(
+                "parse", self._parse_queue, self._parse, max_batch=EI_MAX_LOGS_PER_PROCESS * self.parse_workers
+            ),
+            self._stage("ingest", self._ingest_queue, self._ingest),
+            *(self._stage("upload", self._upload_queue, self._upload) for _ in range(self.upload_workers)),
+            self._stage("publish", self._publish_queue, self._publish, max_batch=self.queue_size),
+        ]
+        tasks = [asyncio.create_task(worker) for worker in workers]
+        try:
+            await self._discover(max_idle_seconds=max_idle_seconds)
+            # Each stage only feeds the stages after it, so they are empty in this order.
+            for queue in [self._parse_queue, self._ingest_queue, self._upload_queue, self._publish_queue]:
+                await queue.join()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._on_db(connections.close_all)
+            self._db_executor.shutdown()
+
+    async def _on_db(self, func: Callable, *args, **kwargs):
+        """Run func on the database thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._db_executor, functools.partial(func, *args, **kwargs))
+
+    async def _stage(self, name: str, queue: asyncio.Queue, handle: Callable[[list], Awaitable], max_batch: int = 1):
+        """Worker of a stage, takes the items that are waiting (up to max_batch) and handles them together."""
+        while True:
+            items = [await queue.get()]
+            while len(items) < max_batch and not queue.empty():
+                items.append(queue.get_nowait())
+            try:
+                await handle(items)
+                self.counts[name] += len(items)
+            except Exception:
+                logger.exception(f"Stage {name} failed on {len(items)} logs")
+            finally:
+                for _ in items:
+                    queue.task_done()
+
+    def _is_finished(self, max_idle_seconds: float) -> bool:
+        y, m, d = self.log_files_date_cls.y, self.log_files_date_cls.m, self.log_files_date_cls.d
+        return (time.monotonic() - self._last_log_time > max_idle_seconds) or ((y, m, d) != today_y_m_d())
+
+    async def _discover(self, max_idle_seconds: float) -> None:
+        """Queue new stable logs for parsing. Also queues parsed logs that still need an
+        upload, left from a previous run or a failed upload.
+        """
+        last_upload_check = None
+        while True:
+            logfiles = await self._on_db(self.log_files_date_cls.get_unprocessed_logs, processing_type="local")
+            for logfile in logfiles:
+                if logfile.path not in self._in_flight:
+                    self._in_flight.add(logfile.path)
+                    await self._parse_queue.put(logfile)
+
+            if last_upload_check is None or time.monotonic() - last_upload_check > UPLOAD_RETRY_SECONDS:
+                last_upload_check = time.monotonic()
+                logfiles = await self._on_db(self.log_files_date_cls.get_unprocessed_logs, processing_type="upload")
+                for logfile in logfiles:
+                    if logfile.local_processed and logfile.path not in self._uploading and logfile.path.exists():
+                        self._uploading.add(logfile.path)
+                        await self._upload_queue.put(logfile)
+
+            if self._is_finished(max_idle_seconds=max_idle_seconds):
+                return
+            # Returns early when a new log is written to the log folders.
+            await asyncio.to_thread(self.log_files_date_cls.wait_for_new_logs, timeout=self.poll_seconds)
+
+    async def _parse(self, logfiles: list[LogFile]) -> None:
+        pending = list(logfiles)  # Not passed on to ingest yet
+        try:
+            await self._parse_pending(pending)
+        except Exception:
+            logger.exception(f"Parsing failed for {len(pending)} logs")
+            for logfile in pending:
+                await self._retry_later(logfile, stage="parse")
+
+    async def _parse_pending(self, pending: list[LogFile]) -> None:
+        """Parse the logs and put them on the ingest queue, removing them from pending."""
+        if self.prefilter is not None:
+            skip_reasons = await asyncio.to_thread(lambda: [self.prefilter.skip_reason(logf.path) for logf in pending])
+            for logfile, reason in list(zip(pending, skip_reasons)):
+                if reason is not None:
+                    await self._on_db(self._mark_done, logfile)
+                    pending.remove(logfile)
+            if not pending:
+                return
+
+        # Yields in the order of the logs, as soon as a log and all logs before it are parsed.
+        parsed_logs = _parse_logs_local(
+            log_paths=[logfile.path for logfile in pending], ei_parser=self.ei_parser, max_workers=self.parse_workers
+        )
+        try:
+            while pending:
+                _, parsed_path = await asyncio.to_thread(next, parsed_logs)
+                await self._ingest_queue.put(_ParsedLog(logfile=pending[0], parsed_path=parsed_path))
+                pending.pop(0)
+        finally:
+            await asyncio.to_thread(parsed_logs.close)
+
+    async def _ingest(self, parsed_logs: list[_ParsedLog]) -> None:
+        for parsed_log in parsed_logs:
+            logfile = parsed_log.logfile
+            try:
+                dpslog = await self._on_db(self._store_parsed_log, parsed_log)
+            except Exception:
+                logger.exception(f"{logfile.path_short}: Failed to store the parsed log")
+                await self._retry_later(logfile, stage="ingest")
+                continue
+            self._in_flight.discard(logfile.path)
+            if dpslog is None:
+                continue
+
+            self._last_log_time = time.monotonic()
+            await self._publish_queue.put(_PublishItem(logfile=logfile, dpslog=dpslog))
+            if not logfile.upload_processed and logfile.path not in self._uploading:
+                self._uploading.add(logfile.path)
+                await self._upload_queue.put(logfile)
+
+    async def _upload(self, logfiles: list[LogFile]) -> None:
+        for logfile in logfiles:
+            try:
+                upload_result = await asyncio.to_thread(self.dps_report_client.upload_log, log_path=logfile.path)
+                dpslog = await self._on_db(self._store_upload, logfile, upload_result)
+            finally:
+                self._uploading.discard(logfile.path)
+            if dpslog is not None:
+                self._last_log_time = time.monotonic()
+                await self._publish_queue.put(_PublishItem(logfile=logfile, dpslog=dpslog))
+
+    async def _retry_later(self, logfile: LogFile, stage: str) -> None:
+        """Let discover queue the log again. After MAX_ATTEMPTS failures it is marked processed."""
+        self.counts[f"{stage}_failed"] += 1
+        self._failures[logfile.path] += 1
+        if self._failures[logfile.path] >= MAX_ATTEMPTS:
+            logger.error(f"{logfile.path_short}: Failed {MAX_ATTEMPTS} times, skipping all further processing.")
+            await self._on_db(self._mark_done, logfile)
+        self._in_flight.discard(logfile.path)
+
+    async def _publish(self, items: list[_PublishItem]) -> None:
+        await self._on_db(self.publish, [item.dpslog for item in items])
+        latency = time.time() - min(item.logfile.mtime for item in items)
+        logger.info(f"Published {len(items)} logs, {latency:.1f}s after the oldest was written")
+
+    # Methods below run on the database thread.
+    def _mark_done(self, logfile: LogFile) -> None:
+        logfile.mark_local_processed()
+        logfile.mark_upload_processed()
+
+    def _store_parsed_log(self, parsed_log: _ParsedLog) -> Optional[DpsLog]:
+        """Create or update the DpsLog, same rules as the local pass of process_logs_once."""
+        logfile = parsed_log.logfile
+        dpslog = None
+        if parsed_log.parsed_path is not None:
+            dpslog = _process_log_local(
+                log_path=logfile.path,
+                ei_parser=self.ei_parser,
+                force_update=self.force_update,
+                parsed_path=parsed_log.parsed_path,
+            )
+
+        if dpslog is None:
+            logger.warning(
+                f"Parsing didn't work, too short log maybe. {logfile.path}. Skipping all further processing."
+            )
+            self._mark_done(logfile)
+            return None
+        if self.must_be_cm and not dpslog.cm:
+            logger.info(f"{logfile.path}: Skipped because it is not a CM log.")
+            self._mark_done(logfile)
+            return None
+
+        logfile.mark_local_processed()
+        if dpslog.url != "":
+            logfile.mark_upload_processed()
+        return dpslog
+
+    def _store_upload(self, logfile: LogFile, upload_result: UploadResult) -> Optional[DpsLog]:
+        dpslog = _process_log_upload(log_path=logfile.path, ei_parser=self.ei_parser, upload_result=upload_result)
+        if dpslog is None:
+            return None
+        logfile.mark_upload_processed()
+        if self.must_be_cm and not dpslog.cm:
+            return None
+        return dpslog
+
+
+# %%
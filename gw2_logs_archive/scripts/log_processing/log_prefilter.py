@@ -0,0 +1,102 @@
+# %%
+"""Skip logs before they are parsed
+
+Elite Insights only finds out a fight was too short (CustomTooShort in the EI
+settings) after a full parse. Golem logs and other instance groups that are not
+processed are parsed whenever their folder name passes create_folder_names.
+`LogPrefilter` reads the evtc header of each log (see evtc_header) and skips:
+- known encounters of an instance group that is not processed, e.g. golems
+- fights shorter than CustomTooShort. Only small files are scanned to the end for
+  the exact length, a large file can't hold a fight that short.
+
+Logs that can't be read are passed on, EI decides for those.
+"""
+
+if __name__ == "__main__":
+    from scripts.utilities import django_setup
+
+    django_setup.run()
+
+import logging
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+from gw2_logs.models import Encounter
+from scripts.log_helpers import get_log_path_view
+from scripts.utilities.evtc_header import read_evtc_header
+
+logger = logging.getLogger(__name__)
+
+# Only logs up to this size are scanned to the end for the exact fight length.
+FULL_SCAN_MAX_BYTES = 2_000_000
+
+
+class LogPrefilter:
+    """Decide from the evtc header if a log is worth parsing.
+
+    Parameters
+    ----------
+    itype_groups : list[str]
+        Instance groups that are processed, e.g. ["raid", "strike"]
+    too_short_ms : int
+        Fights shorter than this are skipped, use EliteInsightsParser.too_short_ms.
+
+    Methods
+    -------
+    skip_reason(log_path)
+        Why the log should not be parsed, None when it should be.
+    log_summary()
+        Log how many parses were saved.
+    """
+
+    def __init__(self, itype_groups: list[str], too_short_ms: int):
+        self.itype_groups = itype_groups
+        self.too_short_ms = too_short_ms
+        self.skipped = Counter()  # reason -> number of logs
+
+        # Instance group of each known boss id
+        self._instance_groups = dict(
+            Encounter.objects.filter(dpsreport_boss_id__isnull=False).values_list(
+                "dpsreport_boss_id", "instance__instance_group__name"
+            )
+        )
+
+    def skip_reason(self, log_path: Path) -> Optional[str]:
+        try:
+            header = read_evtc_header(log_path)
+            if not header.complete and log_path.stat().st_size <= FULL_SCAN_MAX_BYTES:
+                header = read_evtc_header(log_path, read_all_events=True)
+        except (OSError, ValueError) as e:
+            logger.debug(f"{get_log_path_view(log_path)}: Header not readable, leaving it to EI: {e}")
+            return None
+
+        instance_group = self._instance_groups.get(header.boss_id)
+        if instance_group is not None and instance_group not in self.itype_groups:
+            return self._skip(log_path, reason=f"instance group {instance_group}")
+
+        _, upper_ms = header.duration_bounds_ms  # Only known when all events were read
+        if upper_ms is not None and upper_ms < self.too_short_ms:
+            return self._skip(log_path, reason="too short")
+        return None
+
+    def _skip(self, log_path: Path, reason: str) -> str:
+        self.skipped[reason] += 1
+        logger.info(f"{get_log_path_view(log_path)}: Skipped before parsing, {reason}")
+        return reason
+
+    def log_summary(self) -> None:
+        if self.skipped:
+            reasons = ", ".join(f"{reason}: {count}" for reason, count in self.skipped.items())
+            logger.info(f"Prefilter saved {sum(self.skipped.values())} Elite Insights parses ({reasons})")
+
+
+# %%
+if __name__ == "__main__":
+    from django.conf import settings
+
+    prefilter = LogPrefilter(itype_groups=["raid", "strike", "fractal"], too_short_ms=2200)
+    for log_path in sorted(settings.DPS_LOGS_DIR.rglob("*.zevtc"))[-20:]:
+        print(log_path.name, prefilter.skip_reason(log_path))
+    prefilter.log_summary()
+# %%
@@ -17,7 +17,7 @@ import logging
 from dataclasses import dataclass
 from functools import cached_property
 from pathlib import Path
-from typing import Literal, Optional, Tuple
+from typing import Optional
 
 from django.conf import settings
 from gw2_logs.models import (
@@ -26,7 +26,7 @@ from gw2_logs.models import (
 from scripts.log_helpers import (
     get_log_path_view,
 )
-from scripts.log_processing.dps_report_client import DpsReportClient
+from scripts.log_processing.dps_report_client import DpsReportClient, UploadResult
 from scripts.log_processing.ei_parser import EliteInsightsParser
 from scripts.model_interactions.dpslog_service import DpsLogService
 from scripts.utilities.failed_log_mover import move_failed_log
@@ -50,6 +50,9 @@ class LogUploader:
         URL to dps.report log
     only_url : (bool) default False
         Only update the url, nothing else. We want this when log is already parsed locally.
+    upload_result : (tuple) default None
+        Result of DpsReportClient.upload_log when the log was already uploaded by the
+        upload stage of the LogPipeline. The log is then not uploaded again.
     """
 
     log_path: Path = None
@@ -57,6 +60,7 @@ class LogUploader:
     parsed_path: Path = None
     only_url: bool = False
     allow_reparse: bool = True
+    upload_result: Optional[UploadResult] = None
 
     def __post_init__(self):
         if self.log_path:
@@ -105,7 +109,7 @@ class LogUploader:
             return self.dpslog_service.get_by_url(self.log_url)
         return None
 
-    def get_or_upload_log(self) -> Tuple[Optional[MetadataParsed], Literal["failed", "forbidden", None]]:
+    def get_or_upload_log(self) -> UploadResult:
         """Get log from database, if not there, upload it.
         If there is a reason to move the log, return that too.
         """
@@ -124,7 +128,10 @@ class LogUploader:
         metadata = None
         move_reason = None
 
-        if should_upload:
+        if should_upload and self.upload_result is not None:
+            metadata, move_reason = self.upload_result
+
+        elif should_upload:
             logger.info(f"{self.log_source_view}: Uploading log")
             metadata, move_reason = self.dps_report_client.upload_log(log_path=self.log_path)
 
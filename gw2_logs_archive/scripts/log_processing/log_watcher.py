@@ -0,0 +1,144 @@
+# %%
+"""Filesystem watcher for new arcdps logs
+
+Instead of walking the whole arcdps.cbtlogs tree on every poll, the `LogWatcher`
+receives events from the operating system when a log is written. New paths are
+collected until `LogFilesDate` picks them up.
+
+The watcher uses the optional `watchdog` package (`pip install watchdog`). When it
+is not installed, `LogWatcher.create` returns None and `LogFilesDate` falls back to
+polling the log directories.
+"""
+
+if __name__ == "__main__":
+    from scripts.utilities import django_setup
+
+    django_setup.run()
+
+import fnmatch
+import logging
+import threading
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    from watchdog.events import FileSystemEvent, FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+
+class _LogEventHandler(FileSystemEventHandler):
+    """Forward created, modified and moved log files to the watcher."""
+
+    def __init__(self, watcher: "LogWatcher"):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_created(self, event: "FileSystemEvent") -> None:
+        self.watcher.add_path(event.src_path)
+
+    def on_modified(self, event: "FileSystemEvent") -> None:
+        self.watcher.add_path(event.src_path)
+
+    def on_closed(self, event: "FileSystemEvent") -> None:
+        self.watcher.add_path(event.src_path)
+
+    def on_moved(self, event: "FileSystemEvent") -> None:
+        self.watcher.add_path(event.dest_path)
+
+
+class LogWatcher:
+    """Watch log directories for new log files matching a pattern.
+
+    Parameters
+    ----------
+    log_search_dirs : list[Path]
+        Directories to watch, subdirectories are included.
+    pattern : str
+        Filename pattern of the logs, e.g. '20260122*.zevtc'
+    """
+
+    def __init__(self, log_search_dirs: list[Path], pattern: str):
+        if Observer is None:
+            raise ImportError("watchdog is not installed")
+
+        self.log_search_dirs = log_search_dirs
+        self.pattern = pattern
+
+        self._lock = threading.Lock()
+        self._new_paths: set[Path] = set()
+        self._has_new_paths = threading.Event()
+
+        self._observer = Observer()
+        handler = _LogEventHandler(self)
+        for folder in self.log_search_dirs:
+            self._observer.schedule(handler, str(folder), recursive=True)
+
+    @classmethod
+    def create(cls, log_search_dirs: list[Path], pattern: str) -> Optional["LogWatcher"]:
+        """Create and start a watcher. Returns None when watching is not possible,
+        the caller should poll the directories instead.
+        """
+        try:
+            watcher = cls(log_search_dirs=log_search_dirs, pattern=pattern)
+            watcher.start()
+        except (ImportError, OSError) as e:
+            logger.info(f"Filesystem watcher not available ({e}), polling log directories instead.")
+            return None
+        return watcher
+
+    def start(self) -> None:
+        self._observer.daemon = True
+        self._observer.start()
+        logger.info(f"Watching {len(self.log_search_dirs)} log directories for new logs")
+
+    def stop(self) -> None:
+        self._observer.stop()
+        self._observer.join(timeout=5)
+
+    @property
+    def is_alive(self) -> bool:
+        return self._observer.is_alive()
+
+    def add_path(self, path: str | bytes) -> None:
+        """Store the path when it matches the pattern. Called from the observer thread."""
+        if isinstance(path, bytes):
+            path = path.decode()
+        path = Path(path)
+        if not fnmatch.fnmatch(path.name, self.pattern):
+            return
+
+        with self._lock:
+            self._new_paths.add(path)
+            self._has_new_paths.set()
+
+    def wait(self, timeout: float) -> bool:
+        """Block until a new log is seen or the timeout passed.
+        Returns True when there are new logs waiting.
+        """
+        return self._has_new_paths.wait(timeout=timeout)
+
+    def pop_new_paths(self) -> list[Path]:
+        """Return the new log paths since the last call and reset."""
+        with self._lock:
+            new_paths = sorted(self._new_paths)
+            self._new_paths.clear()
+            self._has_new_paths.clear()
+        return new_paths
+
+
+# %%
+if __name__ == "__main__":
+    from django.conf import settings
+    from scripts.log_helpers import today_y_m_d, zfill_y_m_d
+
+    watcher = LogWatcher.create([settings.DPS_LOGS_DIR], pattern=f"{zfill_y_m_d(*today_y_m_d())}*.zevtc")
+    if watcher is not None:
+        watcher.wait(timeout=60)
+        print(watcher.pop_new_paths())
+        watcher.stop()
+# %%
@@ -6,6 +6,11 @@ parses them locally with the Elite Insights parser, or uploads them to
 dps.report. Creation and updating of database records is delegated to
 `DpsLogService` so this module focuses on file-level flow and marking
 processing state.
+
+Local parsing runs several Elite Insights processes at the same time, the
+database step still handles the logs one by one in start-time order.
+The runners use the `LogPipeline`, this module does a single pass and holds the
+per-log steps that the pipeline stages share.
 """
 
 if __name__ == "__main__":
@@ -15,11 +20,15 @@ if __name__ == "__main__":
 
 
 import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Literal, Optional
+from typing import Iterator, Literal, Optional
 
+from django.conf import settings
 from gw2_logs.models import DpsLog
-from scripts.log_processing.ei_parser import EliteInsightsParser
+from scripts.log_processing.dps_report_client import UploadResult
+from scripts.log_processing.ei_parser import EI_MAX_LOGS_PER_PROCESS, EliteInsightsParser
 from scripts.log_processing.log_files import LogFile, LogFilesDate
 from scripts.log_processing.log_uploader import LogUploader
 from scripts.model_interactions.dpslog_service import DpsLogService
@@ -27,10 +36,53 @@ from scripts.model_interactions.dpslog_service import DpsLogService
 logger = logging.getLogger(__name__)
 
 
+def _parse_logs_local(
+    log_paths: list[Path],
+    ei_parser: EliteInsightsParser,
+    max_workers: int,
+) -> Iterator[tuple[Path, Optional[Path]]]:
+    """Parse logs with a bounded pool of Elite Insights processes.
+
+    The EI CLI runs in a subprocess, so threads are enough to keep multiple cores busy.
+    Logs are split in chunks so every worker gets a share, each chunk is parsed by a
+    single EI process (see EliteInsightsParser.parse_logs).
+    Results are yielded in the order of log_paths, as soon as that log and all logs before it
+    are parsed. This way the database step can start while the remaining logs are still parsing.
+
+    Parameters
+    ----------
+    log_paths : list[Path]
+        Paths to the logfiles, sorted by start time
+    ei_parser : EliteInsightsParser
+        Initialized EliteInsightsParser instance for parsing the logs
+    max_workers : int
+        Maximum number of EI processes running at the same time
+
+    Yields
+    ------
+    (log_path, parsed_path), parsed_path is None when parsing failed.
+    """
+    if len(log_paths) == 0:
+        return
+
+    max_workers = max(1, min(max_workers, len(log_paths)))
+    chunk_size = min(EI_MAX_LOGS_PER_PROCESS, math.ceil(len(log_paths) / max_workers))
+    chunks = [log_paths[idx : idx + chunk_size] for idx in range(0, len(log_paths), chunk_size)]
+
+    logger.debug(f"Parsing {len(log_paths)} logs in {len(chunks)} chunks with {max_workers} Elite Insights workers")
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ei_parser") as executor:
+        for chunk, parsed_paths in zip(
+            chunks, executor.map(lambda chunk: ei_parser.parse_logs(log_paths=chunk, chunk_size=chunk_size), chunks)
+        ):
+            for log_path in chunk:
+                yield log_path, parsed_paths[log_path]
+
+
 def _process_log_local(
     log_path: Path,
     ei_parser: EliteInsightsParser,
     force_update: bool = False,
+    parsed_path: Optional[Path] = None,
 ) -> Optional[DpsLog]:
     """Parse log locally with the EliteInsightsParser and create or update DpsLog in database.
 
@@ -40,9 +92,12 @@ def _process_log_local(
         Path to the logfile
     ei_parser : EliteInsightsParser
         Initialized EliteInsightsParser instance for parsing the log
+    parsed_path : Optional[Path], default None
+        Path to the already parsed json. When None, the log is parsed here.
     """
 
-    parsed_path = ei_parser.parse_log(log_path=log_path)
+    if parsed_path is None:
+        parsed_path = ei_parser.parse_log(log_path=log_path)
     if parsed_path is not None:
         detailed_parsed_log = EliteInsightsParser.load_parsed_json(parsed_path=parsed_path)
         dpslog = DpsLogService().get_update_create_from_ei_parsed_log(
@@ -57,6 +112,7 @@ def _process_log_local(
 def _process_log_upload(
     log_path: Path,
     ei_parser: EliteInsightsParser,
+    upload_result: Optional[UploadResult] = None,
 ) -> Optional[DpsLog]:
     """Upload log to dps.report and update the DpsLog in database.
     Log must be parsed locally before uploading
@@ -67,11 +123,15 @@ def _process_log_upload(
         Path to the logfile
     ei_parser : EliteInsightsParser
         Initialized EliteInsightsParser instance for parsing the log
+    upload_result : Optional[UploadResult], default None
+        Result of an upload that already finished in the upload stage of the LogPipeline.
     """
     # Upload to dps.report
     parsed_path = ei_parser.find_parsed_json(log_path=log_path)
     if parsed_path:
-        log_upload = LogUploader(log_path=log_path, parsed_path=parsed_path, only_url=True)
+        log_upload = LogUploader(
+            log_path=log_path, parsed_path=parsed_path, only_url=True, upload_result=upload_result
+        )
         dpslog = log_upload.run()
     else:
         dpslog = None
@@ -118,6 +178,14 @@ def process_logs_once(
     # Find unprocessed logs for date
     logfiles: list[LogFile] = log_files_date_cls.get_unprocessed_logs(processing_type=processing_type)
 
+    # Start parsing all logs in parallel, results come back in start-time order.
+    if processing_type == "local":
+        parsed_logs = _parse_logs_local(
+            log_paths=[logfile.path for logfile in logfiles],
+            ei_parser=ei_parser,
+            max_workers=settings.EI_PARSER_MAX_WORKERS,
+        )
+
     # Process each log
     processed_logs: list[DpsLog] = []
     for logfile in logfiles:
@@ -125,7 +193,13 @@ def process_logs_once(
 
         # Handle local processing
         if processing_type == "local":
-            dpslog = _process_log_local(log_path=log_path, ei_parser=ei_parser, force_update=force_update)
+            _, parsed_path = next(parsed_logs)
+            if parsed_path is None:
+                dpslog = None
+            else:
+                dpslog = _process_log_local(
+                    log_path=log_path, ei_parser=ei_parser, force_update=force_update, parsed_path=parsed_path
+                )
 
             if dpslog is None:
                 logger.warning(
@@ -0,0 +1,207 @@
+# %%
+"""Bulk import of dps.report urls
+
+`LogUploader(log_url=...)` handles a single url with a few requests and several
+saves. For importing hundreds of permalinks the `BulkUrlImporter` works in batches:
+- urls already in the database are skipped with one query
+- metadata (and the detailed json of wipes) is fetched concurrently
+- the DpsLogs of a batch are written with bulk_create/bulk_update in one transaction
+"""
+
+if __name__ == "__main__":
+    from scripts.utilities import django_setup
+
+    django_setup.run()
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from django.db import transaction
+from gw2_logs.models import DpsLog, Encounter
+from scripts.log_processing.dps_report_client import AsyncDpsReportClient
+from scripts.model_interactions.player_role_registry import PLAYER_ROLE_REGISTRY
+from scripts.model_interactions.rank_index import RANK_INDEX
+from scripts.utilities.metadata_parsed import MetadataParsed
+from scripts.utilities.parsed_log import DetailedParsedLog
+
+logger = logging.getLogger(__name__)
+
+DPSLOG_FIELDS = {field.name for field in DpsLog._meta.concrete_fields} - {"id"}
+
+
+@dataclass
+class UrlImportStats:
+    """Counts of a BulkUrlImporter run."""
+
+    total: int = 0
+    skipped: int = 0  # Already in database or duplicate
+    failed: int = 0
+    created: int = 0
+    updated: int = 0
+    seconds: float = 0
+
+    @property
+    def done(self) -> int:
+        return self.skipped + self.failed + self.created + self.updated
+
+    @property
+    def urls_per_second(self) -> float:
+        return self.done / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.done}/{self.total} urls ({self.urls_per_second:.1f} urls/s): "
+            f"{self.created} created, {self.updated} updated, {self.skipped} skipped, {self.failed} failed"
+        )
+
+
+class BulkUrlImporter:
+    """Import many dps.report urls into the database.
+
+    Parameters
+    ----------
+    batch_size : int, default 100
+        Number of urls fetched and written per transaction.
+    """
+
+    def __init__(self, batch_size: int = 100):
+        self.batch_size = batch_size
+
+    def run(self, urls: list[str]) -> UrlImportStats:
+        start = time.perf_counter()
+        stats = UrlImportStats()
+
+        urls = list(dict.fromkeys(url.strip() for url in urls if url.strip() != ""))
+        stats.total = len(urls)
+
+        # Dedupe against the database in a single query
+        existing_urls = set(DpsLog.objects.filter(url__in=urls).values_list("url", flat=True))
+        stats.skipped = len(existing_urls)
+        urls = [url for url in urls if url not in existing_urls]
+        logger.info(f"Importing {len(urls)} urls, {len(existing_urls)} already in database")
+
+        for idx in range(0, len(urls), self.batch_size):
+            batch = urls[idx : idx + self.batch_size]
+            fetched = asyncio.run(self._fetch(batch))
+            self._write(fetched, stats=stats)
+
+            stats.seconds = time.perf_counter() - start
+            logger.info(str(stats))
+
+        stats.seconds = time.perf_counter() - start
+        return stats
+
+    async def _fetch(self, urls: list[str]) -> list[tuple[str, Optional[MetadataParsed], Optional[DetailedParsedLog]]]:
+        """Fetch metadata of all urls concurrently. Wipes also need the detailed json
+        for the final health percentage.
+        """
+        async with AsyncDpsReportClient() as client:
+            metadatas = await asyncio.gather(
+                *[client.request_metadata(url=url) for url in urls], return_exceptions=True
+            )
+            metadatas = [None if isinstance(metadata, Exception) else metadata for metadata in metadatas]
+
+            wipe_urls = [
+                url
+                for url, metadata in zip(urls, metadatas)
+                if metadata is not None and not metadata.data.get("encounter", {}).get("success")
+            ]
+            detaileds = await asyncio.gather(
+                *[client.request_detailed_info(url=url) for url in wipe_urls], return_exceptions=True
+            )
+            detailed_by_url = {
+                url: detailed for url, detailed in zip(wipe_urls, detaileds) if not isinstance(detailed, Exception)
+            }
+
+        return [(url, metadata, detailed_by_url.get(url)) for url, metadata in zip(urls, metadatas)]
+
+    def _write(
+        self,
+        fetched: list[tuple[str, Optional[MetadataParsed], Optional[DetailedParsedLog]]],
+        stats: UrlImportStats,
+    ) -> None:
+        """Create or update the DpsLogs of a batch in one transaction, matched on start_time."""
+        defaults_by_start_time = {}
+        for url, metadata, detailed_parsed_log in fetched:
+            if metadata is None:
+                logger.error(f"{url}: No metadata received")
+                stats.failed += 1
+                continue
+
+            metadata.apply_boss_fixes()
+            metadata.apply_metadata_fix()
+
+            defaults = metadata.to_dpslog_defaults()
+            if defaults["success"]:
+                defaults["final_health_percentage"] = 0
+            elif detailed_parsed_log is not None:
+                defaults["final_health_percentage"] = detailed_parsed_log.get_final_health_percentage()
+                if defaults["final_health_percentage"] == 100.0 and defaults["boss_name"] == "Eye of Fate":
+                    logger.info(f"{url}: Eye of Fate without damage, skipping")
+                    stats.failed += 1
+                    continue
+
+            if metadata.start_time in defaults_by_start_time:
+                stats.skipped += 1  # Same log uploaded twice
+                continue
+            defaults_by_start_time[metadata.start_time] = defaults
+
+        if not defaults_by_start_time:
+            return
+
+        # Lookups for the whole batch
+        boss_ids = {defaults["boss_id"] for defaults in defaults_by_start_time.values()}
+        encounters = {
+            encounter.dpsreport_boss_id: encounter
+            for encounter in Encounter.objects.filter(dpsreport_boss_id__in=boss_ids)
+        }
+        for defaults in defaults_by_start_time.values():
+            defaults["encounter"] = encounters.get(defaults["boss_id"])
+            if defaults["encounter"] is None:
+                logger.critical(f"Encounter not part of database. Register? {defaults['boss_name']}")
+            defaults["core_player_count"], defaults["friend_player_count"] = PLAYER_ROLE_REGISTRY.count_roles(
+                defaults["players"]
+            )
+
+        with transaction.atomic():
+            existing = DpsLog.objects.in_bulk(list(defaults_by_start_time), field_name="start_time")
+
+            to_create, to_update = [], []
+            update_fields = set()
+            for start_time, defaults in defaults_by_start_time.items():
+                fields = {key: value for key, value in defaults.items() if key in DPSLOG_FIELDS}
+                dpslog = existing.get(start_time)
+                if dpslog is None:
+                    to_create.append(DpsLog(start_time=start_time, **fields))
+                else:
+                    fields.pop("local_path")  # An url has no local path, keep the one we have.
+                    for key, value in fields.items():
+                        setattr(dpslog, key, value)
+                    update_fields.update(fields)
+                    to_update.append(dpslog)
+
+            # Bulk writes skip DpsLog.save, which keeps local_name in sync with local_path.
+            for dpslog in to_create + to_update:
+                dpslog.local_name = DpsLog.get_local_name(dpslog.local_path)
+            update_fields.add("local_name")
+
+            DpsLog.objects.bulk_create(to_create)
+            if to_update:
+                DpsLog.objects.bulk_update(to_update, fields=sorted(update_fields))
+        RANK_INDEX.clear()  # Bulk writes don't send the signals that keep it up to date
+
+        stats.created += len(to_create)
+        stats.updated += len(to_update)
+
+
+# %%
+if __name__ == "__main__":
+    from django.conf import settings
+
+    urls = settings.PROJECT_DIR.joinpath("bin", "urls.txt").read_text().replace(";", "\n").split()
+    stats = BulkUrlImporter().run(urls=urls)
+    print(stats)
+# %%
@@ -18,7 +18,7 @@ class DpsLogRepository:
     @staticmethod
     def find_by_log_path(log_path: Path) -> Optional[DpsLog]:
         try:
-            return DpsLog.objects.get(local_path__endswith=log_path.name)
+            return DpsLog.objects.get(local_name=log_path.name)
         except DpsLog.DoesNotExist:
             return None
 
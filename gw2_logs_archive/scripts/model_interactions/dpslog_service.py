@@ -12,15 +12,12 @@ if __name__ == "__main__":
 
     django_setup.run()
 
-import datetime
 import logging
-from itertools import chain
 from pathlib import Path
 from typing import Optional
 
 from django.conf import settings
-from django.db.models import Q
-from gw2_logs.models import DpsLog, InstanceClear, Player
+from gw2_logs.models import DpsLog, InstanceClear
 from scripts.log_helpers import (
     get_emboldened_wing,
     get_log_path_view,
@@ -28,6 +25,8 @@ from scripts.log_helpers import (
 )
 from scripts.model_interactions.dpslog_repository import DpsLogRepository
 from scripts.model_interactions.encounter import EncounterInteraction
+from scripts.model_interactions.player_role_registry import PLAYER_ROLE_REGISTRY
+from scripts.model_interactions.rank_index import RANK_INDEX
 from scripts.utilities.failed_log_mover import move_failed_log
 from scripts.utilities.metadata_parsed import MetadataParsed
 from scripts.utilities.parsed_log import DetailedParsedLog
@@ -82,8 +81,9 @@ class DpsLogService:
 
             # Resolve encounter and compute role-based player counts in service (ORM)
             defaults["encounter"] = detailed_parsed_log.encounter
-            defaults["core_player_count"] = len(Player.objects.filter(gw2_id__in=defaults["players"], role="core"))
-            defaults["friend_player_count"] = len(Player.objects.filter(gw2_id__in=defaults["players"], role="friend"))
+            defaults["core_player_count"], defaults["friend_player_count"] = PLAYER_ROLE_REGISTRY.count_roles(
+                defaults["players"]
+            )
 
             dpslog, created = self.repo.update_or_create(start_time=start_time, defaults=defaults)
         return dpslog
@@ -106,8 +106,9 @@ class DpsLogService:
 
             # Resolve encounter and compute role-based player counts in service (ORM)
             defaults["encounter"] = EncounterInteraction.find_by_dpsreport_metadata(metadata.data)
-            defaults["core_player_count"] = len(Player.objects.filter(gw2_id__in=defaults["players"], role="core"))
-            defaults["friend_player_count"] = len(Player.objects.filter(gw2_id__in=defaults["players"], role="friend"))
+            defaults["core_player_count"], defaults["friend_player_count"] = PLAYER_ROLE_REGISTRY.count_roles(
+                defaults["players"]
+            )
 
         dpslog, created = self.repo.update_or_create(start_time=metadata.start_time, defaults=defaults)
         return dpslog
@@ -151,10 +152,7 @@ class DpsLogService:
                     logger.warning("No detailed_parsed_log provided to fix_emboldened")
                     dpslog.emboldened = False
                 else:
-                    if "presentInstanceBuffs" in detailed_parsed_log.data:
-                        dpslog.emboldened = 68087 in list(chain(*detailed_parsed_log.data["presentInstanceBuffs"]))
-                    else:
-                        dpslog.emboldened = False
+                    dpslog.emboldened = 68087 in detailed_parsed_log.get_instance_buff_ids()
             else:
                 dpslog.emboldened = False
 
@@ -179,21 +177,14 @@ class DpsLogService:
         '<:r20_of45_slower1804_9s:1240399925502545930>'
         """
 
-        encounter_success_all = None
-        if dpslog.success:
-            encounter_success_all = list(
-                dpslog.encounter.dps_logs.filter(success=True, cm=dpslog.cm, emboldened=False)
-                .filter(
-                    Q(start_time__gte=dpslog.start_time - datetime.timedelta(days=9999))
-                    & Q(start_time__lte=dpslog.start_time)
-                )
-                .order_by("duration")
-            )
+        rank_info = None
+        if dpslog.success and not dpslog.emboldened:
+            rank_info = RANK_INDEX.rank(dpslog)
         rank_str = get_rank_emote(
             indiv=dpslog,
-            group_list=encounter_success_all,
             core_minimum=settings.CORE_MINIMUM[dpslog.encounter.instance.instance_group.name],
             custom_emoji_name=False,
+            rank_info=rank_info,
         )
         return rank_str
 
@@ -0,0 +1,119 @@
+# %%
+"""Emoji registry
+
+All emojis are loaded with a single query the first time one is needed and kept
+for the process. Saving or deleting an Emoji clears the registry, so the next
+lookup loads them again. `LazyEmotes` dicts, like the rank and wipe emotes in
+log_helpers, are built on first use and rebuilt after the registry is cleared.
+Nothing is queried on import.
+"""
+
+if __name__ == "__main__":
+    from scripts.utilities import django_setup
+
+    django_setup.run()
+
+import logging
+import threading
+from collections.abc import Mapping
+from typing import Callable, Literal, Optional
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from gw2_logs.models import Emoji
+
+logger = logging.getLogger(__name__)
+
+
+class EmojiRegistry:
+    """Emojis by name, loaded in one query on first use.
+
+    Methods
+    -------
+    get(name)
+        Emoji with that name, raises Emoji.DoesNotExist like Emoji.objects.get.
+    discord_tag(name, difficulty)
+        Shortcut for get(name).discord_tag(difficulty).
+    discord_tag_custom_name(name, difficulty)
+        Shortcut for get(name).discord_tag_custom_name(difficulty).
+    clear()
+        Forget the loaded emojis, e.g. after one was changed.
+    """
+
+    def __init__(self):
+        self.version = 0  # Increased on every clear, LazyEmotes rebuild when it changed.
+        self._emojis: Optional[dict[str, Emoji]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict[str, Emoji]:
+        with self._lock:
+            if self._emojis is None:
+                self._emojis = {emoji.name: emoji for emoji in Emoji.objects.all()}
+                logger.debug(f"Loaded {len(self._emojis)} emojis")
+            return self._emojis
+
+    def get(self, name: str) -> Emoji:
+        try:
+            return self._load()[name]
+        except KeyError:
+            raise Emoji.DoesNotExist(f"Emoji '{name}' does not exist") from None
+
+    def discord_tag(self, name: str, difficulty: Literal["normal", "cm", "lcm"] = "normal") -> str:
+        return self.get(name).discord_tag(difficulty)
+
+    def discord_tag_custom_name(self, name: str, difficulty: Literal["normal", "cm", "lcm"] = "normal") -> str:
+        return self.get(name).discord_tag_custom_name(difficulty)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._emojis = None
+            self.version += 1
+
+
+EMOJIS = EmojiRegistry()
+
+
+class LazyEmotes(Mapping):
+    """Read-only dict of emote strings, built from the EMOJIS registry on first use.
+
+    Parameters
+    ----------
+    build : Callable[[], dict]
+        Creates the dict, e.g. lambda: {"core": EMOJIS.discord_tag("core")}
+    """
+
+    def __init__(self, build: Callable[[], dict], registry: EmojiRegistry = EMOJIS):
+        self._build = build
+        self._registry = registry
+        self._dict: Optional[dict] = None
+        self._version = -1
+
+    def _data(self) -> dict:
+        if self._dict is None or self._version != self._registry.version:
+            self._version = self._registry.version
+            self._dict = self._build()
+        return self._dict
+
+    def __getitem__(self, key):
+        return self._data()[key]
+
+    def __iter__(self):
+        return iter(self._data())
+
+    def __len__(self) -> int:
+        return len(self._data())
+
+    def __repr__(self) -> str:
+        return f"LazyEmotes({self._data()!r})"
+
+
+@receiver(post_save, sender=Emoji)
+@receiver(post_delete, sender=Emoji)
+def _clear_emoji_registry(sender, instance, **kwargs):
+    EMOJIS.clear()
+
+
+# %%
+if __name__ == "__main__":
+    print(EMOJIS.discord_tag("core"))
+# %%
@@ -4,19 +4,18 @@ if __name__ == "__main__":
 
     django_setup.run()
 
-import datetime
 import logging
 from dataclasses import dataclass
 
 import numpy as np
 from django.conf import settings
-from django.db.models import Q
 from gw2_logs.models import (
     DpsLog,
     InstanceClear,
     InstanceClearGroup,
 )
 from scripts.log_helpers import get_rank_emote
+from scripts.model_interactions.rank_index import RANK_INDEX
 
 logger = logging.getLogger(__name__)
 
@@ -93,19 +92,12 @@ class InstanceClearInteraction:
         example:
         '<:r20_of45_slower1804_9s:1240399925502545930>'
         """
-        success_group = None
-        if self.iclear.success:
-            success_group = list(
-                self.iclear.instance.instance_clears.filter(success=True, emboldened=False)
-                .filter(
-                    Q(start_time__gte=self.iclear.start_time - datetime.timedelta(days=9999))
-                    & Q(start_time__lte=self.iclear.start_time),
-                )
-                .order_by("duration")
-            )
+        rank_info = None
+        if self.iclear.success and not self.iclear.emboldened:
+            rank_info = RANK_INDEX.rank(self.iclear)
         rank_str = get_rank_emote(
             indiv=self.iclear,
-            group_list=success_group,
             core_minimum=settings.CORE_MINIMUM[self.iclear.instance.instance_group.name],
+            rank_info=rank_info,
         )
         return rank_str
@@ -9,9 +9,9 @@ import logging
 from dataclasses import dataclass
 
 import numpy as np
-import pandas as pd
 from django.conf import settings
 from django.db.models import Q, QuerySet
+from django.utils import timezone
 from gw2_logs.models import (
     DpsLog,
     Encounter,
@@ -31,6 +31,7 @@ from scripts.log_helpers import (
     zfill_y_m_d,
 )
 from scripts.model_interactions.instance_clear import InstanceClearInteraction
+from scripts.model_interactions.rank_index import RANK_INDEX
 
 logger = logging.getLogger(__name__)
 
@@ -47,11 +48,12 @@ class InstanceClearGroupInteraction:
     @classmethod
     def create_from_date(cls, y: int, m: int, d: int, itype_group: str):
         """Create an instance clear group from a specific date."""
-        # All logs in a day
+        # All logs in a day. A range on start_time can use its index, __year/__month/__day can't.
+        day_start = timezone.make_aware(datetime.datetime(y, m, d))
+        day_end = timezone.make_aware(datetime.datetime(y, m, d) + datetime.timedelta(days=1))
         logs_day = DpsLog.objects.filter(
-            start_time__year=y,
-            start_time__month=m,
-            start_time__day=d,
+            start_time__gte=day_start,
+            start_time__lt=day_end,
             encounter__instance__instance_group__name=itype_group,
             is_progression_log=False,
         ).exclude(encounter__instance__instance_group__name="golem")
@@ -118,6 +120,8 @@ class InstanceClearGroupInteraction:
 
         # For raids and strikes we need to check multiple clears since they may not be done in one session.
         if self.iclear_group.type in ["raid", "strike"]:
+            import pandas as pd  # Only needed for raid and strike weeks, keeps the module import light
+
             week_clears = self.get_week_clears()
 
             week_logs = DpsLog.objects.filter(
@@ -233,28 +237,15 @@ class InstanceClearGroupInteraction:
         '<:r20_of45_slower1804_9s:1240399925502545930>'
         """
         icg = self.iclear_group
-        icg_type = icg.type
-
-        # This is a str of wings + bosses that is included when looking up rank.
-        duration_encounters: str = icg.duration_encounters
 
-        # Find all older icgs and sort them by duration
-        group = list(
-            InstanceClearGroup.objects.filter(
-                success=True,
-                duration_encounters=duration_encounters,
-                type=icg_type,
-            )
-            .filter(start_time__lte=icg.start_time)
-            .exclude(name__icontains="cm__")
-            .order_by("duration")
-        )
+        # Rank among older icgs with the same wings + bosses (duration_encounters)
+        rank_info = RANK_INDEX.rank(icg) if icg.success else None
 
         # Create the rank emote str
         rank_str = get_rank_emote(
             indiv=icg,
-            group_list=group,
-            core_minimum=settings.CORE_MINIMUM[icg_type],
+            core_minimum=settings.CORE_MINIMUM[icg.type],
+            rank_info=rank_info,
         )
         return rank_str
 
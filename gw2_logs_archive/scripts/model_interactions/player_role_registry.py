@@ -0,0 +1,87 @@
+# %%
+"""Player role registry
+
+Core and friend counts of a log only need the role of each gw2 account. Instead
+of two Player queries per log, `PLAYER_ROLE_REGISTRY` loads all (gw2_id, role)
+pairs with one query and counts the roles in memory.
+
+Saving or deleting a Player clears the registry. Players are usually added in the
+admin, which runs in another process than the log processing, so the roles are
+also reloaded once they are older than MAX_AGE_SECONDS.
+"""
+
+if __name__ == "__main__":
+    from scripts.utilities import django_setup
+
+    django_setup.run()
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from gw2_logs.models import Player
+
+logger = logging.getLogger(__name__)
+
+MAX_AGE_SECONDS = 60
+
+
+class PlayerRoleRegistry:
+    """Roles of the registered players by gw2_id, loaded in one query on first use.
+
+    Methods
+    -------
+    count_roles(players)
+        Number of core and friend players in a list of gw2 ids.
+    clear()
+        Forget the loaded roles, e.g. after a Player was changed.
+    """
+
+    def __init__(self, max_age_seconds: float = MAX_AGE_SECONDS):
+        self.max_age_seconds = max_age_seconds
+        self._roles: Optional[dict[str, list[str]]] = None
+        self._loaded = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict[str, list[str]]:
+        with self._lock:
+            if self._roles is None or time.monotonic() - self._loaded > self.max_age_seconds:
+                # gw2_id is not unique on Player, keep every role so the counts match a Player query.
+                roles = defaultdict(list)
+                for gw2_id, role in Player.objects.filter(role__isnull=False).values_list("gw2_id", "role"):
+                    roles[gw2_id].append(role)
+                self._roles = dict(roles)
+                self._loaded = time.monotonic()
+                logger.debug(f"Loaded roles of {len(self._roles)} players")
+            return self._roles
+
+    def count_roles(self, players: Iterable[str]) -> tuple[int, int]:
+        """Return (core_player_count, friend_player_count) of the gw2 ids in players.
+        The same as counting Player.objects.filter(gw2_id__in=players, role=...) for both roles.
+        """
+        roles = self._load()
+        player_roles = [role for gw2_id in set(players or []) for role in roles.get(gw2_id, [])]
+        return player_roles.count("core"), player_roles.count("friend")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._roles = None
+
+
+PLAYER_ROLE_REGISTRY = PlayerRoleRegistry()
+
+
+@receiver(post_save, sender=Player)
+@receiver(post_delete, sender=Player)
+def _clear_player_role_registry(sender, instance, **kwargs):
+    PLAYER_ROLE_REGISTRY.clear()
+
+
+# %%
+if __name__ == "__main__":
+    print(PLAYER_ROLE_REGISTRY.count_roles(Player.objects.values_list("gw2_id", flat=True)))
+# %%
@@ -0,0 +1,293 @@
+# %%
+"""Rank index of successful clears
+
+Rank emotes need the rank of a log among the earlier successful logs of the same
+encounter and difficulty, how many there are, the fastest durations and the
+mean/median duration. Instead of loading the full ordered group from the database
+for every emote, `RANK_INDEX` keeps every group in memory as a list sorted on
+duration, loaded once with only (id, start_time, duration).
+
+A rank up to time T only has to skip the few entries that started after T, so the
+rank of the newest log is a bisect. Loaded groups are updated on post_save and
+post_delete. bulk_create/bulk_update don't send signals, call `RANK_INDEX.clear()`
+after those. Changes made by other processes are picked up once a group is older
+than MAX_AGE_SECONDS.
+"""
+
+if __name__ == "__main__":
+    from scripts.utilities import django_setup
+
+    django_setup.run()
+
+import bisect
+import datetime
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional, Union
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from gw2_logs.models import DpsLog, InstanceClear, InstanceClearGroup
+
+logger = logging.getLogger(__name__)
+
+MAX_AGE_SECONDS = 300
+
+Ranked = Union[DpsLog, InstanceClear, InstanceClearGroup]
+_Entry = tuple[datetime.timedelta, int, datetime.datetime]  # (duration, id, start_time), sorted on duration
+
+
+@dataclass(frozen=True)
+class RankInfo:
+    """Position of a log, instance clear or instance clear group among the successful ones.
+
+    Attributes
+    ----------
+    rank : int
+        1 is the fastest.
+    count : int
+        Number of successful clears in the group.
+    fastest : datetime.timedelta
+        Duration of rank 1.
+    runner_up : datetime.timedelta | None
+        Duration of rank 2, None when there is only one clear.
+    center_seconds : float
+        Mean or median (settings.MEAN_OR_MEDIAN) of the durations in whole seconds.
+    """
+
+    rank: int
+    count: int
+    fastest: datetime.timedelta
+    runner_up: Optional[datetime.timedelta]
+    center_seconds: float
+
+    @classmethod
+    def from_sorted_group(cls, indiv: Ranked, group_list: list[Ranked]) -> "RankInfo":
+        """Rank in a list that is sorted on duration, e.g. a leaderboard."""
+        durations_seconds = [i.duration.seconds for i in group_list]
+        return cls(
+            rank=group_list.index(indiv) + 1,
+            count=len(group_list),
+            fastest=group_list[0].duration,
+            runner_up=group_list[1].duration if len(group_list) > 1 else None,
+            center_seconds=_center(durations_seconds),
+        )
+
+    def duration_str(self, duration: datetime.timedelta) -> str:
+        """Seconds faster than rank 2 for the fastest clear, otherwise seconds slower than rank 1.
+        e.g. '12_1', or '_inf_' when there is nothing to compare with.
+        """
+        if self.rank == 1:
+            if self.runner_up is None:
+                return "_inf_"
+            diff = self.runner_up - duration
+        else:
+            diff = duration - self.fastest
+        return str(round(diff.seconds + diff.microseconds / 1e6, 1)).replace(".", "_")
+
+
+def _center(durations_seconds: list[int]) -> float:
+    """Mean or median, the same as getattr(np, settings.MEAN_OR_MEDIAN)."""
+    if settings.MEAN_OR_MEDIAN == "mean":
+        return sum(durations_seconds) / len(durations_seconds)
+    durations_seconds = sorted(durations_seconds)
+    mid = len(durations_seconds) // 2
+    if len(durations_seconds) % 2:
+        return float(durations_seconds[mid])
+    return (durations_seconds[mid - 1] + durations_seconds[mid]) / 2
+
+
+def _group_key(obj: Ranked) -> tuple:
+    """Group the object is ranked in, see the filters in _group_queryset."""
+    if isinstance(obj, DpsLog):
+        return ("dpslog", obj.encounter_id, obj.cm)
+    if isinstance(obj, InstanceClear):
+        return ("iclear", obj.instance_id)
+    return ("icg", obj.type, obj.duration_encounters)
+
+
+def _is_member(obj: Ranked) -> bool:
+    if not obj.success or obj.start_time is None or obj.duration is None:
+        return False
+    if isinstance(obj, (DpsLog, InstanceClear)):
+        return not obj.emboldened
+    return "cm__" not in obj.name.lower()
+
+
+def _group_queryset(key: tuple) -> QuerySet:
+    kind = key[0]
+    if kind == "dpslog":
+        return DpsLog.objects.filter(success=True, emboldened=False, encounter_id=key[1], cm=key[2])
+    if kind == "iclear":
+        return InstanceClear.objects.filter(success=True, emboldened=False, instance_id=key[1])
+    return InstanceClearGroup.objects.filter(success=True, type=key[1], duration_encounters=key[2]).exclude(
+        name__icontains="cm__"
+    )
+
+
+class _RankGroup:
+    """Successful clears of one group, sorted on (duration, id) and on (start_time, id)."""
+
+    def __init__(self, entries: list[_Entry]):
+        self.loaded = time.monotonic()
+        self.by_duration: list[_Entry] = sorted(entries)
+        self.by_start_time = sorted((start_time, id_, duration) for duration, id_, start_time in entries)
+        self.entries = {entry[1]: entry for entry in entries}
+        self.total_seconds = sum(entry[0].seconds for entry in entries)
+
+    def add(self, entry: _Entry) -> None:
+        duration, id_, start_time = entry
+        bisect.insort(self.by_duration, entry)
+        bisect.insort(self.by_start_time, (start_time, id_, duration))
+        self.entries[id_] = entry
+        self.total_seconds += duration.seconds
+
+    def remove(self, id_: int) -> None:
+        duration, id_, start_time = self.entries.pop(id_)
+        del self.by_duration[bisect.bisect_left(self.by_duration, (duration, id_, start_time))]
+        del self.by_start_time[bisect.bisect_left(self.by_start_time, (start_time, id_, duration))]
+        self.total_seconds -= duration.seconds
+
+    def rank_info(self, duration: datetime.timedelta, id_: int, start_time: datetime.datetime) -> Optional[RankInfo]:
+        """Rank among the clears that started at or before start_time."""
+        # Entries that started later are excluded, for recent logs these are only a few.
+        newer_idx = bisect.bisect_right(self.by_start_time, (start_time, float("inf")))
+        newer = sorted((d, i, s) for s, i, d in self.by_start_time[newer_idx:])
+        count = len(self.by_duration) - len(newer)
+        if count <= 0:
+            return None
+
+        key = (duration, id_)
+        rank = bisect.bisect_left(self.by_duration, key) - bisect.bisect_left(newer, key) + 1
+        newer_positions = [bisect.bisect_left(self.by_duration, entry) for entry in newer]
+
+        def nth(n: int) -> _Entry:
+            """n-th fastest entry (0 based) that is not newer."""
+            idx = n
+            for position in newer_positions:
+                if position > idx:
+                    break
+                idx += 1
+            return self.by_duration[idx]
+
+        if settings.MEAN_OR_MEDIAN == "mean":
+            center_seconds = (self.total_seconds - sum(d.seconds for d, _, _ in newer)) / count
+        elif count % 2:
+            center_seconds = float(nth(count // 2)[0].seconds)
+        else:
+            center_seconds = (nth(count // 2 - 1)[0].seconds + nth(count // 2)[0].seconds) / 2
+
+        return RankInfo(
+            rank=rank,
+            count=count,
+            fastest=nth(0)[0],
+            runner_up=nth(1)[0] if count > 1 else None,
+            center_seconds=center_seconds,
+        )
+
+
+class RankIndex:
+    """In memory rank groups of DpsLogs, InstanceClears and InstanceClearGroups.
+
+    Methods
+    -------
+    rank(obj)
+        RankInfo of a successful clear among the clears before it.
+    update(obj)
+        Add, move or remove obj in its group after a save.
+    clear()
+        Drop all groups, they are reloaded when needed.
+    """
+
+    def __init__(self, max_age_seconds: float = MAX_AGE_SECONDS):
+        self.max_age_seconds = max_age_seconds
+        self._groups: dict[tuple, _RankGroup] = {}
+        self._keys: dict[tuple[type, int], tuple] = {}  # (model, id) -> group key
+        self._lock = threading.RLock()
+
+    def _get_group(self, key: tuple) -> _RankGroup:
+        group = self._groups.get(key)
+        if group is None or time.monotonic() - group.loaded > self.max_age_seconds:
+            if group is not None:
+                self._drop(key)
+            rows = _group_queryset(key).filter(start_time__isnull=False, duration__isnull=False)
+            entries = [
+                (duration, id_, start_time)
+                for id_, start_time, duration in rows.values_list("id", "start_time", "duration")
+            ]
+            group = _RankGroup(entries)
+            model = rows.model
+            for entry in entries:
+                self._keys[(model, entry[1])] = key
+            self._groups[key] = group
+        return group
+
+    def _drop(self, key: tuple) -> None:
+        group = self._groups.pop(key)
+        model = _group_queryset(key).model
+        for id_ in group.entries:
+            self._keys.pop((model, id_), None)
+
+    def rank(self, obj: Ranked) -> Optional[RankInfo]:
+        """RankInfo of obj among the successful clears of its group that started before or with it.
+        A member that is missing from the loaded group (bulk written or saved by another process)
+        reloads the group, and is added when it is still not there. Returns None when obj is not
+        a member and the group is empty.
+        """
+        with self._lock:
+            key = _group_key(obj)
+            group = self._get_group(key)
+            if _is_member(obj) and obj.id not in group.entries:
+                self._drop(key)
+                group = self._get_group(key)
+                if obj.id not in group.entries:
+                    group.add((obj.duration, obj.id, obj.start_time))
+                    self._keys[(type(obj), obj.id)] = key
+            return group.rank_info(duration=obj.duration, id_=obj.id, start_time=obj.start_time)
+
+    def update(self, obj: Ranked) -> None:
+        with self._lock:
+            self.remove(obj)
+            key = _group_key(obj)
+            if key in self._groups and _is_member(obj):
+                self._groups[key].add((obj.duration, obj.id, obj.start_time))
+                self._keys[(type(obj), obj.id)] = key
+
+    def remove(self, obj: Ranked) -> None:
+        with self._lock:
+            key = self._keys.pop((type(obj), obj.id), None)
+            if key is not None and key in self._groups:
+                self._groups[key].remove(obj.id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._groups.clear()
+            self._keys.clear()
+
+
+RANK_INDEX = RankIndex()
+
+
+@receiver(post_save, sender=DpsLog)
+@receiver(post_save, sender=InstanceClear)
+@receiver(post_save, sender=InstanceClearGroup)
+def _update_rank_index(sender, instance, **kwargs):
+    RANK_INDEX.update(instance)
+
+
+@receiver(post_delete, sender=DpsLog)
+@receiver(post_delete, sender=InstanceClear)
+@receiver(post_delete, sender=InstanceClearGroup)
+def _remove_from_rank_index(sender, instance, **kwargs):
+    RANK_INDEX.remove(instance)
+
+
+# %%
+if __name__ == "__main__":
+    dpslog = DpsLog.objects.filter(success=True).last()
+    print(RANK_INDEX.rank(dpslog))
+# %%
@@ -20,16 +20,19 @@ from gw2_logs.models import (
     InstanceClearGroup,
 )
 from scripts.log_helpers import (
+    RANK_BINS_PERCENTILE_ITEMS,
     RANK_EMOTES_CUPS_PROGRESSION,
     create_rank_emote_dict_percentiles,
     get_duration_str,
 )
 from scripts.model_interactions.dpslog_service import DpsLogService
+from scripts.model_interactions.emoji_registry import LazyEmotes
 
 # For progression always use percentiles.
-RANK_EMOTES_PROGRESSION, RANK_BINS_PERCENTILE_PROGRESSION = create_rank_emote_dict_percentiles(
-    custom_emoji_name=True, invalid=False
+RANK_EMOTES_PROGRESSION = LazyEmotes(
+    lambda: create_rank_emote_dict_percentiles(custom_emoji_name=True, invalid=False)[0]
 )
+RANK_BINS_PERCENTILE_PROGRESSION = RANK_BINS_PERCENTILE_ITEMS
 
 logger = logging.getLogger(__name__)
 
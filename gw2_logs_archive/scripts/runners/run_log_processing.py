@@ -5,10 +5,11 @@ if __name__ == "__main__":
     django_setup.run()
 
 import logging
-import time
+from functools import partial
 from typing import Literal, Optional
 
 from django.conf import settings
+from gw2_logs.models import DpsLog
 from scripts.log_helpers import (
     create_folder_names,
     today_y_m_d,
@@ -16,7 +17,8 @@ from scripts.log_helpers import (
 )
 from scripts.log_processing.ei_parser import EliteInsightsParser
 from scripts.log_processing.log_files import LogFilesDate
-from scripts.log_processing.logfile_processing import process_logs_once
+from scripts.log_processing.log_pipeline import LogPipeline
+from scripts.log_processing.log_prefilter import LogPrefilter
 from scripts.model_interactions.instance_clear_group import InstanceClearGroupInteraction
 from scripts.runners.run_leaderboard import run_leaderboard
 
@@ -26,6 +28,23 @@ SLEEPTIME = 30
 MAXSLEEPTIME = 60 * SLEEPTIME  # Number of seconds without a log until we stop looking.
 
 
+def _update_discord(processed_logs: list[DpsLog], y: int, m: int, d: int) -> None:
+    """Update the InstanceClearGroups of the processed logs and send the discord message."""
+    icgi = None
+    for log in processed_logs:
+        icgi = InstanceClearGroupInteraction.create_from_date(
+            y=y, m=m, d=d, itype_group=log.encounter.instance.instance_group.name
+        )
+
+        # Build and send Discord message
+        if icgi is not None:
+            icgi.sync_discord_message_id()
+
+    if icgi is not None:
+        # Update discord, only do it on the last log, so we dont spam the discord api too often.
+        icgi.send_discord_message()
+
+
 def run_log_processing(
     y: Optional[int] = None,
     m: Optional[int] = None,
@@ -47,52 +66,32 @@ def run_log_processing(
 
     # possible folder names for selected itype_groups
     allowed_folder_names = create_folder_names(itype_groups=itype_groups)
-    log_files_date_cls = LogFilesDate(y=y, m=m, d=d, allowed_folder_names=allowed_folder_names)
-
-    # Flow start
-    PROCESSING_SEQUENCE = ["local", "upload"] + ["local"] * 9
-    run_count = 0
-    current_sleeptime = MAXSLEEPTIME
-    while True:
-        for processing_type in PROCESSING_SEQUENCE:
-            icgi = None
-            processed_logs = process_logs_once(
-                processing_type=processing_type,
-                log_files_date_cls=log_files_date_cls,
-                ei_parser=ei_parser,
-            )
-
-            for log in processed_logs:
-                icgi = InstanceClearGroupInteraction.create_from_date(
-                    y=y, m=m, d=d, itype_group=log.encounter.instance.instance_group.name
-                )
-
-                # Build and send Discord message
-                if icgi is not None:
-                    icgi.sync_discord_message_id()
-
-            if len(processed_logs) > 0:
-                # Update discord, only do it on the last log, so we dont spam the discord api too often.
-                current_sleeptime = MAXSLEEPTIME
-                icgi.send_discord_message()
-
-            if processing_type == "local":
-                time.sleep(SLEEPTIME / 10)
-
-        # 6. Update leaderboards and exit
-        # Only update when there hasnt been a new log parsed for the duration of sleeptime.
-        if (current_sleeptime < 0) or ((y, m, d) != today_y_m_d()):
-            logger.info("Updating leaderboards")
-            run_leaderboard(instance_type="fractal")
-            run_leaderboard(instance_type="raid")
-            run_leaderboard(instance_type="strike")
-            logger.info("Finished run")
-            break
-
-        current_sleeptime -= SLEEPTIME
-        logger.info(f"Run {run_count} done")
-
-        run_count += 1
+    log_files_date_cls = LogFilesDate(
+        y=y, m=m, d=d, allowed_folder_names=allowed_folder_names, watch=True, persist_state=True
+    )
+
+    # Skip logs EI won't parse or that belong to other instance groups, e.g. golems.
+    prefilter = LogPrefilter(itype_groups=itype_groups, too_short_ms=ei_parser.too_short_ms)
+
+    # Every log is parsed, stored, published and uploaded as soon as it is written.
+    pipeline = LogPipeline(
+        log_files_date_cls=log_files_date_cls,
+        ei_parser=ei_parser,
+        publish=partial(_update_discord, y=y, m=m, d=d),
+        prefilter=prefilter,
+        poll_seconds=SLEEPTIME / 10,
+    )
+    # Returns when there hasnt been a new log for MAXSLEEPTIME or the day changed.
+    pipeline.run(max_idle_seconds=MAXSLEEPTIME)
+
+    # Update leaderboards and exit
+    log_files_date_cls.close()
+    prefilter.log_summary()
+    logger.info("Updating leaderboards")
+    run_leaderboard(instance_type="fractal")
+    run_leaderboard(instance_type="raid")
+    run_leaderboard(instance_type="strike")
+    logger.info("Finished run")
 
 
 if __name__ == "__main__":
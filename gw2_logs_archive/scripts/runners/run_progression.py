@@ -6,7 +6,6 @@ if __name__ == "__main__":
 
 
 import logging
-import time
 from typing import Optional
 
 from django.conf import settings
@@ -17,7 +16,7 @@ from scripts.log_helpers import (
 )
 from scripts.log_processing.ei_parser import EliteInsightsParser
 from scripts.log_processing.log_files import LogFilesDate
-from scripts.log_processing.logfile_processing import process_logs_once
+from scripts.log_processing.log_pipeline import LogPipeline
 from scripts.progression.configurable_progression_service import ConfigurableProgressionService
 
 logger = logging.getLogger(__name__)
@@ -29,10 +28,8 @@ def run_progression_service(
     m: Optional[int] = None,
     d: Optional[int] = None,
 ) -> None:
-    run_count = 0
     SLEEPTIME = 30
     MAXSLEEPTIME = 60 * SLEEPTIME  # Number of seconds without a log until we stop looking.
-    current_sleeptime = MAXSLEEPTIME
 
     # Initialize local parser
     ei_parser = EliteInsightsParser()
@@ -41,39 +38,26 @@ def run_progression_service(
     progression_service = ConfigurableProgressionService(clear_group_base_name=clear_group_base_name, y=y, m=m, d=d)
 
     log_files_date_cls = LogFilesDate(
-        y=y, m=m, d=d, allowed_folder_names=progression_service.encounter.folder_names.split(";")
+        y=y, m=m, d=d, allowed_folder_names=progression_service.encounter.folder_names.split(";"), watch=True
     )
 
+    def publish(processed_logs):
+        progression_service.update_dpslogs(processed_logs=processed_logs)
+        progression_service.update_instance_clear_start_time_and_duration()
+        send_progression_discord_message(progression_service)
+
     # Flow start
-    PROCESSING_SEQUENCE = ["local", "upload"] + ["local"] * 9
-    processing_type = "local"  # Easier for testing.
     logger.info("Starting progression run")
-    while True:
-        for processing_type in PROCESSING_SEQUENCE:
-            processed_logs = process_logs_once(
-                processing_type=processing_type,
-                log_files_date_cls=log_files_date_cls,
-                ei_parser=ei_parser,
-                must_be_cm=False,
-            )
-
-            if processed_logs:
-                current_sleeptime = MAXSLEEPTIME
-
-            if len(processed_logs) > 0:
-                progression_service.update_dpslogs(processed_logs=processed_logs)
-                progression_service.update_instance_clear_start_time_and_duration()
-                send_progression_discord_message(progression_service)
-
-            if processing_type == "local":
-                time.sleep(SLEEPTIME / 10)
-
-        current_sleeptime -= SLEEPTIME
-        logger.info(f"Run {run_count} done")
-        run_count += 1
-        if (current_sleeptime < 0) or ((y, m, d) != today_y_m_d()):
-            logger.info("Finished run")
-            break
+    pipeline = LogPipeline(
+        log_files_date_cls=log_files_date_cls,
+        ei_parser=ei_parser,
+        publish=publish,
+        must_be_cm=False,
+        poll_seconds=SLEEPTIME / 10,
+    )
+    pipeline.run(max_idle_seconds=MAXSLEEPTIME)
+    log_files_date_cls.close()
+    logger.info("Finished run")
 
 
 # %%
@@ -0,0 +1,100 @@
+# %%
+"""Compare the Elite Insights parse profiles on the same logs.
+
+Every log is parsed once per profile in its own EI process, with an empty cache
+so nothing is reused. Reports the parse time and the size of the output per log.
+"""
+
+if __name__ == "__main__":
+    from scripts.utilities import django_setup
+
+    django_setup.run()
+
+import gzip
+import logging
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from scripts.log_helpers import get_log_path_view, today_y_m_d
+from scripts.log_processing.ei_parser import EI_SETTINGS_PROFILES, EliteInsightsParser
+from scripts.log_processing.log_files import LogFilesDate
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ProfileResult:
+    profile: str
+    log_path: Path
+    parse_seconds: float
+    json_gz_bytes: int  # Parsed json as stored in the cache
+    json_bytes: int  # Uncompressed, what has to be read when there is no summary
+    out_dir_bytes: int  # Everything EI wrote, e.g. traces
+
+
+def _dir_size(folder: Path) -> int:
+    return sum(file.stat().st_size for file in folder.rglob("*") if file.is_file())
+
+
+def benchmark_ei_profiles(log_paths: list[Path], profiles: tuple[str, ...] = tuple(EI_SETTINGS_PROFILES)):
+    """Parse each log with each profile and return a ProfileResult per log and profile."""
+    ei_parser = EliteInsightsParser(auto_update=False)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for profile in profiles:
+            for idx, log_path in enumerate(log_paths):
+                out_dir = Path(tmp_dir, f"{profile}_{idx}")
+                ei_parser.create_settings(out_dir=out_dir, profile=profile, cache_dir=out_dir.joinpath("cache"))
+
+                start = time.perf_counter()
+                parsed_path = ei_parser.parse_log(log_path=log_path)
+                parse_seconds = time.perf_counter() - start
+                if parsed_path is None:
+                    logger.warning(f"{get_log_path_view(log_path)}: Not parsed with profile {profile}")
+                    continue
+
+                with gzip.open(parsed_path, "rb") as fin:
+                    json_bytes = len(fin.read())
+                results.append(
+                    ProfileResult(
+                        profile=profile,
+                        log_path=log_path,
+                        parse_seconds=parse_seconds,
+                        json_gz_bytes=parsed_path.stat().st_size,
+                        json_bytes=json_bytes,
+                        out_dir_bytes=_dir_size(out_dir),
+                    )
+                )
+    return results
+
+
+def print_results(results: list[ProfileResult]) -> None:
+    print(f"{'log':<40}{'profile':<8}{'parse [s]':>10}{'json.gz [kB]':>14}{'json [kB]':>12}{'output [kB]':>13}")
+    for r in results:
+        print(
+            f"{r.log_path.name:<40}{r.profile:<8}{r.parse_seconds:>10.2f}"
+            f"{r.json_gz_bytes / 1e3:>14.0f}{r.json_bytes / 1e3:>12.0f}{r.out_dir_bytes / 1e3:>13.0f}"
+        )
+
+    print(f"\n{'mean':<40}{'profile':<8}{'parse [s]':>10}{'json.gz [kB]':>14}{'json [kB]':>12}{'output [kB]':>13}")
+    for profile in dict.fromkeys(r.profile for r in results):
+        rows = [r for r in results if r.profile == profile]
+        print(
+            f"{'':<40}{profile:<8}{sum(r.parse_seconds for r in rows) / len(rows):>10.2f}"
+            f"{sum(r.json_gz_bytes for r in rows) / len(rows) / 1e3:>14.0f}"
+            f"{sum(r.json_bytes for r in rows) / len(rows) / 1e3:>12.0f}"
+            f"{sum(r.out_dir_bytes for r in rows) / len(rows) / 1e3:>13.0f}"
+        )
+
+
+# %%
+if __name__ == "__main__":
+    y, m, d = today_y_m_d()
+    log_files_date = LogFilesDate(y=y, m=m, d=d)
+    log_files_date.refresh_logs()
+    log_paths = [log.path for log in log_files_date.logs.values()][:10]
+
+    print_results(benchmark_ei_profiles(log_paths=log_paths))
+# %%
@@ -7,44 +7,47 @@ if __name__ == "__main__":
 import datetime
 import logging
 
-from gw2_logs.models import DpsLog, Player
+from django.db.models import QuerySet
+from gw2_logs.models import DpsLog
 from scripts.log_helpers import today_y_m_d
+from scripts.model_interactions.player_role_registry import PLAYER_ROLE_REGISTRY
 from scripts.tools.update_discord_messages import update_discord_message_single
 
 logger = logging.getLogger(__name__)
 
 
-def reculculate_friends(y, m, d):
-    """When a friend is added to the Players. We need to recalculate the friend counts in the logs"""
-    for dpslog in DpsLog.objects.filter(
-        start_time__gte=datetime.datetime(year=y, month=m, day=d, tzinfo=datetime.timezone.utc)
-    ):
-        logger.info(f"Updating {dpslog}")
-
-        players = dpslog.players
+def update_player_counts(dpslogs: QuerySet[DpsLog]) -> list[DpsLog]:
+    """Recalculate core and friend counts of the logs from the current player roles.
+    The counts are computed in memory and the changed logs are written with one bulk_update.
+    Returns the changed logs.
+    """
+    dpslogs = dpslogs.only("id", "boss_name", "start_time", "players", "core_player_count", "friend_player_count")
 
-        core_player_count_current = dpslog.core_player_count
-        friend_player_count_current = dpslog.friend_player_count
+    changed_logs = []
+    for dpslog in dpslogs:
+        core_player_count_new, friend_player_count_new = PLAYER_ROLE_REGISTRY.count_roles(dpslog.players)
 
-        core_player_count_new = len(Player.objects.filter(gw2_id__in=players, role="core"))
-        friend_player_count_new = len(Player.objects.filter(gw2_id__in=players, role="friend"))
-
-        update = False
-        if core_player_count_current != core_player_count_new:
+        if (dpslog.core_player_count, dpslog.friend_player_count) != (core_player_count_new, friend_player_count_new):
             logger.info(
-                f"Core player count changed from {core_player_count_current} to {core_player_count_new} for {dpslog}"
+                f"Player counts (core, friend) changed from ({dpslog.core_player_count}, {dpslog.friend_player_count})"
+                f" to ({core_player_count_new}, {friend_player_count_new}) for {dpslog}"
             )
-            update = True
             dpslog.core_player_count = core_player_count_new
-        if friend_player_count_current != friend_player_count_new:
-            logger.info(
-                f"Friend player count changed from {friend_player_count_current} to {friend_player_count_new} for {dpslog}"
-            )
-            update = True
             dpslog.friend_player_count = friend_player_count_new
+            changed_logs.append(dpslog)
+
+    DpsLog.objects.bulk_update(changed_logs, fields=["core_player_count", "friend_player_count"], batch_size=500)
+    return changed_logs
+
+
+def reculculate_friends(y, m, d):
+    """When a friend is added to the Players. We need to recalculate the friend counts in the logs"""
+    PLAYER_ROLE_REGISTRY.clear()  # The players were probably changed in the admin, another process.
 
-        if update:
-            dpslog.save()
+    changed_logs = update_player_counts(
+        DpsLog.objects.filter(start_time__gte=datetime.datetime(year=y, month=m, day=d, tzinfo=datetime.timezone.utc))
+    )
+    logger.info(f"Updated player counts of {len(changed_logs)} logs")
 
     for itype_group in ["raid", "strike"]:
         update_discord_message_single(y=y, m=m, d=d)
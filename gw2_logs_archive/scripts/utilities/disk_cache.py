@@ -0,0 +1,272 @@
+# %%
+"""Content addressed file cache on disk
+
+Files are stored in a single folder under their key. An index.json keeps track of
+the stored files, their size and last access, so lookups don't touch the filesystem
+and the least recently used files can be evicted when the cache grows too large.
+
+Several processes (the log runners, the url importer) share a cache folder. Each
+process only writes the entries it changed: the index on disk is read again and
+merged under a lock file before it is written.
+"""
+
+if __name__ == "__main__":
+    from scripts.utilities import django_setup
+
+    django_setup.run()
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+_file_hashes: dict[tuple[str, int, int], str] = {}  # (path, size, mtime_ns) -> sha1
+_file_hashes_lock = threading.Lock()
+
+# A lock file older than this was left behind by a process that crashed while saving.
+INDEX_LOCK_TIMEOUT_SECONDS = 10
+
+
+def hash_file(path: Path) -> str:
+    """Sha1 of the file content. Memoized on path, size and mtime so
+    unchanged files are only read once per process.
+    """
+    stat = path.stat()
+    memo_key = (str(path), stat.st_size, stat.st_mtime_ns)
+    with _file_hashes_lock:
+        if memo_key in _file_hashes:
+            return _file_hashes[memo_key]
+
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK_SIZE):
+            sha1.update(chunk)
+    digest = sha1.hexdigest()
+
+    with _file_hashes_lock:
+        _file_hashes[memo_key] = digest
+    return digest
+
+
+class DiskCache:
+    """Store files on disk by key, evicting the least recently used files when the
+    total size exceeds max_size_mb and, optionally, files older than ttl_seconds.
+
+    Parameters
+    ----------
+    cache_dir : Path
+        Folder to store the files and the index in.
+    max_size_mb : float | None, default None
+        Maximum total size of the cached files. None means no limit.
+    companion_suffixes : tuple[str, ...], default ()
+        Small files stored next to a cached file as '{key}{suffix}'. They are not
+        in the index, but are removed together with the cached file.
+    ttl_seconds : float | None, default None
+        Files stored longer ago than this are treated as missing. None means they never expire.
+
+    Methods
+    -------
+    get(key)
+        Path of the cached file, or None.
+    put(key, src_path)
+        Move a file into the cache and return its new path.
+        Files larger than max_size_mb are not cached, src_path is returned.
+    put_bytes(key, data)
+        Write data into the cache and return its path, None when it is too large.
+    """
+
+    INDEX_NAME = "index.json"
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_size_mb: Optional[float] = None,
+        companion_suffixes: tuple[str, ...] = (),
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.cache_dir = cache_dir
+        self.max_size_bytes = None if max_size_mb is None else int(max_size_mb * 1024 * 1024)
+        self.companion_suffixes = companion_suffixes
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.RLock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._index: dict[str, dict] = self._load_index()
+        # Keys changed by this process since the last save, merged into the index on disk.
+        self._changed: set[str] = set()
+        self._removed: set[str] = set()
+
+    @property
+    def index_path(self) -> Path:
+        return self.cache_dir.joinpath(self.INDEX_NAME)
+
+    @property
+    def lock_path(self) -> Path:
+        return self.cache_dir.joinpath(f"{self.INDEX_NAME}.lock")
+
+    @property
+    def size_bytes(self) -> int:
+        with self._lock:
+            return sum(entry["size"] for entry in self._index.values())
+
+    def _load_index(self) -> dict[str, dict]:
+        if not self.index_path.exists():
+            return {}
+        try:
+            return json.loads(self.index_path.read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cache index {self.index_path} unreadable, starting empty: {e}")
+            return {}
+
+    @contextmanager
+    def _index_file_lock(self):
+        """Hold the lock file of the index, shared with the other processes using the cache."""
+        deadline = time.monotonic() + INDEX_LOCK_TIMEOUT_SECONDS
+        while True:
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                if time.monotonic() > deadline:
+                    logger.warning(f"Removing stale cache lock {self.lock_path}")
+                    self.lock_path.unlink(missing_ok=True)
+                    deadline = time.monotonic() + INDEX_LOCK_TIMEOUT_SECONDS
+                time.sleep(0.01)
+        try:
+            yield
+        finally:
+            os.close(fd)
+            self.lock_path.unlink(missing_ok=True)
+
+    def _save_index(self) -> None:
+        """Merge the changes of this process into the index on disk, evict and write it.
+        The index is written to a temp file first so a crash never leaves a broken index.
+        """
+        with self._index_file_lock():
+            index = self._load_index()
+            for key in self._removed:
+                index.pop(key, None)
+            for key in self._changed - self._removed:
+                index[key] = self._index[key]
+            self._index = index
+
+            self._evict()
+            tmp_path = self.index_path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(self._index))
+            os.replace(tmp_path, self.index_path)
+            self._changed.clear()
+            self._removed.clear()
+
+    def get(self, key: str) -> Optional[Path]:
+        """Return the path of the cached file or None when it is not cached."""
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+
+            path = self.cache_dir.joinpath(entry["file"])
+            if not path.exists():
+                # Removed outside of the cache
+                del self._index[key]
+                self._removed.add(key)
+                self._save_index()
+                return None
+
+            if self.ttl_seconds is not None and time.time() - entry.get("ctime", 0) > self.ttl_seconds:
+                self._remove(key)
+                self._save_index()
+                return None
+
+            entry["atime"] = time.time()
+            self._changed.add(key)
+            return path
+
+    def put(self, key: str, src_path: Path, suffix: str = "") -> Path:
+        """Move src_path into the cache under key and return the new path.
+
+        Parameters
+        ----------
+        key : str
+            Cache key, used as filename.
+        src_path : Path
+            File to store. It is moved, not copied.
+        suffix : str, default ""
+            Appended to the filename, e.g. '.json.gz'
+        """
+        if self.max_size_bytes is not None and src_path.stat().st_size > self.max_size_bytes:
+            # It would be evicted right away.
+            logger.warning(f"{src_path.name} is larger than the cache, not cached")
+            return src_path
+
+        filename = f"{key}{suffix}"
+        dst_path = self.cache_dir.joinpath(filename)
+        with self._lock:
+            if src_path != dst_path:
+                try:
+                    os.replace(src_path, dst_path)  # Overwrites an existing file, also on windows
+                except OSError:
+                    shutil.move(src_path, dst_path)  # Other drive
+            now = time.time()
+            self._index[key] = {"file": filename, "size": dst_path.stat().st_size, "atime": now, "ctime": now}
+            self._removed.discard(key)
+            self._changed.add(key)
+            self._save_index()
+        return dst_path
+
+    def put_bytes(self, key: str, data: bytes, suffix: str = "") -> Optional[Path]:
+        """Write data to the cache under key and return the path. The data is written to
+        a temp file first, so readers never see a partially written file.
+        Data larger than max_size_mb is not cached and None is returned.
+        """
+        if self.max_size_bytes is not None and len(data) > self.max_size_bytes:
+            logger.warning(f"{key}{suffix} is larger than the cache, not cached")
+            return None
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return self.put(key=key, src_path=Path(tmp_path), suffix=suffix)
+
+    def _remove(self, key: str) -> None:
+        """Delete the file of key and its companions and drop it from the index."""
+        entry = self._index.pop(key)
+        self._removed.add(key)
+        self.cache_dir.joinpath(entry["file"]).unlink(missing_ok=True)
+        for suffix in self.companion_suffixes:
+            self.cache_dir.joinpath(f"{key}{suffix}").unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        """Remove least recently used files until the cache fits max_size_bytes."""
+        if self.max_size_bytes is None:
+            return
+
+        total_size = sum(entry["size"] for entry in self._index.values())
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]["atime"]):
+            if total_size <= self.max_size_bytes:
+                break
+            self._remove(key)
+            total_size -= entry["size"]
+            logger.debug(f"Evicted {entry['file']} from cache")
+
+    def flush(self) -> None:
+        """Write the access times of the last gets to the index."""
+        with self._lock:
+            self._save_index()
+
+
+# %%
+if __name__ == "__main__":
+    from django.conf import settings
+
+    cache = DiskCache(cache_dir=settings.EI_PARSED_CACHE_DIR)
+    print(f"{len(cache._index)} files, {cache.size_bytes / 1024 / 1024:.1f} MB")
+# %%
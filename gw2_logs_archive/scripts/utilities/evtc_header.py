@@ -0,0 +1,191 @@
+"""Read the header of an arcdps log without Elite Insights.
+
+An .evtc file starts with a 16 byte header (arcdps build, revision and the species
+id of the logged boss), followed by the agents, the skills and the combat events.
+`read_evtc_header` reads the header, the agents and the first combat events from
+the (zipped) stream. The events are read until the log start and gw2 build events
+were found, so only the start of the stream is decompressed. With read_all_events
+the remaining events are scanned as well, for the exact fight length.
+
+Layout from the arcdps evtc readme, only revision 1 events are supported.
+"""
+
+from __future__ import annotations
+
+import datetime
+import io
+import logging
+import struct
+import zipfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct("<4s8sBHx")  # "EVTC", arcdps build yyyymmdd, revision, boss species id
+AGENT = struct.Struct("<QIIhhhhhh64s4x")  # addr, prof, is_elite, toughness, ..., name
+SKILL_SIZE = 68  # int32 id, char[64] name
+EVENT = struct.Struct("<QQQiiIIHHHH12B4x")  # cbtevent revision 1
+EVENT_TIME = struct.Struct("<Q")
+
+# Fields of the EVENT tuple
+_TIME, _SRC_AGENT, _VALUE, _IS_STATECHANGE = 0, 1, 3, 19
+
+# cbtstatechange values
+STATECHANGE_LOG_START = 9  # value: server unix timestamp, buff_dmg: local unix timestamp
+STATECHANGE_LOG_END = 10
+STATECHANGE_GW2_BUILD = 15  # src_agent: gw2 build
+
+NPC_OR_GADGET = 0xFFFFFFFF  # is_elite of agents that are not players
+MAX_EVENTS_DEFAULT = 10_000
+_CHUNK_EVENTS = 4096
+
+
+@dataclass
+class EvtcHeader:
+    """Header data of an arcdps log.
+
+    Attributes
+    ----------
+    arc_build : str
+        arcdps build date, e.g. '20250220'
+    revision : int
+        Event revision, 1 for all current logs.
+    boss_id : int
+        Species id of the logged boss, like the dps.report bossId.
+    gw2_build : int | None
+        Game build, None when the event was not found.
+    start_time : datetime.datetime | None
+        Server time of the log start in utc, like the dps.report encounterTime.
+    players : list[str]
+        Account names of the players, without the leading ':'
+    log_start_ms, last_event_ms, log_end_ms : int | None
+        arcdps times of the log start, the last event read and the log end.
+    complete : bool
+        All events were read, the duration is exact.
+    """
+
+    arc_build: str
+    revision: int
+    boss_id: int
+    gw2_build: Optional[int] = None
+    start_time: Optional[datetime.datetime] = None
+    players: list[str] = field(default_factory=list)
+    log_start_ms: Optional[int] = None
+    last_event_ms: Optional[int] = None
+    log_end_ms: Optional[int] = None
+    complete: bool = False
+
+    @property
+    def duration_bounds_ms(self) -> tuple[Optional[int], Optional[int]]:
+        """(lower, upper) bound of the fight length in milliseconds.
+        The lower bound is the time until the last event read. The upper bound is only known
+        when all events were read, then both are the same.
+        """
+        if self.log_start_ms is None or self.last_event_ms is None:
+            return None, None
+        end_ms = self.log_end_ms if (self.complete and self.log_end_ms is not None) else self.last_event_ms
+        lower = max(0, end_ms - self.log_start_ms)
+        return lower, lower if self.complete else None
+
+
+@contextmanager
+def _open_evtc(path: Path) -> Iterator[BinaryIO]:
+    """Stream of the evtc, decompressed while it is read when the log is zipped (.zevtc)."""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive, archive.open(archive.infolist()[0]) as stream:
+            yield stream
+    else:
+        with open(path, "rb") as stream:
+            yield stream
+
+
+def _read_exact(stream: BinaryIO, size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError(f"Unexpected end of evtc, wanted {size} bytes but got {len(data)}")
+    return data
+
+
+def _skip(stream: BinaryIO, size: int) -> None:
+    while size > 0:
+        skipped = len(stream.read(min(size, io.DEFAULT_BUFFER_SIZE * 16)))
+        if skipped == 0:
+            raise ValueError("Unexpected end of evtc while skipping")
+        size -= skipped
+
+
+def _read_agents(stream: BinaryIO) -> list[str]:
+    (agent_count,) = struct.unpack("<I", _read_exact(stream, 4))
+    players = []
+    for agent in AGENT.iter_unpack(_read_exact(stream, agent_count * AGENT.size)):
+        is_elite, name = agent[2], agent[9]
+        if is_elite == NPC_OR_GADGET:
+            continue
+        # Player names are 'character\0:account.1234\0subgroup\0'
+        parts = name.split(b"\x00")
+        if len(parts) > 1 and parts[1]:
+            players.append(parts[1].decode("utf-8", errors="replace").lstrip(":"))
+    return players
+
+
+def read_evtc_header(path: Path, read_all_events: bool = False, max_events: int = MAX_EVENTS_DEFAULT) -> EvtcHeader:
+    """Read the header, the players and the first events of an .evtc or .zevtc.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the log.
+    read_all_events : bool, default False
+        Scan all events for the exact fight length. Decompresses the full stream,
+        still much faster than an EI parse.
+    max_events : int, default MAX_EVENTS_DEFAULT
+        Stop looking for the log start and gw2 build events after this many events.
+
+    Raises
+    ------
+    ValueError
+        When the file is not an evtc or is truncated.
+    """
+    with _open_evtc(Path(path)) as stream:
+        magic, arc_build, revision, boss_id = HEADER.unpack(_read_exact(stream, HEADER.size))
+        if magic != b"EVTC":
+            raise ValueError(f"{Path(path).name} is not an evtc file")
+        header = EvtcHeader(arc_build=arc_build.decode("ascii", errors="replace"), revision=revision, boss_id=boss_id)
+
+        header.players = _read_agents(stream)
+        (skill_count,) = struct.unpack("<I", _read_exact(stream, 4))
+        _skip(stream, skill_count * SKILL_SIZE)
+
+        if revision != 1:
+            logger.warning(f"{Path(path).name}: Events of evtc revision {revision} are not supported")
+            return header
+
+        events_read = 0
+        header.complete = True
+        while True:
+            data = stream.read(_CHUNK_EVENTS * EVENT.size)
+            chunk = data[: len(data) - len(data) % EVENT.size]  # A truncated last event is ignored
+            for event in EVENT.iter_unpack(chunk):
+                statechange = event[_IS_STATECHANGE]
+                if statechange == STATECHANGE_LOG_START and header.log_start_ms is None:
+                    header.log_start_ms = event[_TIME]
+                    server_timestamp = event[_VALUE] % 2**32  # uint32 in the signed value field
+                    header.start_time = datetime.datetime.fromtimestamp(server_timestamp, tz=datetime.timezone.utc)
+                elif statechange == STATECHANGE_GW2_BUILD:
+                    header.gw2_build = event[_SRC_AGENT]
+                elif statechange == STATECHANGE_LOG_END:
+                    header.log_end_ms = event[_TIME]
+            if chunk:
+                header.last_event_ms = EVENT_TIME.unpack_from(chunk, len(chunk) - EVENT.size)[0]
+                events_read += len(chunk) // EVENT.size
+
+            if len(data) < _CHUNK_EVENTS * EVENT.size:
+                break  # End of the stream
+            found = header.log_start_ms is not None and header.gw2_build is not None
+            if not read_all_events and (found or events_read >= max_events):
+                header.complete = False
+                break
+    return header
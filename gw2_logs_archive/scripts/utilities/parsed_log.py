@@ -4,6 +4,7 @@ if __name__ == "__main__":
 
     django_setup.run()
 
+import base64
 import datetime
 import logging
 from functools import cached_property
@@ -19,6 +20,20 @@ from scripts.model_interactions.encounter import EncounterInteraction
 
 logger = logging.getLogger(__name__)
 
+# Top level keys of the EI json stored in the summary as is.
+SUMMARY_KEYS = [
+    "success",
+    "durationMS",
+    "fightName",
+    "isCM",
+    "isLegendaryCM",
+    "gW2Build",
+    "eiEncounterID",
+    "timeStart",
+    "timeStartStd",
+]
+SUMMARY_VERSION = 1  # Increase when the summary format changes, old summaries are then ignored.
+
 
 class _HealthData:
     """Search the time in seconds from start when a certain health percentage was reached.
@@ -74,6 +89,40 @@ class DetailedParsedLog:
         self.data = data
         self.log_path = log_path
 
+    def to_summary(self) -> dict:
+        """Compact json serializable summary with only the data needed to create the DpsLog.
+        The health percentages are packed as base64 encoded little endian float64 array
+        of (time, health) pairs. Restore with DetailedParsedLog.from_summary.
+        """
+        target = self.data["targets"][0]
+        health_percents = np.asarray(target.get("healthPercents") or [], dtype="<f8")
+        return {
+            "version": SUMMARY_VERSION,
+            "data": {key: self.data.get(key) for key in SUMMARY_KEYS},
+            "accounts": self.get_players(),
+            "buff_ids": list(self.data["buffMap"]),
+            "instance_buff_ids": self.get_instance_buff_ids(),
+            "health_percent_burned": target["healthPercentBurned"],
+            "health_percents": base64.b64encode(health_percents.tobytes()).decode("ascii"),
+        }
+
+    @classmethod
+    def from_summary(cls, summary: dict, log_path: Optional[Path] = None) -> "DetailedParsedLog":
+        """Rebuild the parts of the EI json that are stored in the summary."""
+        health_percents = np.frombuffer(base64.b64decode(summary["health_percents"]), dtype="<f8").reshape(-1, 2)
+
+        data = dict(summary["data"])
+        data["players"] = [{"account": account} for account in summary["accounts"]]
+        data["buffMap"] = {buff_id: {} for buff_id in summary["buff_ids"]}
+        data["presentInstanceBuffs"] = [[buff_id] for buff_id in summary["instance_buff_ids"]]
+        data["targets"] = [
+            {
+                "healthPercents": health_percents.tolist(),
+                "healthPercentBurned": summary["health_percent_burned"],
+            }
+        ]
+        return cls(data=data, log_path=log_path)
+
     def to_dpslog_defaults(self, log_path: Optional[Path] = None) -> dict:
         """Return a pure dict of dpslog defaults derived from the detailed parsed log.
 
@@ -131,6 +180,10 @@ class DetailedParsedLog:
     def get_players(self) -> list[str]:
         return [player["account"] for player in self.data["players"]]
 
+    def get_instance_buff_ids(self) -> list[int]:
+        """Ids of the instance buffs, e.g. 68087 for emboldened."""
+        return [buff[0] for buff in self.data.get("presentInstanceBuffs", [])]
+
     @cached_property
     def encounter(self) -> Optional[Encounter]:
         return EncounterInteraction.find_by_detailed_logs(detailed_metadata=self.data)
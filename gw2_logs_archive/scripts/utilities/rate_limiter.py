@@ -0,0 +1,63 @@
+# %%
+"""Token bucket rate limiter shared between threads."""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Allow `rate` requests per second on average, with bursts up to `capacity`.
+    Thread safe, multiple workers can share one bucket.
+
+    Parameters
+    ----------
+    rate : float
+        Tokens added per second.
+    capacity : float
+        Maximum number of tokens, the size of a burst.
+
+    Methods
+    -------
+    acquire()
+        Block until a token is available.
+    pause(seconds)
+        Stop handing out tokens for a while, e.g. after a 429 response.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> float:
+        """Block until a token is available. Returns the number of seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._paused_until - now
+                if wait <= 0:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return waited
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for the next `seconds`, for all threads."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
@@ -0,0 +1,141 @@
+"""Startup profiler
+
+Reports where a manage.py command spends its time before it does any work:
+importing modules and django.setup(). Enable it with an environment variable,
+the report is written to stderr when the process exits.
+
+    GW2_PROFILE_STARTUP=1 python manage.py update_leaderboards
+
+The value sets how many modules are listed (1 means the default of 25).
+Unlike `python -X importtime` this also covers django.setup() and sums the
+import time per top level package, e.g. pandas or discord.
+"""
+
+import atexit
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from importlib.machinery import ModuleSpec
+from typing import Optional
+
+ENV_VAR = "GW2_PROFILE_STARTUP"
+DEFAULT_TOP = 25
+
+
+@dataclass
+class ImportTiming:
+    """Seconds spent executing a module, self excludes the imports it triggered."""
+
+    name: str
+    self_seconds: float
+    cumulative_seconds: float
+
+
+class StartupProfiler:
+    """Times module execution through a meta path finder and named sections.
+
+    The finder only wraps exec_module of the loader the other finders return,
+    modules keep their original loader and spec.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.imports: dict[str, ImportTiming] = {}
+        self.sections: dict[str, float] = {}
+        self._local = threading.local()
+
+    # Meta path finder
+    def find_spec(self, fullname: str, path=None, target=None) -> Optional[ModuleSpec]:
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                self._wrap_loader(spec)
+                return spec
+        return None
+
+    def _wrap_loader(self, spec: ModuleSpec) -> None:
+        loader = spec.loader
+        # Builtin and frozen importers are classes, patching them would time every module they load.
+        if loader is None or isinstance(loader, type) or not hasattr(loader, "exec_module"):
+            return
+        exec_module = loader.exec_module
+        try:
+            loader.exec_module = lambda module: self._timed_exec(spec.name, exec_module, module)
+        except AttributeError:  # Loaders with __slots__
+            pass
+
+    def _timed_exec(self, name: str, exec_module, module) -> None:
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0.0)  # Time of nested imports
+        start = time.perf_counter()
+        try:
+            exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self.imports[name] = ImportTiming(name, elapsed - nested, elapsed)
+
+    def section(self, name: str, func):
+        """Wrap func so the time of its calls is reported under name."""
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.sections[name] = self.sections.get(name, 0.0) + time.perf_counter() - start
+
+        return timed
+
+    def report(self, top: int = DEFAULT_TOP) -> str:
+        total = time.perf_counter() - self.start
+        import_seconds = sum(timing.self_seconds for timing in self.imports.values())
+        per_package = defaultdict(float)
+        for timing in self.imports.values():
+            per_package[timing.name.partition(".")[0]] += timing.self_seconds
+
+        lines = [
+            f"Startup profile ({len(self.imports)} modules imported)",
+            f"  {'total runtime':<50}{total * 1000:>10.1f} ms",
+            f"  {'imports':<50}{import_seconds * 1000:>10.1f} ms",
+        ]
+        lines += [f"  {name:<50}{seconds * 1000:>10.1f} ms" for name, seconds in self.sections.items()]
+
+        lines += ["", f"Import time per package (top {top})"]
+        for package, seconds in sorted(per_package.items(), key=lambda i: -i[1])[:top]:
+            lines.append(f"  {package:<50}{seconds * 1000:>10.1f} ms")
+
+        lines += ["", f"Slowest modules, cumulative (top {top})", f"  {'module':<50}{'self':>10}{'cumulative':>14}"]
+        for timing in sorted(self.imports.values(), key=lambda i: -i.cumulative_seconds)[:top]:
+            lines.append(
+                f"  {timing.name:<50}{timing.self_seconds * 1000:>7.1f} ms{timing.cumulative_seconds * 1000:>11.1f} ms"
+            )
+        return "\n".join(lines)
+
+
+def install() -> Optional[StartupProfiler]:
+    """Start profiling when GW2_PROFILE_STARTUP is set. Call this before importing django.
+
+    Returns the profiler, or None when the environment variable is not set.
+    """
+    value = os.environ.get(ENV_VAR)
+    if not value:
+        return None
+
+    profiler = StartupProfiler()
+    sys.meta_path.insert(0, profiler)
+
+    import django
+
+    django.setup = profiler.section("django.setup", django.setup)
+
+    top = int(value) if value.isdigit() and int(value) > 1 else DEFAULT_TOP
+    atexit.register(lambda: print(profiler.report(top=top), file=sys.stderr))
+    return profiler
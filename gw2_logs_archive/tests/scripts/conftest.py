@@ -0,0 +1,129 @@
+# %%
+"""Fixtures shared by the script tests."""
+
+import datetime
+import struct
+import zipfile
+from pathlib import Path
+from typing import Optional
+
+import pytest
+from django.db import transaction
+from gw2_logs.models import Emoji, Encounter, Instance, InstanceGroup
+from scripts.model_interactions.emoji_registry import EMOJIS
+from scripts.model_interactions.player_role_registry import PLAYER_ROLE_REGISTRY
+from scripts.model_interactions.rank_index import RANK_INDEX
+from scripts.utilities.evtc_header import (
+    AGENT,
+    EVENT,
+    HEADER,
+    STATECHANGE_GW2_BUILD,
+    STATECHANGE_LOG_END,
+    STATECHANGE_LOG_START,
+)
+
+# Emojis used in the discord messages, see log_helpers.
+EMOJI_NAMES = [
+    *[f"wipe {health}" for health in [13, 25, 38, 50, 63, 75, 88, 100]],
+    *["core", "friend", "pug", "blank", "emboldened", "PepoHands"],
+    *["trophy_gold", "trophy_silver", "trophy_bronze"],
+    *["red_full_medal", "red_line_medal", "green_line_medal", "green_full_medal"],
+    *["1_junk", "2_basic", "3_fine", "4_masterwork", "5_rare", "6_exotic", "7_ascended", "8_legendary"],
+    *[
+        f"{rank}{invalid}"
+        for rank in ["first", "second", "third", "average", "above average", "below average"]
+        for invalid in ["", " invalid"]
+    ],
+]
+
+
+def _event(time: int, src_agent: int = 0, value: int = 0, statechange: int = 0) -> bytes:
+    flags = [0] * 12
+    flags[8] = statechange
+    return EVENT.pack(time, src_agent, 0, value, 0, 0, 0, 0, 0, 0, 0, *flags)
+
+
+class EvtcWriter:
+    """Writes minimal arcdps logs with players, one boss agent and event_count combat events.
+    The default start time and fight length are attributes, so tests can compare against them.
+    """
+
+    start_time = datetime.datetime(2026, 1, 22, 19, 0, tzinfo=datetime.timezone.utc)
+    duration_ms = 123_456
+
+    def __call__(
+        self,
+        path: Path,
+        boss_id: int = 15438,
+        accounts: tuple[str, ...] = ("a.1234", "b.1234"),
+        start_time: Optional[datetime.datetime] = None,
+        duration_ms: Optional[int] = None,
+        event_count: int = 10_000,
+        zipped: bool = True,
+    ) -> Path:
+        start_time = start_time or self.start_time
+        duration_ms = duration_ms or self.duration_ms
+        agents = [
+            AGENT.pack(idx, 1, 0, 0, 0, 0, 0, 0, 0, f"Char{idx}\x00:{acc}\x001\x00".encode())
+            for idx, acc in enumerate(accounts)
+        ]
+        agents.append(AGENT.pack(99, boss_id, 0xFFFFFFFF, 0, 0, 0, 0, 0, 0, b"Boss\0"))
+        events = [
+            _event(1000, src_agent=170000, statechange=STATECHANGE_GW2_BUILD),
+            _event(1000, value=int(start_time.timestamp()), statechange=STATECHANGE_LOG_START),
+            *(_event(1000 + idx * duration_ms // event_count) for idx in range(event_count)),
+            _event(1000 + duration_ms, statechange=STATECHANGE_LOG_END),
+        ]
+        data = b"".join(
+            [
+                HEADER.pack(b"EVTC", b"20250220", 1, boss_id),
+                struct.pack("<I", len(agents)),
+                *agents,
+                struct.pack("<I", 2),
+                struct.pack("<i64s", 1, b"skill 1") + struct.pack("<i64s", 2, b"skill 2"),
+                *events,
+            ]
+        )
+        if zipped:
+            with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+                archive.writestr(path.stem, data)
+        else:
+            path.write_bytes(data)
+        return path
+
+
+@pytest.fixture
+def write_evtc() -> EvtcWriter:
+    """Return the writer of minimal arcdps logs, see EvtcWriter."""
+    return EvtcWriter()
+
+
+@pytest.fixture
+def db():
+    """Run the test in a transaction that is rolled back, the database from .env is left as it was.
+    The in-memory registries are cleared afterwards, they can hold rows that were rolled back.
+    """
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+    for registry in [EMOJIS, RANK_INDEX, PLAYER_ROLE_REGISTRY]:
+        registry.clear()
+
+
+@pytest.fixture
+def encounter(db) -> Encounter:
+    """Vale Guardian in its raid instance, created when the database has no reference data."""
+    instance_group, _ = InstanceGroup.objects.get_or_create(name="raid")
+    instance, _ = Instance.objects.get_or_create(name="Spirit Vale", defaults={"instance_group": instance_group})
+    encounter, _ = Encounter.objects.get_or_create(
+        name="Vale Guardian", defaults={"instance": instance, "dpsreport_boss_id": 15438, "nr": 1}
+    )
+    return encounter
+
+
+@pytest.fixture
+def emojis(db) -> None:
+    """Create the emojis of the discord messages that are missing."""
+    for idx, name in enumerate(EMOJI_NAMES):
+        Emoji.objects.get_or_create(name=name, defaults={"discord_id": 1000 + idx})
+    EMOJIS.clear()
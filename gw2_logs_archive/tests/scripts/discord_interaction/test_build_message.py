@@ -0,0 +1,93 @@
+# %%
+if __name__ == "__main__":
+    from scripts.utilities import django_setup
+
+    django_setup.run()
+
+import datetime
+
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from gw2_logs.models import DpsLog, Emoji, Encounter, Instance, InstanceClear, InstanceClearGroup, InstanceGroup
+from scripts.discord_interaction.build_message import create_discord_message
+from scripts.model_interactions.emoji_registry import EMOJIS
+from scripts.model_interactions.instance_clear_group import InstanceClearGroupInteraction
+from scripts.model_interactions.rank_index import RANK_INDEX
+
+START_TIME = datetime.datetime(2031, 3, 1, 19, 0, tzinfo=datetime.timezone.utc)  # Far away from real logs
+
+
+@pytest.fixture
+def instances(emojis) -> list[Instance]:
+    """Two raid wings with three bosses each."""
+    raid, _ = InstanceGroup.objects.get_or_create(name="raid")
+    instances = []
+    for wing in [1, 2]:
+        emoji = Emoji.objects.create(name=f"test wing {wing}", discord_id=wing)
+        instance = Instance.objects.create(name=f"Test Wing {wing}", instance_group=raid, emoji=emoji, nr=90 + wing)
+        for nr in [1, 2, 3]:
+            emoji = Emoji.objects.create(name=f"test boss {wing}.{nr}", discord_id=10 * wing + nr)
+            Encounter.objects.create(name=f"Test Boss {wing}.{nr}", instance=instance, emoji=emoji, nr=nr)
+        instances.append(instance)
+    return instances
+
+
+def _create_clear_group(instances: list[Instance], wipes_per_encounter: int) -> InstanceClearGroup:
+    """Raid night on two wings, every boss with some wipes before the kill."""
+    icg = InstanceClearGroup.objects.create(name="raids__20310301", type="raid", start_time=START_TIME)
+    start_time = START_TIME
+    for instance in instances:
+        iclear = InstanceClear.objects.create(
+            name=f"test_{instance.id}__20310301",
+            instance=instance,
+            instance_clear_group=icg,
+            start_time=start_time,
+            duration=datetime.timedelta(minutes=15),
+            success=True,
+            core_player_count=10,
+            friend_player_count=0,
+        )
+        for encounter in instance.encounters.all():
+            for idx in range(wipes_per_encounter + 1):
+                success = idx == wipes_per_encounter
+                DpsLog.objects.create(
+                    url=f"https://dps.report/test-{start_time.timestamp():.0f}",
+                    encounter=encounter,
+                    instance_clear=iclear,
+                    start_time=start_time,
+                    duration=datetime.timedelta(minutes=2 if success else 1),
+                    success=success,
+                    final_health_percentage=0 if success else 50,
+                    player_count=10,
+                    core_player_count=10,
+                    friend_player_count=0,
+                )
+                start_time += datetime.timedelta(minutes=3)
+    return icg
+
+
+def _count_queries(instances: list[Instance], wipes_per_encounter: int) -> tuple[int, dict]:
+    with transaction.atomic():
+        icg = _create_clear_group(instances, wipes_per_encounter)
+        icgi = InstanceClearGroupInteraction(icg, update_total_duration=False)
+        RANK_INDEX.clear()
+        EMOJIS.clear()
+        with CaptureQueriesContext(connection) as queries:
+            titles, descriptions = create_discord_message(icgi)
+        transaction.set_rollback(True)
+    return len(queries), descriptions
+
+
+def test_message_queries_independent_of_log_count(instances):
+    queries_few, descriptions = _count_queries(instances, wipes_per_encounter=1)
+    queries_many, _ = _count_queries(instances, wipes_per_encounter=5)
+
+    assert queries_few == queries_many
+    # One line per boss, each with its wipe
+    lines = [line for description in descriptions["raid"].values() for line in description.splitlines()]
+    assert sum("wipe_at_50" in line for line in lines) >= 6
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,165 @@
+# %%
+if __name__ == "__main__":
+    from scripts.utilities import django_setup
+
+    django_setup.run()
+
+import asyncio
+import datetime
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+from aiohttp import web
+from scripts.log_processing.dps_report_client import AsyncDpsReportClient, DpsReportClient, DpsReportEndpoints
+from scripts.utilities.disk_cache import DiskCache
+from scripts.utilities.rate_limiter import TokenBucket
+
+
+def _response(status_code: int, headers: dict = None, json_data: dict = None):
+    response = MagicMock(status_code=status_code, headers=headers or {}, reason="")
+    response.json.return_value = json_data or {}
+    return response
+
+
+def test_upload_retries_after_rate_limit(tmp_path):
+    log_path = tmp_path.joinpath("20260122-200000.zevtc")
+    log_path.write_bytes(b"evtc")
+
+    rate_limiter = TokenBucket(rate=100, capacity=10)
+    session = MagicMock()
+    client = DpsReportClient(
+        upload_rate_limiter=rate_limiter,
+        session=session,
+        response_cache=DiskCache(cache_dir=tmp_path.joinpath("cache")),
+    )
+    session.request.side_effect = [
+        _response(429, headers={"Retry-After": "7"}),
+        _response(503),
+        _response(200, json_data={"permalink": "https://dps.report/abc"}),
+    ]
+
+    with patch.object(rate_limiter, "pause") as pause:
+        metadata, move_reason = client.upload_log(log_path=log_path)
+
+    assert session.request.call_count == 3
+    assert session.request.call_args.kwargs["timeout"] is not None
+    assert metadata.data["permalink"] == "https://dps.report/abc"
+    assert move_reason is None
+
+    # First wait comes from Retry-After, then exponential backoff.
+    assert pause.call_args_list[0].args == (7.0,)
+    assert 4 <= pause.call_args_list[1].args[0] <= 5
+
+
+def test_responses_are_cached(tmp_path):
+    cache = DiskCache(cache_dir=tmp_path, ttl_seconds=60)
+    session = MagicMock()
+    session.request.return_value = _response(200, json_data={"id": "abcd-20260122-200000_vg"})
+    upload_rate_limiter = MagicMock()
+    client = DpsReportClient(
+        upload_rate_limiter=upload_rate_limiter,
+        get_rate_limiter=TokenBucket(rate=100, capacity=10),
+        session=session,
+        response_cache=cache,
+    )
+
+    url = "https://dps.report/abcd-20260122-200000_vg"
+    assert client.request_metadata(url=url).data["id"] == "abcd-20260122-200000_vg"
+    assert client.request_metadata(url=url).data["id"] == "abcd-20260122-200000_vg"
+    assert client.request_metadata(report_id="abcd-20260122-200000_vg") is not None
+    assert session.request.call_count == 1
+
+    # Expired responses are requested again
+    with patch("scripts.utilities.disk_cache.time.time", return_value=time.time() + 120):
+        client.request_metadata(url=url)
+    assert session.request.call_count == 2
+    upload_rate_limiter.acquire.assert_not_called()  # Only uploads are paced strictly
+
+
+def test_upload_read_timeout_is_not_sent_again(tmp_path, write_evtc):
+    """dps.report might have made the report, the next upload looks it up instead of uploading twice."""
+    start_time = datetime.datetime(2026, 1, 22, 19, 0, tzinfo=datetime.timezone.utc)
+    log_path = write_evtc(tmp_path.joinpath("20260122-200000.zevtc"), start_time=start_time)
+    session = MagicMock()
+    client = DpsReportClient(
+        upload_rate_limiter=TokenBucket(rate=100, capacity=10),
+        get_rate_limiter=TokenBucket(rate=100, capacity=10),
+        session=session,
+        response_cache=DiskCache(cache_dir=tmp_path.joinpath("cache")),
+    )
+    session.request.side_effect = requests.ReadTimeout()
+    with pytest.raises(requests.ReadTimeout):
+        client.upload_log(log_path=log_path)
+    assert session.request.call_count == 1
+
+    upload = {"permalink": "https://dps.report/abc", "encounterTime": int(start_time.timestamp()) + 1}
+    upload["encounter"] = {"bossId": 15438}
+    session.request.side_effect = [_response(200, json_data={"uploads": [upload]})]
+    metadata, move_reason = client.upload_log(log_path=log_path)
+    assert metadata.data["permalink"] == "https://dps.report/abc"
+    assert session.request.call_args.args[0] == "get"
+
+
+def test_token_bucket_pause_blocks_all_tokens():
+    clock = [0.0]
+
+    def fake_sleep(seconds):
+        clock[0] += seconds
+
+    with (
+        patch("scripts.utilities.rate_limiter.time.monotonic", side_effect=lambda: clock[0]),
+        patch("scripts.utilities.rate_limiter.time.sleep", side_effect=fake_sleep),
+    ):
+        rate_limiter = TokenBucket(rate=1, capacity=2)
+        assert rate_limiter.acquire() == 0
+        assert rate_limiter.acquire() == 0  # Burst
+        assert rate_limiter.acquire() == 1  # Refill
+
+        rate_limiter.pause(5)
+        assert rate_limiter.acquire() >= 5
+
+
+def test_async_client_requests_metadata_concurrently(tmp_path):
+    requests_seen = []
+
+    async def metadata_handler(request):
+        permalink = request.query["permalink"]
+        requests_seen.append(permalink)
+        if permalink == "busy" and requests_seen.count("busy") == 1:
+            return web.Response(status=429, headers={"Retry-After": "0"})
+        await asyncio.sleep(0.1)
+        return web.json_response({"permalink": permalink})
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/getUploadMetadata", metadata_handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+
+        try:
+            async with AsyncDpsReportClient(
+                rate_limiter=TokenBucket(rate=1000, capacity=100), response_cache=DiskCache(cache_dir=tmp_path)
+            ) as client:
+                client.endpoints = DpsReportEndpoints(base_url=f"http://127.0.0.1:{port}/")
+                start = asyncio.get_running_loop().time()
+                metadatas = await asyncio.gather(
+                    *[client.request_metadata(url=url) for url in ["a", "b", "c", "busy"]]
+                )
+                duration = asyncio.get_running_loop().time() - start
+        finally:
+            await runner.cleanup()
+        return metadatas, duration
+
+    metadatas, duration = asyncio.run(run())
+    assert [metadata.data["permalink"] for metadata in metadatas] == ["a", "b", "c", "busy"]
+    assert requests_seen.count("busy") == 2  # Retried after the 429
+    assert duration < 0.35  # Not one after the other
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
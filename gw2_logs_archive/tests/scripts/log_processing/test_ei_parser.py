@@ -0,0 +1,186 @@
+# %%
+if __name__ == "__main__":
+    from scripts.utilities import django_setup
+
+    django_setup.run()
+
+import gzip
+import json
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+from scripts.log_processing.ei_parser import EliteInsightsParser
+
+EI_JSON = {
+    "eiEncounterID": 131329,
+    "fightName": "Vale Guardian",
+    "timeStart": "2026-01-22 20:00:00 +01:00",
+    "timeStartStd": "2026-01-22 20:00:00 +01:00",
+    "durationMS": 123456,
+    "success": True,
+    "isCM": False,
+    "isLegendaryCM": False,
+    "gW2Build": 170000,
+    "presentInstanceBuffs": [[68087, 1]],
+    "buffMap": {"b68087": {"name": "Emboldened", "stacking": True}, "b740": {"name": "Might"}},
+    "players": [{"account": "a.1234", "name": "A", "rotation": [1, 2, 3]}, {"account": "b.1234"}],
+    "targets": [
+        {"healthPercents": [[0, 100.0], [1000, 50.5]], "healthPercentBurned": 49.5, "damage": [[1, 2]]},
+        {"healthPercents": [[0, 100.0]], "healthPercentBurned": 0.0},
+    ],
+    "phases": [{"name": "Full Fight", "targets": [0]}],
+    "mechanics": [{"name": "Boss TP", "mechanicsData": [{"time": 1}]}],
+}
+
+
+def write_ei_json(parsed_path: Path, data: dict = EI_JSON):
+    with gzip.open(parsed_path, "wt") as fout:
+        json.dump(data, fout)
+
+
+@pytest.fixture
+def ei_parser(tmp_path):
+    with patch("scripts.log_processing.ei_parser.EliteInsightsUpdater"):
+        ei_parser = EliteInsightsParser(auto_update=False)
+    ei_parser.updater.installed_version = "v1.0"
+    ei_parser.create_settings(out_dir=tmp_path.joinpath("parsed"), cache_dir=tmp_path.joinpath("cache"))
+    return ei_parser
+
+
+@pytest.fixture
+def log_paths(tmp_path):
+    log_paths = [tmp_path.joinpath(f"20260122-2000{idx:02d}.zevtc") for idx in range(5)]
+    for idx, log_path in enumerate(log_paths):
+        log_path.write_bytes(f"evtc {idx}".encode())
+    return log_paths
+
+
+def fake_cli_factory(ei_parser, calls: list, failing_logs: tuple[Path, ...] = ()):
+    def fake_cli(cmd, capture_output, text):
+        calls.append(cmd)
+        for log_path in cmd[3:]:
+            if Path(log_path) not in failing_logs:
+                write_ei_json(ei_parser.out_dir.joinpath(f"{Path(log_path).stem}_vg_kill.json.gz"))
+        return MagicMock(returncode=0, stderr="")
+
+    return fake_cli
+
+
+def test_parse_logs_batches_and_maps_outputs(ei_parser, log_paths):
+    """Every chunk is one EI call, each input maps back to its own output or None."""
+    failing_log = log_paths[2]
+
+    calls = []
+    fake_cli = fake_cli_factory(ei_parser, calls, failing_logs=(failing_log,))
+
+    with patch("scripts.log_processing.ei_parser.subprocess.run", side_effect=fake_cli):
+        parsed_paths = ei_parser.parse_logs(log_paths=log_paths, chunk_size=2)
+
+    assert len(calls) == 3
+    assert list(parsed_paths) == log_paths
+    assert parsed_paths[failing_log] is None
+    for log_path in log_paths:
+        if log_path != failing_log:
+            assert parsed_paths[log_path].parent == ei_parser.cache.cache_dir
+
+    # Already parsed logs dont start a new process.
+    with patch("scripts.log_processing.ei_parser.subprocess.run", side_effect=fake_cli):
+        ei_parser.parse_logs(log_paths=[log_paths[0], log_paths[1]])
+    assert len(calls) == 3
+
+
+def test_parsed_logs_are_shared_by_content(ei_parser, log_paths, tmp_path):
+    """A copy of a log in another folder and a parser for another date find the same parse."""
+    calls = []
+    with patch("scripts.log_processing.ei_parser.subprocess.run", side_effect=fake_cli_factory(ei_parser, calls)):
+        parsed_path = ei_parser.parse_log(log_paths[0])
+
+    log_copy = tmp_path.joinpath("extra", log_paths[0].name)
+    log_copy.parent.mkdir()
+    log_copy.write_bytes(log_paths[0].read_bytes())
+
+    ei_parser.create_settings(out_dir=tmp_path.joinpath("parsed_other_date"), cache_dir=ei_parser.cache.cache_dir)
+    assert ei_parser.find_parsed_json(log_copy) == parsed_path
+    assert len(calls) == 1
+
+    # Changed content is parsed again
+    log_copy.write_bytes(b"evtc changed")
+    assert ei_parser.find_parsed_json(log_copy) is None
+
+
+def test_find_parsed_json_without_globbing(ei_parser, log_paths):
+    """Output in the out_dir from before the cache is listed once, a miss doesnt search the out_dir."""
+    write_ei_json(ei_parser.out_dir.joinpath(f"{log_paths[0].stem}_vg_kill.json.gz"))
+    ei_parser.create_settings(out_dir=ei_parser.out_dir, cache_dir=ei_parser.cache.cache_dir)
+
+    with patch.object(Path, "glob", side_effect=AssertionError("out_dir searched")):
+        parsed_path = ei_parser.find_parsed_json(log_paths[0])
+        assert parsed_path.parent == ei_parser.cache.cache_dir
+        assert ei_parser.find_parsed_json(log_paths[1]) is None
+    assert ei_parser.find_parsed_json(log_paths[0]) == parsed_path
+
+
+def test_parse_profiles(ei_parser, log_paths, tmp_path):
+    """The lean profile skips the heavy EI work, a lean parser reuses a full parse but not the other way around."""
+    ei_parser.create_settings(out_dir=tmp_path.joinpath("lean"), profile="lean", cache_dir=ei_parser.cache.cache_dir)
+    lean_settings = ei_parser.settings.read_text()
+    assert "ParseCombatReplay=False" in lean_settings
+    assert f"OutLocation={tmp_path.joinpath('lean')}" in lean_settings
+
+    ei_parser.create_settings(out_dir=tmp_path.joinpath("full"), create_html=True, cache_dir=ei_parser.cache.cache_dir)
+    assert ei_parser.profile == "full"
+    assert "ParseCombatReplay=True" in ei_parser.settings.read_text()
+    assert "SaveOutHTML=True" in ei_parser.settings.read_text()
+
+    calls = []
+    with patch("scripts.log_processing.ei_parser.subprocess.run", side_effect=fake_cli_factory(ei_parser, calls)):
+        parsed_path = ei_parser.parse_log(log_paths[0])
+        ei_parser.create_settings(
+            out_dir=tmp_path.joinpath("lean"), profile="lean", cache_dir=ei_parser.cache.cache_dir
+        )
+        assert ei_parser.parse_log(log_paths[0]) == parsed_path
+        lean_path = ei_parser.parse_log(log_paths[1])
+
+        ei_parser.create_settings(
+            out_dir=tmp_path.joinpath("full"), profile="full", cache_dir=ei_parser.cache.cache_dir
+        )
+        assert ei_parser.find_parsed_json(log_paths[1]) is None
+    assert lean_path is not None
+    assert len(calls) == 2
+
+
+def test_load_parsed_json_projected_matches_full(tmp_path):
+    """Without a summary the used keys are streamed with ijson, the full tree is never loaded."""
+    parsed_path = tmp_path.joinpath("log.json.gz")
+    write_ei_json(parsed_path)
+
+    with patch("scripts.log_processing.ei_parser.json.load", side_effect=AssertionError("full json loaded")):
+        projected = EliteInsightsParser.load_parsed_json(parsed_path)
+    full = EliteInsightsParser.load_parsed_json(parsed_path, full=True)
+    EliteInsightsParser.summary_path(parsed_path).unlink()
+
+    assert "phases" not in projected.data
+    assert set(projected.data["buffMap"]) == {"b68087", "b740"}
+    assert projected.data["presentInstanceBuffs"] == full.data["presentInstanceBuffs"]
+    for method in ["get_players", "get_duration", "get_starttime", "get_final_health_percentage", "get_health_timers"]:
+        assert getattr(projected, method)() == getattr(full, method)()
+
+
+def test_load_parsed_json_uses_summary(ei_parser, log_paths):
+    """The parse writes a summary, loading it gives the same DpsLog data without the full json."""
+    with patch("scripts.log_processing.ei_parser.subprocess.run", side_effect=fake_cli_factory(ei_parser, calls=[])):
+        parsed_path = ei_parser.parse_log(log_paths[0])
+    assert EliteInsightsParser.summary_path(parsed_path).exists()
+
+    full = EliteInsightsParser.load_parsed_json(parsed_path, full=True)
+    parsed_path.write_bytes(b"")  # Only the summary can be read now
+    summary = EliteInsightsParser.load_parsed_json(parsed_path)
+
+    assert summary.to_dpslog_defaults() == full.to_dpslog_defaults()
+    assert summary.get_instance_buff_ids() == [68087]
+    assert summary.get_starttime() == full.get_starttime()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,177 @@
+# %%
+if __name__ == "__main__":
+    from scripts.utilities import django_setup
+
+    django_setup.run()
+
+import datetime
+import os
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from scripts.log_processing.log_files import DirectoryIndex, LogFilesDate
+
+
+def _make_old(*paths: Path):
+    """Set the mtime in the past so the directory index trusts it."""
+    for path in paths:
+        os.utime(path, (1_000_000_000, 1_000_000_000))
+
+
+@pytest.fixture
+def log_tree(tmp_path):
+    root = tmp_path / "arcdps.cbtlogs"
+    boss1 = root / "Vale Guardian" / "Char"
+    boss2 = root / "Gorseval"
+    for folder in [boss1, boss2]:
+        folder.mkdir(parents=True)
+    (boss1 / "20250123-200000.zevtc").touch()
+    (boss2 / "20250123-201000.zevtc").touch()
+    (boss2 / "20250122-201000.zevtc").touch()  # Other date
+    _make_old(root, root / "Vale Guardian", boss1, boss2)
+    return root
+
+
+def test_directory_index_only_lists_changed_dirs(log_tree):
+    dir_index = DirectoryIndex(root=log_tree, pattern="20250123*.zevtc")
+
+    assert sorted(p.name for p in dir_index.scan()) == ["20250123-200000.zevtc", "20250123-201000.zevtc"]
+    assert dir_index.listed_dirs == 4
+
+    # Nothing changed, nothing is listed again
+    assert len(dir_index.scan()) == 2
+    assert dir_index.listed_dirs == 0
+
+    # A new log only relists its own folder
+    (log_tree / "Gorseval" / "20250123-202000.zevtc").touch()
+    assert len(dir_index.scan()) == 3
+    assert dir_index.listed_dirs == 1
+
+
+def test_directory_index_persists_listings(log_tree, db):
+    """A restarted run only lists the folders that changed while it was not running."""
+    dir_index = DirectoryIndex(root=log_tree, pattern="20250123*.zevtc", persist=True)
+    assert len(dir_index.scan()) == 2
+    assert dir_index.listed_dirs == 4
+
+    (log_tree / "Gorseval" / "20250123-202000.zevtc").touch()
+    os.utime(log_tree / "Gorseval", (1_000_000_100, 1_000_000_100))  # Changed, but old enough to trust
+
+    restarted = DirectoryIndex(root=log_tree, pattern="20250123*.zevtc", persist=True)
+    assert len(restarted.scan()) == 3
+    assert restarted.listed_dirs == 1
+
+    # The stored listings hold every date
+    other_date = DirectoryIndex(root=log_tree, pattern="20250122*.zevtc", persist=True)
+    assert [p.name for p in other_date.scan()] == ["20250122-201000.zevtc"]
+    assert other_date.listed_dirs == 0
+
+
+def test_log_files_date_reuses_logfiles(log_tree):
+    log_files_date = LogFilesDate(y=2025, m=1, d=23, log_search_dirs=[log_tree])
+    log_files_date.refresh_logs()
+    logs_before = dict(log_files_date.logs)
+    assert len(logs_before) == 2
+
+    (log_tree / "Gorseval" / "20250123-202000.zevtc").touch()
+    log_files_date.refresh_logs()
+
+    assert len(log_files_date.logs) == 3
+    for log_id, logfile in logs_before.items():
+        assert log_files_date.logs[log_id] is logfile
+
+
+def test_log_files_date_waits_for_stable_logs(log_tree):
+    log_files_date = LogFilesDate(y=2025, m=1, d=23, log_search_dirs=[log_tree], stable_seconds=60)
+    old_log = log_tree / "Gorseval" / "20250123-201000.zevtc"
+    _make_old(old_log)
+
+    # The other log was just written, it is held back until it is quiet for 60s.
+    assert [logf.path for logf in log_files_date.get_unprocessed_logs("local")] == [old_log]
+
+
+def test_log_files_date_wakes_for_the_first_stable_log(log_tree):
+    log_files_date = LogFilesDate(y=2025, m=1, d=23, log_search_dirs=[log_tree], stable_seconds=60)
+    almost_stable_log = log_tree / "Gorseval" / "20250123-201000.zevtc"
+    os.utime(almost_stable_log, (time.time() - 55, time.time() - 55))
+    log_files_date.refresh_logs()
+
+    with patch("scripts.log_processing.log_files.time.sleep") as sleep:
+        log_files_date.wait_for_new_logs(timeout=30)
+    assert sleep.call_args.args[0] <= 5
+
+
+def test_log_files_date_requeues_changed_logs(log_tree):
+    log_files_date = LogFilesDate(y=2025, m=1, d=23, log_search_dirs=[log_tree], stable_seconds=0)
+    for logf in log_files_date.get_unprocessed_logs("local"):
+        logf.mark_local_processed()
+    assert log_files_date.get_unprocessed_logs("local") == []
+
+    changed_log = log_tree / "Gorseval" / "20250123-201000.zevtc"
+    changed_log.write_bytes(b"more data")
+    assert [logf.path for logf in log_files_date.get_unprocessed_logs("local")] == [changed_log]
+
+
+def test_log_files_date_watches_for_new_logs(log_tree):
+    log_files_date = LogFilesDate(y=2025, m=1, d=23, log_search_dirs=[log_tree], stable_seconds=0, watch=True)
+    try:
+        assert log_files_date._watcher is not None and log_files_date._watcher.is_alive
+        for logf in log_files_date.get_unprocessed_logs("local"):
+            logf.mark_local_processed()
+
+        new_log = log_tree / "Gorseval" / "20250123-202000.zevtc"
+        new_log.touch()
+        start = time.monotonic()
+        log_files_date.wait_for_new_logs(timeout=10)
+        assert time.monotonic() - start < 5  # Woken by the watcher
+
+        # Found from the watcher events, without walking the folders
+        assert [logf.path for logf in log_files_date.get_unprocessed_logs("local")] == [new_log]
+        assert not log_files_date._should_full_scan()
+    finally:
+        log_files_date.close()
+
+
+def test_log_files_date_resumes_from_saved_state(log_tree, db):
+    log_files_date = LogFilesDate(y=2025, m=1, d=23, log_search_dirs=[log_tree], stable_seconds=0, persist_state=True)
+    for logf in log_files_date.get_unprocessed_logs("local"):
+        logf.mark_local_processed()
+
+    # A restarted run only has the upload left
+    restarted = LogFilesDate(y=2025, m=1, d=23, log_search_dirs=[log_tree], stable_seconds=0, persist_state=True)
+    assert restarted.get_unprocessed_logs("local") == []
+    assert len(restarted.get_unprocessed_logs("upload")) == 2
+
+
+def test_log_files_date_skips_other_recordings_of_a_fight(tmp_path, write_evtc, db):
+    start_time = datetime.datetime(2025, 1, 23, 19, 0, tzinfo=datetime.timezone.utc)
+    local_dir, extra_dir = tmp_path / "local", tmp_path / "extra"
+    for folder in [local_dir, extra_dir]:
+        folder.mkdir()
+    local_log = write_evtc(local_dir / "20250123-200001.zevtc", accounts=("a.1234",), start_time=start_time)
+    # Recorded by another member, their log started a second earlier.
+    extra_copy = write_evtc(
+        extra_dir / "20250123-200000.zevtc",
+        accounts=("b.1234",),
+        start_time=start_time - datetime.timedelta(seconds=1),
+        duration_ms=124_000,
+    )
+    other_fight = write_evtc(
+        extra_dir / "20250123-201000.zevtc", start_time=start_time + datetime.timedelta(minutes=10)
+    )
+
+    kwargs = {"y": 2025, "m": 1, "d": 23, "log_search_dirs": [local_dir, extra_dir], "stable_seconds": 0}
+    log_files_date = LogFilesDate(**kwargs, persist_state=True)
+    assert [logf.path for logf in log_files_date.get_unprocessed_logs("local")] == [local_log, other_fight]
+    assert log_files_date.logs[extra_copy.stem].alias_of == local_log
+
+    # The alias is remembered, a restarted run doesn't read it again
+    restarted = LogFilesDate(**kwargs, persist_state=True)
+    assert [logf.path for logf in restarted.get_unprocessed_logs("upload")] == [local_log, other_fight]
+    assert restarted.logs[extra_copy.stem].alias_of == local_log
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,125 @@
+# %%
+if __name__ == "__main__":
+    from scripts.utilities import django_setup
+
+    django_setup.run()
+
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from scripts.log_processing.log_files import LogFilesDate
+from scripts.log_processing.log_pipeline import MAX_ATTEMPTS, LogPipeline
+
+
+@pytest.fixture
+def log_dir(tmp_path):
+    for name in ["20250123-200000.zevtc", "20250123-201000.zevtc", "20250123-202000.zevtc"]:
+        tmp_path.joinpath(name).write_bytes(b"evtc")
+    return tmp_path
+
+
+def test_pipeline_processes_every_log_once(log_dir):
+    """All stages run for each log, the waiting logs share one EI process. A past date stops after one pass."""
+    log_files_date = LogFilesDate(y=2025, m=1, d=23, log_search_dirs=[log_dir], stable_seconds=0)
+
+    ei_parser = MagicMock()
+    ei_parser.parse_logs.side_effect = lambda log_paths, chunk_size: {
+        log_path: log_path.with_suffix(".json.gz") for log_path in log_paths
+    }
+    dps_report_client = MagicMock()
+    dps_report_client.upload_log.return_value = (None, None)
+
+    def process_log_local(log_path, **kwargs):
+        return MagicMock(url="", cm=False, log_path=log_path)
+
+    published = []
+    pipeline = LogPipeline(
+        log_files_date_cls=log_files_date,
+        ei_parser=ei_parser,
+        publish=published.extend,
+        parse_workers=1,
+        dps_report_client=dps_report_client,
+    )
+    with (
+        patch("scripts.log_processing.log_pipeline._process_log_local", side_effect=process_log_local),
+        patch("scripts.log_processing.log_pipeline._process_log_upload", return_value=MagicMock(cm=False)),
+    ):
+        pipeline.run(max_idle_seconds=60)
+
+    assert ei_parser.parse_logs.call_count == 1
+    assert dps_report_client.upload_log.call_count == 3
+    assert all(logf.local_processed and logf.upload_processed for logf in log_files_date.logs.values())
+    assert len(published) == 6  # Once parsed and once with the link
+    assert pipeline.counts == {"parse": 3, "ingest": 3, "upload": 3, "publish": 6}
+
+
+def test_pipeline_ingests_in_start_time_order(log_dir):
+    """Several EI processes run at once, the DpsLogs are still created in start-time order."""
+    log_files_date = LogFilesDate(y=2025, m=1, d=23, log_search_dirs=[log_dir], stable_seconds=0)
+
+    def parse_logs(log_paths, chunk_size):
+        time.sleep(0.1 if log_paths[0].name.startswith("20250123-200000") else 0)  # First log finishes last
+        return {log_path: log_path.with_suffix(".json.gz") for log_path in log_paths}
+
+    ei_parser = MagicMock()
+    ei_parser.parse_logs.side_effect = parse_logs
+
+    ingested = []
+
+    def process_log_local(log_path, **kwargs):
+        ingested.append(log_path.name)
+        return MagicMock(url="link", cm=False, log_path=log_path)
+
+    pipeline = LogPipeline(
+        log_files_date_cls=log_files_date, ei_parser=ei_parser, publish=lambda dpslogs: None, parse_workers=3
+    )
+    with patch("scripts.log_processing.log_pipeline._process_log_local", side_effect=process_log_local):
+        pipeline.run(max_idle_seconds=60)
+
+    assert ei_parser.parse_logs.call_count == 3
+    assert ingested == sorted(ingested)
+
+
+def test_pipeline_retries_failed_logs(log_dir):
+    """A failed parse is tried again, a log that keeps failing to ingest is skipped after MAX_ATTEMPTS."""
+    log_files_date = LogFilesDate(y=2025, m=1, d=23, log_search_dirs=[log_dir], stable_seconds=0)
+    bad_log = log_dir / "20250123-201000.zevtc"
+
+    parse_calls = []
+
+    def parse_logs(log_paths, chunk_size):
+        parse_calls.append(log_paths)
+        if len(parse_calls) == 1:
+            raise RuntimeError("EI crashed")
+        return {log_path: log_path.with_suffix(".json.gz") for log_path in log_paths}
+
+    ei_parser = MagicMock()
+    ei_parser.parse_logs.side_effect = parse_logs
+
+    ingested = []
+
+    def process_log_local(log_path, **kwargs):
+        ingested.append(log_path)
+        if log_path == bad_log:
+            raise ValueError("Broken log")
+        return MagicMock(url="link", cm=False, log_path=log_path)
+
+    pipeline = LogPipeline(
+        log_files_date_cls=log_files_date, ei_parser=ei_parser, publish=lambda dpslogs: None, poll_seconds=0.01
+    )
+    with (
+        patch("scripts.log_processing.log_pipeline.today_y_m_d", return_value=(2025, 1, 23)),
+        patch("scripts.log_processing.log_pipeline._process_log_local", side_effect=process_log_local),
+    ):
+        pipeline.run(max_idle_seconds=0.5)
+
+    # The first parse failed for all 3 logs, the attempts of a log are counted over both stages.
+    assert pipeline.counts["parse_failed"] == 3
+    assert ingested.count(bad_log) == MAX_ATTEMPTS - 1
+    assert len(ingested) == MAX_ATTEMPTS + 1
+    assert all(logf.local_processed for logf in log_files_date.logs.values())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
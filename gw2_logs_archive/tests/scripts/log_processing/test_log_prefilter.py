@@ -0,0 +1,44 @@
+# %%
+if __name__ == "__main__":
+    from scripts.utilities import django_setup
+
+    django_setup.run()
+
+import pytest
+from gw2_logs.models import Encounter, Instance, InstanceGroup
+from scripts.log_processing.log_prefilter import LogPrefilter
+
+GOLEM_BOSS_ID = 16199  # Standard Kitty Golem
+
+
+@pytest.fixture
+def golem_encounter(db) -> Encounter:
+    """Golem encounter in its own instance group, which is not processed."""
+    instance_group, _ = InstanceGroup.objects.get_or_create(name="golem")
+    instance, _ = Instance.objects.get_or_create(
+        name="Special Forces Training Arena", defaults={"instance_group": instance_group}
+    )
+    encounter, _ = Encounter.objects.get_or_create(
+        name="Standard Kitty Golem", defaults={"instance": instance, "dpsreport_boss_id": GOLEM_BOSS_ID}
+    )
+    return encounter
+
+
+def test_skip_reason(tmp_path, write_evtc, golem_encounter):
+    prefilter = LogPrefilter(itype_groups=["raid"], too_short_ms=2200)
+
+    golem_log = write_evtc(tmp_path.joinpath("golem.zevtc"), boss_id=GOLEM_BOSS_ID)
+    short_log = write_evtc(tmp_path.joinpath("short.zevtc"), duration_ms=1000, event_count=100)
+    raid_log = write_evtc(tmp_path.joinpath("raid.zevtc"))
+    broken_log = tmp_path.joinpath("broken.zevtc")
+    broken_log.write_bytes(b"not an evtc")
+
+    assert prefilter.skip_reason(golem_log).startswith("instance group")
+    assert prefilter.skip_reason(short_log) == "too short"
+    assert prefilter.skip_reason(raid_log) is None
+    assert prefilter.skip_reason(broken_log) is None  # EI decides
+    assert sum(prefilter.skipped.values()) == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -4,13 +4,15 @@ if __name__ == "__main__":
 
     django_setup.run()
 
+import time
+from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import pandas as pd
 import pytest
 from gw2_logs.models import DpsLog
 from scripts.log_processing.log_files import LogFile, LogFilesDate
-from scripts.log_processing.logfile_processing import process_logs_once
+from scripts.log_processing.logfile_processing import _parse_logs_local, process_logs_once
 
 
 @pytest.fixture
@@ -82,5 +84,27 @@ def test_process_logs_once_fully_mocked(
     # Ensure our mock was called for every lo
 
 
+def test_parse_logs_local_keeps_start_time_order():
+    """Logs that finish parsing first should still be returned in the original order."""
+    log_paths = [Path(f"2026012{i}-200000.zevtc") for i in range(5)]
+    parse_time = {log_path: 0.05 * (5 - idx) for idx, log_path in enumerate(log_paths)}
+
+    def parse_logs(log_paths, chunk_size):
+        time.sleep(sum(parse_time[log_path] for log_path in log_paths))
+        return {log_path: log_path.with_suffix(".json.gz") for log_path in log_paths}
+
+    ei_parser = MagicMock()
+    ei_parser.parse_logs.side_effect = parse_logs
+
+    t0 = time.perf_counter()
+    results = list(_parse_logs_local(log_paths=log_paths, ei_parser=ei_parser, max_workers=5))
+    elapsed = time.perf_counter() - t0
+
+    assert [log_path for log_path, _ in results] == log_paths
+    assert [parsed_path for _, parsed_path in results] == [p.with_suffix(".json.gz") for p in log_paths]
+    # Parsed in parallel, so total time is close to the slowest log instead of the sum.
+    assert elapsed < sum(parse_time.values())
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
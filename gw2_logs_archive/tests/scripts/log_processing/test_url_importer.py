@@ -0,0 +1,123 @@
+# %%
+if __name__ == "__main__":
+    from scripts.utilities import django_setup
+
+    django_setup.run()
+
+import asyncio
+import datetime
+import threading
+from unittest.mock import patch
+
+import pytest
+from aiohttp import web
+from gw2_logs.models import DpsLog
+from scripts.log_processing.dps_report_client import DpsReportEndpoints
+from scripts.log_processing.url_importer import BulkUrlImporter
+from scripts.utilities.disk_cache import DiskCache
+from scripts.utilities.metadata_parsed import MetadataParsed
+
+ENCOUNTER_TIME = 1_900_000_000  # Far away from real logs
+
+
+def _metadata(idx: int) -> MetadataParsed:
+    return MetadataParsed(
+        data={
+            "id": f"test-{idx}",
+            "permalink": f"https://dps.report/test-{idx}",
+            "encounterTime": ENCOUNTER_TIME + idx,
+            "encounter": {
+                "success": True,
+                "duration": 100,
+                "numberOfPlayers": 10,
+                "bossId": 15438,
+                "boss": "Vale Guardian",
+                "isCm": False,
+                "isLegendaryCm": False,
+                "gw2Build": 1,
+            },
+            "players": {"p1": {"display_name": "player.1234"}},
+        }
+    )
+
+
+def test_bulk_import_creates_and_skips_existing(encounter):
+    urls = [f"https://dps.report/test-{idx}" for idx in range(5)]
+
+    async def fake_fetch(self, urls):
+        return [(url, _metadata(int(url.rsplit("-", 1)[1])), None) for url in urls]
+
+    with patch.object(BulkUrlImporter, "_fetch", fake_fetch):
+        stats = BulkUrlImporter(batch_size=2).run(urls=urls + urls[:1])
+        assert stats.total == 5
+        assert stats.created == 5
+        assert DpsLog.objects.filter(url__in=urls, encounter=encounter).count() == 5
+
+        # Second run only needs the url lookup
+        stats = BulkUrlImporter().run(urls=urls)
+        assert stats.skipped == 5
+        assert stats.created == 0
+
+
+def test_bulk_import_keeps_local_name_in_sync(encounter):
+    """bulk_update skips DpsLog.save, local_name is set by the importer itself."""
+    dpslog = DpsLog.objects.create(
+        start_time=datetime.datetime.fromtimestamp(ENCOUNTER_TIME, tz=datetime.timezone.utc),
+        local_path=r"C:\arcdps.cbtlogs\Vale Guardian\20300318-013320.zevtc",
+    )
+    DpsLog.objects.filter(id=dpslog.id).update(local_name=None)  # Out of sync, as after an older bulk write
+
+    async def fake_fetch(self, urls):
+        return [(url, _metadata(0), None) for url in urls]
+
+    with patch.object(BulkUrlImporter, "_fetch", fake_fetch):
+        stats = BulkUrlImporter().run(urls=["https://dps.report/test-0"])
+    assert stats.updated == 1
+
+    dpslog.refresh_from_db()
+    assert dpslog.url == "https://dps.report/test-0"
+    assert dpslog.local_name == "20300318-013320.zevtc"
+
+
+def test_bulk_import_throughput(tmp_path, encounter):
+    """Metadata requests run concurrently with the default GET pacing, far above the 0.5 urls/s of uploads."""
+    urls = [f"https://dps.report/test-{idx}" for idx in range(20)]
+
+    async def metadata_handler(request):
+        await asyncio.sleep(0.05)  # Response time of dps.report
+        return web.json_response(_metadata(int(request.query["permalink"].rsplit("-", 1)[1])).data)
+
+    # Local dps.report on its own event loop, the importer runs asyncio itself.
+    loop = asyncio.new_event_loop()
+    app = web.Application()
+    app.router.add_get("/getUploadMetadata", metadata_handler)
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", 0).start())
+    port = runner.addresses[0][1]
+    server = threading.Thread(target=loop.run_forever, daemon=True)
+    server.start()
+
+    try:
+        with (
+            patch(
+                "scripts.log_processing.dps_report_client.DpsReportEndpoints",
+                lambda: DpsReportEndpoints(base_url=f"http://127.0.0.1:{port}/"),
+            ),
+            patch(
+                "scripts.log_processing.dps_report_client.get_response_cache",
+                lambda: DiskCache(cache_dir=tmp_path),
+            ),
+        ):
+            stats = BulkUrlImporter().run(urls=urls)
+        assert stats.created == 20
+        assert stats.urls_per_second > 5
+    finally:
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        server.join()
+        loop.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
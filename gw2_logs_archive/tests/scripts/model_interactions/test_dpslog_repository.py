@@ -0,0 +1,31 @@
+# %%
+if __name__ == "__main__":
+    from scripts.utilities import django_setup
+
+    django_setup.run()
+
+import datetime
+from pathlib import Path
+
+import pytest
+from gw2_logs.models import DpsLog
+from scripts.model_interactions.dpslog_repository import DpsLogRepository
+
+START_TIME = datetime.datetime(2030, 1, 22, 20, 0, tzinfo=datetime.timezone.utc)  # Far away from real logs
+
+
+def test_find_by_log_path_uses_local_name(db):
+    log_path = Path(r"C:\Users\gw2\arcdps.cbtlogs\Vale Guardian\20300122-200000.zevtc")
+    dpslog, _ = DpsLogRepository.update_or_create(start_time=START_TIME, defaults={"url": "https://dps.report/a"})
+    assert dpslog.local_name is None
+
+    # update_or_create only saves the fields in defaults, local_name must be saved with it.
+    DpsLogRepository.update_or_create(start_time=START_TIME, defaults={"local_path": str(log_path)})
+    assert DpsLog.objects.get(start_time=START_TIME).local_name == "20300122-200000.zevtc"
+
+    assert DpsLogRepository.find_by_log_path(Path("/other/dir/20300122-200000.zevtc")).start_time == START_TIME
+    assert DpsLogRepository.find_by_log_path(Path("20300122-200001.zevtc")) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
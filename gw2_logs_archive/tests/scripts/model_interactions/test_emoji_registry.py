@@ -0,0 +1,39 @@
+# %%
+if __name__ == "__main__":
+    from scripts.utilities import django_setup
+
+    django_setup.run()
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from gw2_logs.models import Emoji
+from scripts.log_helpers import PLAYER_EMOTES, RANK_EMOTES, RANK_EMOTES_CUPS, WIPE_EMOTES
+from scripts.model_interactions.emoji_registry import EMOJIS
+
+
+def test_emotes_are_loaded_with_one_query(emojis):
+    EMOJIS.clear()
+    with CaptureQueriesContext(connection) as queries:
+        WIPE_EMOTES[4]
+        PLAYER_EMOTES["core"]
+        RANK_EMOTES["average"]
+        RANK_EMOTES_CUPS[1]
+        EMOJIS.discord_tag("blank")
+    assert len(queries) == 1
+
+    with pytest.raises(Emoji.DoesNotExist):
+        EMOJIS.get("not an emoji")
+
+
+def test_emotes_are_rebuilt_after_emoji_save(emojis):
+    emoji = Emoji.objects.get(name="core")
+    assert PLAYER_EMOTES["core"] == emoji.discord_tag()
+
+    emoji.discord_id = 1234
+    emoji.save()
+    assert PLAYER_EMOTES["core"].endswith(":1234>")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
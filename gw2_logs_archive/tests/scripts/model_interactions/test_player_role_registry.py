@@ -0,0 +1,71 @@
+# %%
+if __name__ == "__main__":
+    from scripts.utilities import django_setup
+
+    django_setup.run()
+
+import datetime
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from gw2_logs.models import DpsLog, Player
+from scripts.model_interactions.player_role_registry import PLAYER_ROLE_REGISTRY
+from scripts.tools.recalculate_friends import update_player_counts
+
+START_TIME = datetime.datetime(2031, 4, 1, 20, 0, tzinfo=datetime.timezone.utc)  # Far away from real logs
+PLAYERS = [f"test_player.{idx}" for idx in range(10)]
+
+
+@pytest.fixture
+def players(db):
+    Player.objects.bulk_create(
+        [Player(name=gw2_id, gw2_id=gw2_id, role="core" if idx < 6 else None) for idx, gw2_id in enumerate(PLAYERS)]
+    )
+    PLAYER_ROLE_REGISTRY.clear()  # bulk_create doesn't send signals
+    return PLAYERS
+
+
+def test_count_roles_matches_player_query(players):
+    with CaptureQueriesContext(connection) as queries:
+        for _ in range(5):
+            counts = PLAYER_ROLE_REGISTRY.count_roles(players)
+    assert len(queries) == 1
+    assert counts == (
+        Player.objects.filter(gw2_id__in=players, role="core").count(),
+        Player.objects.filter(gw2_id__in=players, role="friend").count(),
+    )
+    assert counts == (6, 0)
+
+    # A new friend is picked up through the post_save signal
+    friend = Player.objects.get(gw2_id=players[-1])
+    friend.role = "friend"
+    friend.save()
+    assert PLAYER_ROLE_REGISTRY.count_roles(players) == (6, 1)
+
+
+def test_update_player_counts(players, encounter):
+    dpslogs = [
+        DpsLog.objects.create(
+            url=f"https://dps.report/roles-{idx}",
+            encounter=encounter,
+            start_time=START_TIME + datetime.timedelta(minutes=idx),
+            players=players,
+            core_player_count=6,
+            friend_player_count=0,
+        )
+        for idx in range(3)
+    ]
+    Player.objects.filter(gw2_id__in=players[-2:]).update(role="friend")
+    PLAYER_ROLE_REGISTRY.clear()
+
+    changed_logs = update_player_counts(DpsLog.objects.filter(start_time__gte=START_TIME))
+    assert len(changed_logs) == len(dpslogs)
+    assert set(
+        DpsLog.objects.filter(start_time__gte=START_TIME).values_list("core_player_count", "friend_player_count")
+    ) == {(6, 2)}
+    assert update_player_counts(DpsLog.objects.filter(start_time__gte=START_TIME)) == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
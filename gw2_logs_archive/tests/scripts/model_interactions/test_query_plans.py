@@ -0,0 +1,75 @@
+# %%
+"""Check that the hot DpsLog queries use their indexes."""
+
+if __name__ == "__main__":
+    from scripts.utilities import django_setup
+
+    django_setup.run()
+
+import datetime
+
+import pytest
+from django.db import connection
+from django.db.models import Q, QuerySet
+from gw2_logs.models import DpsLog, InstanceClear
+from scripts.model_interactions.encounter import EncounterInteraction
+
+START_TIME = datetime.datetime(2026, 1, 22, 20, 0, tzinfo=datetime.timezone.utc)
+
+
+def _plan(queryset: QuerySet) -> str:
+    if connection.vendor == "postgresql":
+        # Tables in the test database are small, force the planner to show which index it would use.
+        with connection.cursor() as cursor:
+            cursor.execute("SET enable_seqscan = off")
+    return queryset.explain()
+
+
+@pytest.mark.parametrize(
+    "queryset_fn, index_name",
+    [
+        (
+            lambda encounter: EncounterInteraction(encounter).get_all_succesful_clears(
+                cm=False, lcm=False, min_core_count=2
+            ),
+            "dpslog_rank_idx",
+        ),
+        (
+            # DpsLogService.get_rank_emote_for_log
+            lambda encounter: (
+                encounter.dps_logs.filter(success=True, cm=True, emboldened=False)
+                .filter(Q(start_time__gte=START_TIME - datetime.timedelta(days=9999)) & Q(start_time__lte=START_TIME))
+                .order_by("duration")
+            ),
+            "dpslog_rank_idx",
+        ),
+        (lambda encounter: DpsLog.objects.filter(url="https://dps.report/abcd"), "dpslog_url_idx"),
+        (lambda encounter: DpsLog.objects.filter(local_name="20260122-200000.zevtc"), "local_name"),
+        (
+            lambda encounter: (
+                InstanceClear.objects.filter(instance=encounter.instance, success=True, emboldened=False)
+                .filter(start_time__lte=START_TIME)
+                .order_by("duration")
+            ),
+            "iclear_rank_idx",
+        ),
+    ],
+)
+def test_queries_use_index(queryset_fn, index_name, encounter):
+    plan = _plan(queryset_fn(encounter))
+    assert index_name in plan
+    if connection.vendor == "sqlite":
+        assert "TEMP B-TREE" not in plan  # Ordered by the index, no sort needed
+
+
+def test_day_filter_uses_start_time_index():
+    plan = _plan(
+        DpsLog.objects.filter(start_time__gte=START_TIME, start_time__lt=START_TIME + datetime.timedelta(days=1))
+    )
+    assert "start_time" in plan
+    if connection.vendor == "sqlite":
+        assert "SCAN gw2_logs_dpslog" not in plan
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
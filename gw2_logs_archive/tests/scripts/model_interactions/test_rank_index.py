@@ -0,0 +1,101 @@
+# %%
+if __name__ == "__main__":
+    from scripts.utilities import django_setup
+
+    django_setup.run()
+
+import datetime
+import random
+
+import pytest
+from django.test import override_settings
+from gw2_logs.models import DpsLog
+from scripts.model_interactions.rank_index import RANK_INDEX, RankIndex, RankInfo
+
+START_TIME = datetime.datetime(2031, 1, 1, 20, 0, tzinfo=datetime.timezone.utc)  # Far away from real logs
+
+
+@pytest.fixture
+def dpslogs(encounter):
+    rng = random.Random(1)
+    logs = [
+        DpsLog.objects.create(
+            url=f"https://dps.report/rank-{idx}",
+            encounter=encounter,
+            start_time=START_TIME + datetime.timedelta(days=idx),
+            duration=datetime.timedelta(seconds=rng.randint(200, 260), microseconds=rng.randint(0, 999_999)),
+            success=True,
+            core_player_count=10,
+        )
+        for idx in range(30)
+    ]
+    return logs
+
+
+def _expected(dpslog: DpsLog) -> RankInfo:
+    """Rank the way it was looked up before the index: the full ordered group from the database."""
+    group = list(
+        dpslog.encounter.dps_logs.filter(
+            success=True, cm=dpslog.cm, emboldened=False, start_time__lte=dpslog.start_time
+        ).order_by("duration", "id")
+    )
+    return RankInfo.from_sorted_group(dpslog, group)
+
+
+@pytest.mark.parametrize("mean_or_median", ["mean", "median"])
+def test_rank_matches_ordered_group(dpslogs, mean_or_median):
+    rank_index = RankIndex()
+    with override_settings(MEAN_OR_MEDIAN=mean_or_median):
+        for dpslog in dpslogs:
+            assert rank_index.rank(dpslog) == _expected(dpslog)
+
+
+def test_rank_is_updated_on_save(dpslogs):
+    RANK_INDEX.clear()
+    last = dpslogs[-1]
+    RANK_INDEX.rank(last)  # Load the group
+
+    # A new fastest log lands, the loaded group is updated through the post_save signal.
+    new_log = DpsLog.objects.create(
+        url="https://dps.report/rank-new",
+        encounter=last.encounter,
+        start_time=last.start_time + datetime.timedelta(days=1),
+        duration=datetime.timedelta(seconds=100),
+        success=True,
+        core_player_count=10,
+    )
+    assert RANK_INDEX.rank(new_log) == _expected(new_log)
+    assert RANK_INDEX.rank(new_log).rank == 1
+
+    # Marking it emboldened removes it from the ranking of later logs.
+    new_log.emboldened = True
+    new_log.save()
+    last.start_time = new_log.start_time + datetime.timedelta(days=1)
+    last.save()
+    assert RANK_INDEX.rank(last) == _expected(last)
+
+
+def test_rank_reloads_group_on_miss(dpslogs):
+    RANK_INDEX.clear()
+    last = dpslogs[-1]
+    RANK_INDEX.rank(last)  # Load the group
+
+    # bulk_create sends no post_save, the loaded group misses the new log until it is reloaded.
+    (new_log,) = DpsLog.objects.bulk_create(
+        [
+            DpsLog(
+                url="https://dps.report/rank-bulk",
+                encounter=last.encounter,
+                start_time=last.start_time + datetime.timedelta(days=1),
+                duration=datetime.timedelta(seconds=100),
+                success=True,
+                core_player_count=10,
+            )
+        ]
+    )
+    assert RANK_INDEX.rank(new_log) == _expected(new_log)
+    assert RANK_INDEX.rank(new_log).rank == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,42 @@
+# %%
+if __name__ == "__main__":
+    from scripts.utilities import django_setup
+
+    django_setup.run()
+
+import json
+
+import pytest
+from scripts.utilities.disk_cache import DiskCache
+
+
+def test_disk_cache_merges_index_of_other_processes(tmp_path):
+    """Two caches on the same folder, like the log runner and the url importer, keep each others entries."""
+    cache_dir = tmp_path / "cache"
+    cache1 = DiskCache(cache_dir=cache_dir)
+    cache2 = DiskCache(cache_dir=cache_dir)  # Loaded the index before cache1 wrote to it
+
+    cache1.put_bytes("a", b"aaa")
+    cache2.put_bytes("b", b"bbb")
+    assert cache2.get("a") is not None  # Picked up when cache2 saved
+
+    assert set(json.loads(cache1.index_path.read_text())) == {"a", "b"}
+    assert set(DiskCache(cache_dir=cache_dir)._index) == {"a", "b"}
+    assert not cache1.lock_path.exists()
+
+
+def test_disk_cache_skips_files_larger_than_the_cache(tmp_path):
+    cache = DiskCache(cache_dir=tmp_path / "cache", max_size_mb=1 / 1024)  # 1 kB
+    cache.put_bytes("small", b"x" * 600)
+
+    src_path = tmp_path / "large.json.gz"
+    src_path.write_bytes(b"x" * 2048)
+    assert cache.put("large", src_path, suffix=".json.gz") == src_path
+    assert src_path.exists()
+    assert cache.put_bytes("large", b"x" * 2048) is None
+    assert cache.get("large") is None
+    assert cache.get("small") is not None  # Not evicted for the large file
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,44 @@
+# %%
+if __name__ == "__main__":
+    from scripts.utilities import django_setup
+
+    django_setup.run()
+
+import pytest
+from scripts.utilities.evtc_header import read_evtc_header
+
+
+@pytest.mark.parametrize("zipped", [True, False])
+def test_read_evtc_header(tmp_path, zipped, write_evtc):
+    log_path = write_evtc(
+        tmp_path.joinpath("20260122-200000.zevtc" if zipped else "20260122-200000.evtc"),
+        zipped=zipped,
+    )
+
+    header = read_evtc_header(log_path)
+    assert header.arc_build == "20250220"
+    assert header.boss_id == 15438
+    assert header.gw2_build == 170000
+    assert header.start_time == write_evtc.start_time
+    assert header.players == ["a.1234", "b.1234"]
+
+    # Only the start of the events is read
+    assert header.complete is False
+    lower, upper = header.duration_bounds_ms
+    assert 0 < lower < write_evtc.duration_ms
+    assert upper is None
+
+    header = read_evtc_header(log_path, read_all_events=True)
+    assert header.complete is True
+    assert header.duration_bounds_ms == (write_evtc.duration_ms, write_evtc.duration_ms)
+
+
+def test_read_evtc_header_invalid(tmp_path):
+    log_path = tmp_path.joinpath("not_a_log.zevtc")
+    log_path.write_bytes(b"something else entirely")
+    with pytest.raises(ValueError):
+        read_evtc_header(log_path)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,54 @@
+# %%
+if __name__ == "__main__":
+    from scripts.utilities import django_setup
+
+    django_setup.run()
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+MANAGE_PY = Path(__file__).parents[3] / "manage.py"
+HEAVY_PACKAGES = ["discord", "pandas"]
+
+CHECK_IMPORTS = """
+import sys
+import django
+from django.core.management import load_command_class
+
+django.setup()
+for command in ["update_leaderboards", "update_elite_insights_version", "upload_from_url_cmnd"]:
+    load_command_class("gw2_logs", command)
+print("loaded:" + ",".join(package for package in {packages} if package in sys.modules))
+"""
+
+
+def test_commands_do_not_import_heavy_packages():
+    """The commands import discord and pandas when they are used, not on startup."""
+    result = subprocess.run(
+        [sys.executable, "-c", CHECK_IMPORTS.format(packages=HEAVY_PACKAGES)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip().splitlines()[-1] == "loaded:"
+
+
+def test_startup_profile_report():
+    result = subprocess.run(
+        [sys.executable, str(MANAGE_PY), "update_leaderboards", "--help"],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "GW2_PROFILE_STARTUP": "1"},
+    )
+    assert "Startup profile" in result.stderr
+    assert "django.setup" in result.stderr
+    assert "gw2_logs.management.commands.update_leaderboards" in result.stderr
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])